@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compression ratio and decode throughput of gzip, plain zstd and zstd with
+a per-namespace trained dictionary (pdbe.compression) on small
+VALIDATION/SIFTS-like payloads.
+
+    $ python benchmarks/bench_compression.py
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zstandard
+
+from pdbe.compression import ZstdDictionaries
+
+SAMPLES = 2000
+TRAIN = 500
+
+
+def validation(rng, pdbid):
+    metrics = ['clashscore', 'percent-rama-outliers', 'percent-rota-outliers',
+               'percent-RSRZ-outliers', 'RNAsuiteness', 'Rfree', 'DCC_Rfree']
+    return {pdbid: dict((m, {'absolute': round(rng.uniform(0, 100), 2),
+                             'relative': round(rng.uniform(0, 100), 2),
+                             'rawvalue': round(rng.uniform(0, 30), 3)})
+                        for m in metrics)}
+
+
+def sifts(rng, pdbid):
+    mappings = []
+    for chain_id in 'ABCD'[:rng.randint(1, 4)]:
+        start = rng.randint(1, 50)
+        mappings.append({'entity_id': 1, 'chain_id': chain_id, 'struct_asym_id': chain_id,
+                         'start': {'author_residue_number': start, 'author_insertion_code': '',
+                                   'residue_number': 1},
+                         'end': {'author_residue_number': start + 200,
+                                 'author_insertion_code': '', 'residue_number': 201},
+                         'unp_start': start, 'unp_end': start + 200})
+    accession = 'P%05d' % rng.randint(0, 99999)
+    return {pdbid: {'UniProt': {accession: {'identifier': 'PROT%d_HUMAN' % rng.randint(0, 999),
+                                            'name': 'PROT_HUMAN', 'mappings': mappings}}}}
+
+
+def decode_rate(decode, records, total):
+    start = time.time()
+    for record in records:
+        decode(record)
+    return total / (time.time() - start) / 1e6
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        dictionaries = ZstdDictionaries(tmpdir)
+        for group, make in (('VALIDATION', validation), ('SIFTS', sifts)):
+            payloads = [json.dumps(make(rng, '%d%s' % (i % 10, 'abc'))).encode('utf-8')
+                        for i in range(SAMPLES)]
+            train, test = payloads[:TRAIN], payloads[TRAIN:]
+            total = sum(len(p) for p in test)
+            version = dictionaries.train(group, train)
+            plain = zstandard.ZstdCompressor(level=3)
+            trained = zstandard.ZstdCompressor(level=3,
+                                               dict_data=dictionaries.get(group, version))
+            results = [
+                ('gzip -6', [gzip.compress(p, 6) for p in test], gzip.decompress),
+                ('zstd -3', [plain.compress(p) for p in test],
+                 zstandard.ZstdDecompressor().decompress),
+                ('zstd -3 + dict', [trained.compress(p) for p in test],
+                 zstandard.ZstdDecompressor(dict_data=dictionaries.get(group, version)).decompress),
+            ]
+            print('%s (%d payloads, %.0f bytes on average)' % (group, len(test),
+                                                              float(total) / len(test)))
+            for name, records, decode in results:
+                ratio = float(total) / sum(len(r) for r in records)
+                print('    %-15s ratio %5.1fx   decode %6.0f MB/s'
+                      % (name, ratio, decode_rate(decode, records, total)))
+    finally:
+        shutil.rmtree(tmpdir)
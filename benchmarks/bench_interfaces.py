@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Building and querying the CSR interface network of pdbe.interfaces for a
+large set of entries.
+
+    $ python benchmarks/bench_interfaces.py
+"""
+
+import os
+import sys
+import time
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdbe.interfaces import InterfaceGraph
+
+# synthetic entries of 7 chains and 8 interfaces each
+ENTRIES = 100000
+CHAINS = 'ABCDEFG'
+
+
+def responses(entries):
+    # getInterfacesList alike responses: a chain of interfaces joining all
+    # the chains, plus two random ones
+    rng = random.Random(1)
+    result = {}
+    for i in range(entries):
+        pairs = [(CHAINS[k], CHAINS[k + 1]) for k in range(len(CHAINS) - 1)]
+        pairs += [(rng.choice(CHAINS), rng.choice(CHAINS)) for _ in range(2)]
+        interfaces = [{'interface_id': k + 1, 'int_area': rng.uniform(100, 2000),
+                       'int_solv_en': rng.uniform(-20, 5),
+                       'molecules': [{'chain_id': first}, {'chain_id': second}]}
+                      for k, (first, second) in enumerate(pairs)]
+        pdbid = '%05x' % i
+        result[pdbid] = {pdbid: {'interfaces': {'interface_array': interfaces}}}
+    return result
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+if __name__ == '__main__':
+    data = responses(ENTRIES)
+
+    seconds, graph = timed(InterfaceGraph.from_responses, data)
+    print('%d entries, %d nodes, %d edges' % (len(graph.pdbids), len(graph), len(graph.area)))
+    print('building the graph:          %.2f s' % seconds)
+    seconds, _ = timed(lambda: graph.subgraph(graph.area >= 800))
+    print('filtering edges by area:     %.2f s' % seconds)
+    seconds, _ = timed(graph.buried_area)
+    print('buried area of every node:   %.0f ms' % (seconds * 1000))
+    graph.node('00000', 'A')
+    number = 10000
+    best = min(timeit.repeat(lambda: graph.neighbours('0abcd', 'C'), number=number,
+                             repeat=5)) / number
+    print('neighbours of one node:      %.1f us' % (best * 1e6))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Memory held and decoding time for bulk PDB.getResidueListing-like payloads,
+decoded with plain json.loads versus an InternTable.
+
+    $ python benchmarks/bench_interning.py
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdbe.interning import InternTable
+
+ENTRIES = 500
+RESIDUES = 2000
+RESIDUE_NAMES = ['ALA', 'ARG', 'ASN', 'ASP', 'CYS', 'GLN', 'GLU', 'GLY', 'HIS', 'ILE',
+                 'LEU', 'LYS', 'MET', 'PHE', 'PRO', 'SER', 'THR', 'TRP', 'TYR', 'VAL']
+
+
+def residue_listing(pdbid, rng):
+    # same layout as api/pdb/entry/residue_listing/{pdbid}
+    chains = []
+    for chain_id in 'ABCD':
+        residues = [{'residue_number': i, 'author_residue_number': i,
+                     'author_insertion_code': '', 'residue_name': rng.choice(RESIDUE_NAMES),
+                     'observed_ratio': 1.0, 'multiple_conformers': None}
+                    for i in range(1, RESIDUES // 4 + 1)]
+        chains.append({'chain_id': chain_id, 'struct_asym_id': chain_id, 'residues': residues})
+    return json.dumps({pdbid: {'molecules': [{'entity_id': 1, 'chains': chains}]}})
+
+
+def measure(loads, payloads):
+    # time without tracing, then the memory held by all decoded entries
+    start = time.time()
+    held = [loads(text) for text in payloads]
+    elapsed = time.time() - start
+    del held
+    gc.collect()
+    tracemalloc.start()
+    held = [loads(text) for text in payloads]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return size, elapsed
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    payloads = [residue_listing('%dabc' % i, rng) for i in range(ENTRIES)]
+    plain_size, plain_time = measure(json.loads, payloads)
+    table = InternTable()
+    interned_size, interned_time = measure(table.loads, payloads)
+    print('plain json: %.0f MB, %.2f s' % (plain_size / 1e6, plain_time))
+    print('interned:   %.0f MB, %.2f s (%d strings in the table)'
+          % (interned_size / 1e6, interned_time, len(table)))
+    print('memory reduction: %.0f%%' % (100.0 * (plain_size - interned_size) / plain_size))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Memory used by SIFTS/PDB responses held as decoded dicts versus the typed
+records of pdbe.models, extrapolated to one million records.
+
+    $ python benchmarks/bench_models.py
+"""
+
+import os
+import gc
+import sys
+import json
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdbe.models import build_models
+
+# number of records measured (results are scaled to one million)
+N = 100000
+
+summary = {
+    "related_structures": [], "split_entry": [],
+    "title": "TETRAMERIC HUMAN PHENYLALANINE HYDROXYLASE",
+    "release_date": "19991006", "revision_date": "20110713", "deposition_date": "19980526",
+    "experimental_method": ["X-ray diffraction"], "experimental_method_class": ["x-ray"],
+    "entry_authors": ["Stevens, R.C.", "Fusetti, F.", "Erlandsen, H."],
+    "deposition_site": "BNL", "processing_site": "RCSB",
+    "number_of_entities": {"polypeptide": 1, "dna": 0, "ligand": 1, "dna/rna": 0,
+                           "rna": 0, "sugar": 0, "water": 0, "other": 0},
+    "assemblies": [{"assembly_id": "1", "form": "homo", "preferred": True, "name": "tetramer"}],
+}
+
+molecule = {
+    "entity_id": 1, "molecule_name": ["Phenylalanine-4-hydroxylase"],
+    "molecule_type": "polypeptide(L)", "length": 320, "number_of_copies": 1,
+    "in_chains": ["A"], "in_struct_asyms": ["A"],
+    "sequence": "ACDEFGHIKLMNPQRSTVWY" * 16, "pdb_sequence": "ACDEFGHIKLMNPQRSTVWY" * 16,
+    "weight": 38000.5, "source": [{"organism_scientific_name": "Homo sapiens", "tax_id": 9606}],
+    "synonym": "PAH", "gene_name": ["PAH"], "ca_p_only": False, "mutation_flag": None,
+    "sample_preparation": "Genetically manipulated",
+}
+
+mapping = {
+    "entity_id": 1, "chain_id": "A", "struct_asym_id": "A",
+    "start": {"author_residue_number": 118, "author_insertion_code": "", "residue_number": 1},
+    "end": {"author_residue_number": 452, "author_insertion_code": "", "residue_number": 335},
+    "unp_start": 118, "unp_end": 452,
+}
+
+cases = [
+    ('PDB', 'getSummary', lambda i: {'p%05d' % i: [summary]}),
+    ('PDB', 'getMolecules', lambda i: {'p%05d' % i: [molecule]}),
+    ('SIFTS', 'getPdbUniProt',
+     lambda i: {'p%05d' % i: {'UniProt': {'P%05d' % i: {'identifier': 'PH4H_HUMAN',
+                                                        'name': 'PH4H_HUMAN',
+                                                        'mappings': [mapping]}}}}),
+]
+
+
+def measure(top_name, fun_name, make):
+    # one big response, so keys are shared the way json.loads shares them
+    document = {}
+    for i in range(N):
+        document.update(make(i))
+    text = json.dumps(document)
+    del document
+    gc.collect()
+
+    tracemalloc.start()
+    data = json.loads(text)
+    as_dicts = tracemalloc.get_traced_memory()[0]
+    models = build_models(top_name, fun_name, data)
+    del data
+    gc.collect()
+    as_models = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del models
+    return as_dicts, as_models
+
+
+if __name__ == '__main__':
+    scale = 1e6 / N / 1e9
+    for top_name, fun_name, make in cases:
+        as_dicts, as_models = measure(top_name, fun_name, make)
+        print('%s.%s: %.2f GB as dicts, %.2f GB as records per million'
+              % (top_name, fun_name, as_dicts * scale, as_models * scale))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PDB -> UniProt translation of residue positions, scanning the segment list
+of a SIFTS.getPdbUniProt-like response versus a SiftsIndex lookup.
+
+    $ python benchmarks/bench_sifts.py
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdbe.siftsindex import SiftsIndex, numpy
+
+CHAINS = 1000
+SEGMENTS = 8
+POSITIONS = 1000
+
+
+def uniprot_mappings(pdbid, rng):
+    # chains of SEGMENTS segments of 40 residues separated by unmapped gaps
+    mappings = []
+    for chain in range(CHAINS // 100):
+        start, unp_start = 1, rng.randint(1, 100)
+        for _ in range(SEGMENTS):
+            mappings.append({'chain_id': 'C%d' % chain,
+                             'start': {'residue_number': start},
+                             'end': {'residue_number': start + 39},
+                             'unp_start': unp_start, 'unp_end': unp_start + 39})
+            start, unp_start = start + 45, unp_start + 42
+    return {pdbid: {'UniProt': {'P%05d' % rng.randint(0, 99999): {'mappings': mappings}}}}
+
+
+def scan(mappings, chain_id, positions):
+    # what callers do without the index
+    result = []
+    for position in positions:
+        for mapping in mappings:
+            if mapping['chain_id'] == chain_id and \
+                    mapping['start']['residue_number'] <= position <= mapping['end']['residue_number']:
+                result.append(position - mapping['start']['residue_number'] + mapping['unp_start'])
+                break
+        else:
+            result.append(-1)
+    return result
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    responses = [uniprot_mappings('%dabc' % i, rng) for i in range(100)]
+    index = SiftsIndex()
+    start = time.time()
+    for response in responses:
+        index.add(response)
+    index.chains('P00000')
+    print('index of %d segments built in %.3f s' % (len(index), time.time() - start))
+
+    positions = [rng.randint(1, SEGMENTS * 45) for _ in range(POSITIONS)]
+    lookups = [(pdbid, 'C%d' % chain) for response in responses for pdbid in response
+               for chain in range(CHAINS // 100)]
+    start = time.time()
+    for pdbid, chain_id in lookups:
+        mappings = list(responses[int(pdbid[:-3])][pdbid]['UniProt'].values())[0]['mappings']
+        expected = scan(mappings, chain_id, positions)
+    scan_time = time.time() - start
+    start = time.time()
+    for pdbid, chain_id in lookups:
+        translated = index.to_uniprot(pdbid, chain_id, positions)
+    index_time = time.time() - start
+    assert list(translated) == expected
+    total = len(lookups) * POSITIONS
+    print('%d positions (numpy %s)' % (total, 'installed' if numpy is not None else 'not installed'))
+    print('segment scan: %.2f s, %.2f M positions/s' % (scan_time, total / scan_time / 1e6))
+    print('SiftsIndex:   %.2f s, %.2f M positions/s' % (index_time, total / index_time / 1e6))
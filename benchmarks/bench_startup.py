@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Import time of pdbe (in fresh interpreters) and instantiation time of
+pyPDBeREST, the two costs paid by short-lived scripts and by code that
+creates a client per task or per worker.
+
+    $ python benchmarks/bench_startup.py
+
+Exits with status 1 when a figure is over its target below (set well
+under the figures before the deferred endpoint setup: 17.1 ms of import
+on top of requests and 259 us per client).
+"""
+
+import os
+import sys
+import timeit
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RUNS = 20
+
+# targets: import pdbe on top of requests (ms), pyPDBeREST() (us) and
+# an endpoint attribute lookup on a client (us)
+TARGET_IMPORT_MS = 15
+TARGET_CLIENT_US = 50
+TARGET_ATTRIBUTE_US = 1
+
+
+def import_time(module):
+    # best wall time of 'import module' in a fresh interpreter, in ms
+    code = ('import time; start = time.time(); import %s; '
+            'print((time.time() - start) * 1000)' % module)
+    times = [float(subprocess.check_output([sys.executable, '-c', code], cwd=ROOT))
+             for _ in range(RUNS)]
+    return min(times)
+
+
+if __name__ == '__main__':
+    requests_ms = import_time('requests')
+    pdbe_ms = import_time('pdbe')
+    print('import requests: %.1f ms' % requests_ms)
+    print('import pdbe:     %.1f ms (%.1f ms on top of requests, target %d ms)'
+          % (pdbe_ms, pdbe_ms - requests_ms, TARGET_IMPORT_MS))
+    over = []
+    if pdbe_ms - requests_ms > TARGET_IMPORT_MS:
+        over.append('import pdbe')
+
+    from pdbe import pyPDBeREST
+    # the first client resolves the json backend, which is paid once per process
+    pyPDBeREST()
+    number = 2000
+    best = min(timeit.repeat(pyPDBeREST, number=number, repeat=5)) / number
+    print('pyPDBeREST():    %.1f us (target %d us)' % (best * 1e6, TARGET_CLIENT_US))
+    if best * 1e6 > TARGET_CLIENT_US:
+        over.append('pyPDBeREST()')
+    client = pyPDBeREST()
+    best = min(timeit.repeat(lambda: client.PDB.getSummary, number=number * 10,
+                             repeat=5)) / (number * 10)
+    print('p.PDB.getSummary attribute: %.2f us (target %d us)'
+          % (best * 1e6, TARGET_ATTRIBUTE_US))
+    if best * 1e6 > TARGET_ATTRIBUTE_US:
+        over.append('p.PDB.getSummary attribute')
+
+    if over:
+        print('OVER TARGET: %s' % ', '.join(over))
+        sys.exit(1)
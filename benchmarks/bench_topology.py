@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Topology layouts of many chains: pdbe.topology's flat arrays versus one
+numpy array per element.
+
+    $ python benchmarks/bench_topology.py
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy
+from pdbe.topology import TopologyArrays, element_types
+
+# synthetic chains of 10 helices, 10 strands, 9 coils and 2 terms
+CHAINS = 5000
+COUNTS = {'helices': 10, 'strands': 10, 'coils': 9, 'terms': 2}
+
+
+def responses(chains):
+    # getTopology alike responses, one entry per chain, 1-14 points per element
+    rng = random.Random(1)
+    result = []
+    for i in range(chains):
+        layout = {}
+        for kind in element_types:
+            elements = []
+            for j in range(COUNTS[kind]):
+                points = [{'x': rng.uniform(0, 500), 'y': rng.uniform(0, 500)}
+                          for _ in range(1 if kind == 'terms' else rng.randint(1, 14))]
+                if kind == 'terms':
+                    elements.append({'resnum': j, 'type': 'N', '2dcoordinates': points})
+                else:
+                    elements.append({'start': j * 10, 'stop': j * 10 + 8,
+                                     '2dcoordinates': points})
+            layout[kind] = elements
+        result.append({'%04x' % i: {'1': {'A': layout}}})
+    return result
+
+
+def per_element_arrays(responses):
+    # the alternative layout: one (n, 2) array per element
+    arrays = []
+    for response in responses:
+        for entities in response.values():
+            for chains in entities.values():
+                for layout in chains.values():
+                    for kind in element_types:
+                        for element in layout[kind]:
+                            arrays.append(numpy.array([(point['x'], point['y'])
+                                                       for point in element['2dcoordinates']]))
+    return arrays
+
+
+def per_element_bounds(arrays):
+    return [(array.min(axis=0), array.max(axis=0)) for array in arrays]
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+if __name__ == '__main__':
+    data = responses(CHAINS)
+
+    seconds, topology = timed(TopologyArrays.from_responses, data)
+    print('%d chains, %d elements, %d points'
+          % (len(topology), len(topology.element_type), len(topology.points)))
+    print('building the arrays:          %.2f s' % seconds)
+    seconds, arrays = timed(per_element_arrays, data)
+    print('one array per element:        %.2f s' % seconds)
+    seconds, _ = timed(topology.bounds)
+    print('bounding boxes of all chains: %.0f ms' % (seconds * 1000))
+    seconds, _ = timed(per_element_bounds, arrays)
+    print('per-element min/max:          %.2f s' % seconds)
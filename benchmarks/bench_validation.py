@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Archive-wide statistics of validation metrics: pdbe.validation's packed
+numpy matrix versus loops over the decoded responses.
+
+    $ python benchmarks/bench_validation.py
+"""
+
+import os
+import sys
+import math
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy
+from pdbe.validation import ValidationMetrics
+
+# synthetic entries; 10 metrics with a relative and a raw value, plus overall_quality
+N = 200000
+METRICS = ['clashscore', 'percent-rama-outliers', 'percent-rota-outliers', 'RNAsuiteness',
+           'percent-RSRZ-outliers', 'DCC_Rfree', 'absolute-percentile-clashscore',
+           'bonds-rmsz', 'angles-rmsz', 'chirality']
+
+
+def responses(n):
+    # getGlobalRelativePercentiles and getGlobalAbsolutePercentilesSummary
+    # alike responses, with some metrics missing as for real entries
+    rng = random.Random(1)
+    relative, summary = {}, {}
+    for i in range(n):
+        pdbid = '%04x' % i
+        relative[pdbid] = dict((metric, {'relative': rng.uniform(0, 100),
+                                         'rawvalue': rng.uniform(0, 20)})
+                               for metric in METRICS if rng.random() > 0.1)
+        summary[pdbid] = {'overall_quality': rng.uniform(0, 100)}
+    return relative, summary
+
+
+def loop_summary(relative, summary):
+    # the statistics of ValidationMetrics.summary with plain python
+    columns = {}
+    for pdbid, metrics in relative.items():
+        for metric, values in metrics.items():
+            for name, value in values.items():
+                columns.setdefault('%s.%s' % (metric, name), []).append(value)
+    for pdbid, values in summary.items():
+        columns.setdefault('overall_quality', []).append(values['overall_quality'])
+    result = {}
+    for name, values in columns.items():
+        values.sort()
+        count = len(values)
+        mean = sum(values) / count
+        std = math.sqrt(sum((value - mean) ** 2 for value in values) / count)
+        result[name] = {'count': count, 'mean': mean, 'std': std, 'min': values[0],
+                        'p25': values[count // 4], 'median': values[count // 2],
+                        'p75': values[3 * count // 4], 'max': values[-1]}
+    return result
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+if __name__ == '__main__':
+    relative, summary = responses(N)
+
+    seconds, metrics = timed(ValidationMetrics.from_responses, [relative, summary])
+    print('%d entries, %d metrics' % metrics.values.shape)
+    print('packing:                    %.2f s' % seconds)
+    seconds, _ = timed(metrics.summary)
+    print('summary of every metric:    %.2f s' % seconds)
+    seconds, _ = timed(lambda: metrics.mask('clashscore.rawvalue', high=5) &
+                       metrics.mask('overall_quality', low=50))
+    print('two-metric filter:          %.0f ms' % (seconds * 1000))
+    queries = numpy.random.RandomState(1).uniform(0, 100, 100000)
+    seconds, _ = timed(metrics.percentile_rank, 'overall_quality', queries)
+    print('100,000 percentile ranks:   %.0f ms' % (seconds * 1000))
+    seconds, _ = timed(loop_summary, relative, summary)
+    print('summary with python loops:  %.2f s' % seconds)
@@ -21,7 +21,7 @@
 
 
 from .pdberest import pyPDBeREST
-from .exceptions import RestError, RestRateLimitError, RestServiceUnavailable
+from .exceptions import RestError, RestRateLimitError, RestServiceUnavailable, RestTimeout
 
 __author__ = "Fábio Madeira"
 __copyright__ = "Copyright 2015, Fábio Madeira"
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+    Optional numpy support shared by the array based modules
+    (validation.py, topology.py, interfaces.py).
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def require_numpy(feature):
+    # ImportError naming the 'feature' that needs numpy, when it is missing
+    if numpy is None:
+        raise ImportError("%s require the 'numpy' package" % feature)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Offline UniProt -> best PDB structure index.
+
+    SIFTS.getBestStructures ranks the chains covering an accession
+    (coverage, then resolution). The index is compiled once from those
+    responses and answers "best structure covering residue X" with a binary
+    search, without any request:
+
+        index = BestStructureIndex.build(p, accessions, workers=8)
+        index.save('best_structures.json')
+        ...
+        index = BestStructureIndex.load('best_structures.json')
+        structure, residue_number = index.best('P29373', 42)
+
+    The ranked ranges of an accession are split at every range boundary
+    into disjoint intervals, each holding the best ranked structure that
+    covers it.
+"""
+
+# import system modules
+import os
+import heapq
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# import pdberest modules
+from .exceptions import RestError
+from .deadline import Deadline
+from .jsonbackend import get_backend
+from .models import BestStructure
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+# Disjoint intervals of one accession
+class _Coverage(object):
+    __slots__ = ('structures', 'starts', 'ends', 'best')
+
+    def __init__(self, structures):
+        self.structures = structures
+        boundaries = set()
+        for structure in structures:
+            boundaries.add(structure.unp_start)
+            boundaries.add(structure.unp_end + 1)
+        boundaries = sorted(boundaries)
+        self.starts, self.ends, self.best = [], [], []
+        # sweep the boundaries keeping a heap of the ranks of the structures
+        # started so far; expired ones are dropped once they reach the top
+        order = sorted(range(len(structures)), key=lambda rank: structures[rank].unp_start)
+        active, started = [], 0
+        for start, stop in zip(boundaries, boundaries[1:]):
+            while started < len(order) and structures[order[started]].unp_start <= start:
+                heapq.heappush(active, order[started])
+                started += 1
+            while active and structures[active[0]].unp_end < start:
+                heapq.heappop(active)
+            if not active:
+                continue
+            rank = active[0]
+            if self.best and self.best[-1] == rank and self.ends[-1] == start - 1:
+                # same structure as the previous interval, merge them
+                self.ends[-1] = stop - 1
+            else:
+                self.starts.append(start)
+                self.ends.append(stop - 1)
+                self.best.append(rank)
+
+    def find(self, position):
+        found = bisect.bisect_right(self.starts, position) - 1
+        if found >= 0 and position <= self.ends[found]:
+            return self.structures[self.best[found]]
+        return None
+
+
+# UniProt position -> best structure
+class BestStructureIndex(object):
+    """
+        Ranked coverage ranges per UniProt accession, from
+        SIFTS.getBestStructures responses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._coverage = {}
+
+    @classmethod
+    def build(cls, client, accessions, workers=5, deadline=None):
+        """
+            Fetches SIFTS.getBestStructures for every accession ('workers'
+            requests at a time) and compiles the index. Accessions without
+            structures (a 404) are indexed as empty; other errors are raised.
+            'deadline' (seconds or a Deadline) bounds the whole build.
+        """
+
+        index = cls()
+        deadline = Deadline.of(deadline)
+
+        def fetch(accession):
+            try:
+                data = client.call_api_data('SIFTS', 'getBestStructures', uniprotid=accession,
+                                            deadline=deadline)
+            except RestError as error:
+                if error.error_code != 404:
+                    raise
+                logger.info("No best structures for '%s'" % accession)
+                data = {accession: []}
+            index.add(data)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(fetch, accessions):
+                pass
+        return index
+
+    def add(self, data):
+        # adds (or replaces) the accessions of a getBestStructures response,
+        # as decoded json ({accession: [{...}, ...]}) or as models
+        for accession, structures in data.items():
+            structures = [structure if isinstance(structure, BestStructure)
+                          else BestStructure.from_json(structure) for structure in structures]
+            structures = [structure for structure in structures
+                          if structure.unp_start is not None and structure.unp_end is not None]
+            coverage = _Coverage(structures)
+            with self._lock:
+                self._coverage[accession] = coverage
+
+    # lookups
+    def best(self, accession, position):
+        """
+            (BestStructure, PDB residue number) of the best ranked structure
+            covering a UniProt position, or None when none covers it.
+            Raises KeyError for accessions that were never indexed.
+        """
+
+        structure = self._coverage[accession].find(position)
+        if structure is None:
+            return None
+        return structure, position - structure.unp_start + structure.start
+
+    def ranked(self, accession, position):
+        # all the structures covering a position, best first
+        return [(structure, position - structure.unp_start + structure.start)
+                for structure in self._coverage[accession].structures
+                if structure.unp_start <= position <= structure.unp_end]
+
+    def structures(self, accession):
+        return list(self._coverage[accession].structures)
+
+    # persistence
+    def save(self, path):
+        data = dict((accession, [structure.to_dict() for structure in coverage.structures])
+                    for accession, coverage in self._coverage.items())
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as handle:
+            handle.write(get_backend().dumps(data))
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as handle:
+            index.add(get_backend().loads(handle.read()))
+        return index
+
+    def __contains__(self, accession):
+        return accession in self._coverage
+
+    def __len__(self):
+        return len(self._coverage)
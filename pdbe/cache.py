@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import time
+import threading
+from collections import OrderedDict
+
+# import pdberest modules
+from .canonical import canonical_key
+
+
+def request_key(top_name, fun_name, method, params):
+    # hashable key identifying the resource behind a request; aliased
+    # endpoints and identifier case variants share it (see canonical.py)
+    return canonical_key(top_name, fun_name, method, params)
+
+
+def error_key(key):
+    # key under which the error response to the request 'key' is cached,
+    # kept apart so that readers of 'key' never see an error record
+    return ('error',) + tuple(key)
+
+
+def stored_key(key):
+    # key under which the time the response to 'key' was stored is kept
+    # (by the freshness policies of policy.py)
+    return ('stored',) + tuple(key)
+
+
+def get_error(cache, key, ttl):
+    """
+        Status code cached for the request 'key' by set_error, or None if
+        there is none younger than 'ttl' seconds.
+    """
+
+    try:
+        status_code, stored = cache.get(error_key(key))
+    except KeyError:
+        return None
+    if time.time() - stored > ttl:
+        return None
+    return status_code
+
+
+def set_error(cache, key, status_code):
+    # stored as a list so that json based caches (PackCache) can hold it
+    cache.set(error_key(key), [status_code, time.time()])
+
+
+# In-memory response cache
+class ResponseCache(object):
+    """
+        Thread-safe LRU cache of decoded responses, keyed by request_key().
+        Entries older than 'ttl' seconds are dropped on access and the least
+        recently used ones are evicted beyond 'max_entries'.
+        Values are shared with the callers, not copied; treat them as read-only.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    # returns the cached value or raises KeyError
+    def get(self, key):
+        with self._lock:
+            stored, value = self._data[key]
+            if self.ttl is not None and time.time() - stored > self.ttl:
+                del self._data[key]
+                raise KeyError(key)
+            # mark as recently used
+            del self._data[key]
+            self._data[key] = (stored, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.time(), value)
+            if self.max_entries is not None:
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        try:
+            self.get(key)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._data)
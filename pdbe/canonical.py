@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Canonical form of requests, so that requests for the same resource
+    share one key (cache.request_key) in caches, prefetches and work queues.
+
+    - identifiers follow the 'case' of their var type in config.var_types
+      (pdbid lower case; compid, uniprotid and emdbid upper case), EMDB ids
+      get their 'EMD-' prefix and SIFTS accessions are lower case when they
+      look like a PDB id, upper case otherwise;
+    - comma separated id lists of the POST vars (config.post_vars) are
+      normalised, de-duplicated and sorted;
+    - other vars without a 'case' (e.g. SEARCH queries) are left untouched;
+    - integer vars are compared as integers;
+    - endpoints sharing a url and methods (PDB.getMolecules and
+      PDB.getEntities) resolve to one of them.
+
+    Only keys are canonical; requests still go out as they were made.
+"""
+
+# import system modules
+import re
+
+# import pdberest modules
+from .config import api_endpoints, var_types, post_vars
+
+_pdbid = re.compile(r'^[0-9][a-zA-Z0-9]{3}$')
+_aliases = None
+
+
+def _case(var, value):
+    case = var_types[var].get('case')
+    if var == 'accession':
+        case = 'lower' if _pdbid.match(value) else 'upper'
+    if case == 'lower':
+        value = value.lower()
+    elif case == 'upper':
+        value = value.upper()
+    if var == 'emdbid' and value.isdigit():
+        value = 'EMD-' + value
+    return value
+
+
+def canonical_value(var, value):
+    # canonical form of the value of a url var
+    spec = var_types.get(var)
+    if spec is None:
+        return value
+    if spec['type'] is int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+    if not isinstance(value, str):
+        return value
+    if var in post_vars and ',' in value:
+        return ','.join(sorted(set(_case(var, item.strip()) for item in value.split(',')
+                                   if item.strip())))
+    if 'case' not in spec and var != 'accession':
+        return value
+    return _case(var, value.strip())
+
+
+def canonical_params(params):
+    return dict((var, canonical_value(var, value)) for var, value in params.items())
+
+
+def canonical_endpoint(top_name, fun_name):
+    # the endpoint that (top_name, fun_name) is an alias of, or itself
+    global _aliases
+    if _aliases is None:
+        resources = {}
+        for top in sorted(api_endpoints):
+            for fun in sorted(api_endpoints[top]):
+                func = api_endpoints[top][fun]
+                resource = (func['url'], tuple(func['method']))
+                resources.setdefault(resource, (top, fun))
+        _aliases = dict(((top, fun), resources[(func['url'], tuple(func['method']))])
+                        for top in api_endpoints for fun, func in api_endpoints[top].items())
+    return _aliases.get((top_name, fun_name), (top_name, fun_name))
+
+
+def canonical_key(top_name, fun_name, method, params):
+    # hashable key of the resource behind a request
+    top_name, fun_name = canonical_endpoint(top_name, fun_name)
+    return (top_name, fun_name, method.upper(),
+            tuple(sorted((var, canonical_value(var, value)) for var, value in params.items())))
@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    The 'pdberest' command.
+
+        $ pdberest fetch PDB.getSummary --ids ids.txt --workers 32 --out results/
+        $ cut -f1 entries.tsv | pdberest fetch VALIDATION.getSummaryQualityScores \\
+              --ids - --compress zstd --out results/
+
+    'fetch' streams ids (one per line, or a json object of params per
+    line) from a file or stdin, calls the endpoint 'workers' requests at a
+    time and writes one json line per id:
+
+        {"params": {"pdbid": "1cbs"}, "data": {"1cbs": [...]}}
+        {"params": {"pdbid": "9zzz"}, "error": 404, "message": "..."}
+
+    ('error' is the exception name, e.g. "JSONDecodeError", for failures
+    without an HTTP status)
+
+    to <out>/<Top>.<function>.jsonl (.gz or .zst with --compress) or to
+    stdout. Endpoints taking POST get 'batch-size' ids per request, and
+    the response is split back per id; a failed batch is retried one id at
+    a time. Requests/sec, error counts and latency percentiles are printed
+    to stderr while it runs. The exit status is 1 when any request failed
+    with something other than 404.
+
+        $ pdberest serve --port 8765 --cache-dir mirror/
+
+    runs the caching gateway of gateway.py.
+"""
+
+# import system modules
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import argparse
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# import pdberest modules
+from .config import api_endpoints, default_url, post_vars, request_timeouts
+from .cache import ResponseCache
+from .pdberest import pyPDBeREST
+from .ratelimit import RateLimiter
+from .jsonbackend import get_backend
+from .deadline import Deadline
+
+
+def _percentile(ordered, q):
+    # nearest-rank percentile of an ascending sequence
+    if not ordered:
+        return float('nan')
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+# Counters of a fetch run, updated from the worker threads
+class FetchStats(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.records = 0
+        self.errors = 0
+        self.missing = 0
+        self.latencies = array('d')
+
+    def request(self, seconds):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(seconds)
+
+    def record(self, error_code=None):
+        with self._lock:
+            self.records += 1
+            if error_code == 404:
+                self.missing += 1
+            elif error_code is not None:
+                self.errors += 1
+
+    def report(self, since=0):
+        """
+            One status line; latency percentiles are over the requests from
+            index 'since' on (the last reporting interval).
+        """
+
+        with self._lock:
+            latencies = sorted(self.latencies[since:])
+            elapsed = max(time.time() - self.started, 1e-9)
+            line = ("%d ids, %d requests, %.1f req/s, %d errors, %d missing"
+                    % (self.records, self.requests, self.requests / elapsed,
+                       self.errors, self.missing))
+        if latencies:
+            line += (", latency p50 %.0f ms, p95 %.0f ms, p99 %.0f ms"
+                     % tuple(_percentile(latencies, q) * 1000 for q in (50, 95, 99)))
+        return line
+
+
+# Prints FetchStats to a stream every 'interval' seconds
+class _Reporter(threading.Thread):
+
+    def __init__(self, stats, stream, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.stats = stats
+        self.stream = stream
+        self.interval = interval
+        self._done = threading.Event()
+
+    def run(self):
+        since = 0
+        while not self._done.wait(self.interval):
+            requests = self.stats.requests
+            self.stream.write(self.stats.report(since) + '\n')
+            self.stream.flush()
+            since = requests
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _error_record(params, error):
+    # json line of a failed id: the HTTP status if there is one, else the exception name
+    code = getattr(error, 'error_code', None)
+    if code is None:
+        code = type(error).__name__
+    return {'params': params, 'error': code, 'message': str(error)}
+
+
+def read_ids(handle):
+    # ids, or dicts of params for json object lines; blank lines and '#' comments skipped
+    for line in handle:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            yield json.loads(line)
+        else:
+            yield line
+
+
+def _open_output(out, name, compress):
+    # binary stream the json lines are written to
+    if out == '-':
+        if compress != 'none':
+            raise ValueError("--compress needs an --out directory")
+        return getattr(sys.stdout, 'buffer', sys.stdout)
+    if not os.path.isdir(out):
+        os.makedirs(out)
+    path = os.path.join(out, name + '.jsonl')
+    if compress == 'gzip':
+        return gzip.open(path + '.gz', 'wb')
+    if compress == 'zstd':
+        if zstandard is None:
+            raise ImportError("--compress zstd requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().stream_writer(open(path + '.zst', 'wb'))
+    return open(path, 'wb')
+
+
+# Bulk fetch of one endpoint
+class BulkFetcher(object):
+    """
+        Calls 'top_name.fun_name' for a stream of ids with 'workers' threads,
+        each with its own client, all drawing from one request budget.
+        Ids go 'batch_size' per POST request where the endpoint allows it.
+    """
+
+    def __init__(self, top_name, fun_name, workers=8, batch_size=50, reqs_per_sec=15,
+                 params=None, stats=None, deadline=None, **client_args):
+        if top_name not in api_endpoints or fun_name not in api_endpoints[top_name]:
+            raise AttributeError("Unknown endpoint '%s.%s'" % (top_name, fun_name))
+        func = api_endpoints[top_name][fun_name]
+        self.top_name = top_name
+        self.fun_name = fun_name
+        self.workers = workers
+        self.params = params or {}
+        # seconds allowed per id (or batch), fallbacks included
+        self.deadline = deadline
+        self.stats = stats or FetchStats()
+        self.mandatory_params = [name for name in
+                                 re.findall(r'\{\{(?P<m>[a-zA-Z_]+)\}\}', func['url'])
+                                 if name not in self.params]
+        self.batch_var = None
+        if batch_size > 1 and 'POST' in func['method'] and not self.params and \
+                len(self.mandatory_params) == 1 and self.mandatory_params[0] in post_vars:
+            self.batch_var = self.mandatory_params[0]
+        self.batch_size = batch_size if self.batch_var else 1
+        self.client_args = dict(client_args, pretty_json=False,
+                                rate_limiter=RateLimiter(reqs_per_sec))
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = pyPDBeREST(**self.client_args)
+        return client
+
+    def _params(self, item):
+        if isinstance(item, dict):
+            params = dict(self.params, **item)
+        elif len(self.mandatory_params) == 1:
+            params = dict(self.params, **{self.mandatory_params[0]: item})
+        else:
+            raise ValueError("'%s.%s' takes params %s; give a json object per line"
+                             % (self.top_name, self.fun_name, self.mandatory_params))
+        return params
+
+    def _call(self, **params):
+        start = time.time()
+        try:
+            return self._client().call_api_data(self.top_name, self.fun_name, **params)
+        finally:
+            self.stats.request(time.time() - start)
+
+    def _fetch_one(self, params, deadline=None):
+        # any failure only fails its own id, so the run goes on
+        try:
+            return {'params': params, 'data': self._call(deadline=deadline, **params)}
+        except Exception as error:
+            return _error_record(params, error)
+
+    def _fetch(self, items):
+        # json line records of one task (a single id or a batch)
+        records = []
+        params = []
+        for item in items:
+            try:
+                params.append(self._params(item))
+            except Exception as error:
+                records.append(_error_record(item, error))
+        deadline = Deadline.of(self.deadline)
+        if len(params) > 1:
+            ids = [param[self.batch_var] for param in params]
+            try:
+                data = self._call(method='POST', deadline=deadline,
+                                  **{self.batch_var: ','.join(ids)})
+            except Exception:
+                data = None
+            if isinstance(data, dict):
+                for param, identifier in zip(params, ids):
+                    for key in (identifier, identifier.lower(), identifier.upper()):
+                        if key in data:
+                            records.append({'params': param, 'data': {key: data[key]}})
+                            break
+                    else:
+                        records.append({'params': param, 'error': 404,
+                                        'message': 'Not in the batch response'})
+                return records
+        return records + [self._fetch_one(param, deadline) for param in params]
+
+    def _tasks(self, ids):
+        batch = []
+        for item in ids:
+            if self.batch_var is None or isinstance(item, dict):
+                yield [item]
+                continue
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, ids):
+        """
+            Yields the records of all the ids, in completion order. At most
+            twice 'workers' tasks are in flight, so ids are read as they
+            are needed.
+        """
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            for task in self._tasks(ids):
+                if len(pending) >= 2 * self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for record in future.result():
+                            yield record
+                pending.add(pool.submit(self._fetch, task))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for record in future.result():
+                        yield record
+
+
+def fetch_command(args):
+    try:
+        top_name, fun_name = args.endpoint.split('.', 1)
+    except ValueError:
+        raise SystemExit("endpoint must be given as <Top>.<function>, e.g. PDB.getSummary")
+    params = dict(param.split('=', 1) for param in args.param)
+    client_args = {}
+    if args.base_url:
+        client_args['base_url'] = args.base_url
+    if args.timeout:
+        # replaces the longer built-in timeouts of SEARCH, PISA, ... as well
+        client_args['timeouts'] = dict((key, args.timeout) for key in request_timeouts)
+    fetcher = BulkFetcher(top_name, fun_name, workers=args.workers, batch_size=args.batch_size,
+                          reqs_per_sec=args.reqs_per_sec, params=params, deadline=args.deadline,
+                          **client_args)
+
+    backend = get_backend()
+    handle = sys.stdin if args.ids == '-' else open(args.ids)
+    output = _open_output(args.out, '%s.%s' % (top_name, fun_name), args.compress)
+    reporter = None
+    if not args.quiet:
+        reporter = _Reporter(fetcher.stats, sys.stderr, args.interval)
+        reporter.start()
+    try:
+        for record in fetcher.run(read_ids(handle)):
+            fetcher.stats.record(record.get('error'))
+            output.write(backend.dumps(record) + b'\n')
+    finally:
+        if reporter is not None:
+            reporter.stop()
+        if handle is not sys.stdin:
+            handle.close()
+        if args.out != '-':
+            output.close()
+        else:
+            output.flush()
+    if not args.quiet:
+        sys.stderr.write('done: %s\n' % fetcher.stats.report())
+    return 1 if fetcher.stats.errors else 0
+
+
+def serve_command(args):
+    from .gateway import Gateway, make_server
+    if args.cache_dir:
+        from .packcache import PackCache
+        cache = PackCache(args.cache_dir)
+    else:
+        cache = ResponseCache(max_entries=args.cache_entries, ttl=args.ttl)
+    gateway = Gateway(args.upstream, cache=cache, reqs_per_sec=args.reqs_per_sec,
+                      connections=args.connections, negative_ttl=args.negative_ttl)
+    server = make_server(gateway, args.host, args.port)
+    host, port = server.server_address[:2]
+    sys.stderr.write("Serving %s on http://%s:%d/ (clients: pyPDBeREST(base_url='http://%s:%d/'))\n"
+                     % (gateway.upstream, host, port, host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pdberest', description='PDBe REST API tools.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    fetch = commands.add_parser('fetch', help='call an endpoint for a list of ids')
+    fetch.add_argument('endpoint', help='<Top>.<function>, e.g. PDB.getSummary')
+    fetch.add_argument('--ids', default='-',
+                       help="file with one id (or json object of params) per line, '-' for stdin")
+    fetch.add_argument('--out', default='-', help="output directory, '-' for stdout")
+    fetch.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    fetch.add_argument('--batch-size', type=int, default=50,
+                       help='ids per POST request where the endpoint takes POST (1 disables)')
+    fetch.add_argument('--reqs-per-sec', type=float, default=15, help='request budget')
+    fetch.add_argument('--compress', choices=('none', 'gzip', 'zstd'), default='none')
+    fetch.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                       help='extra param given to every call, e.g. assemblyid=0')
+    fetch.add_argument('--base-url', help='alternative API root')
+    fetch.add_argument('--timeout', type=float, help='connect and read timeout of each request')
+    fetch.add_argument('--deadline', type=float,
+                       help='seconds allowed per id (per batch when batched), retries included')
+    fetch.add_argument('--interval', type=float, default=2.0,
+                       help='seconds between progress lines')
+    fetch.add_argument('--quiet', action='store_true', help='no progress output')
+    fetch.set_defaults(func=fetch_command)
+
+    serve = commands.add_parser('serve', help='run a local caching gateway to the API')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--upstream', default=default_url, help='API root requests go to')
+    serve.add_argument('--reqs-per-sec', type=float, default=15,
+                       help='upstream request budget, shared by all clients')
+    serve.add_argument('--connections', type=int, default=32, help='upstream connection pool size')
+    serve.add_argument('--cache-entries', type=int, default=100000,
+                       help='size of the in-memory cache')
+    serve.add_argument('--ttl', type=float, help='seconds a cached response is served for')
+    serve.add_argument('--cache-dir', help='keep the cache in pack files in this directory instead')
+    serve.add_argument('--negative-ttl', type=float,
+                       help='seconds 400/404 answers are repeated without a request')
+    serve.set_defaults(func=serve_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
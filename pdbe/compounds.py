@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Local store of chemical components mirrored from the COMPOUNDS endpoints.
+
+    COMPOUNDS.getSummary, getInPdbs and getAtoms are kept per compid in a
+    SQLite file, with indexes on the InChIKey, the formula weight and the
+    PDB entries, so lookups never leave the process:
+
+        store = CompoundStore('compounds.db')
+        store.sync(p, ['ATP', 'NAG', 'HEM'])
+        store.summary('ATP')
+        store.by_inchikey('ZKHQWZAMYRWXGA-KQYNXXCUSA-N')  # -> ['ATP']
+        store.by_weight(500, 510)                        # -> [('ATP', 507.181)]
+        store.compounds_in('1cbs')                       # -> ['REA']
+        store.refresh(p, max_age=7 * 24 * 3600)
+
+    A refresh re-fetches the summary and the PDB entries of the compounds
+    older than 'max_age'; the atoms are only fetched again when the
+    summary's revision date changed.
+"""
+
+# import system modules
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# import pdberest modules
+from .exceptions import RestError
+from .jsonbackend import get_backend
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+# Local chemical component store
+class CompoundStore(object):
+    """
+        COMPOUNDS responses kept in a SQLite database. Reads use one
+        connection per thread; sync() and refresh() fetch on a thread pool
+        and write from the calling thread.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS compounds ("
+                         "compid TEXT PRIMARY KEY, "
+                         "name TEXT, "
+                         "formula TEXT, "
+                         "formula_weight REAL, "
+                         "inchikey TEXT, "
+                         "revision_date TEXT, "
+                         "summary BLOB, "
+                         "atoms BLOB, "
+                         "updated REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS compounds_inchikey ON compounds (inchikey)")
+            conn.execute("CREATE INDEX IF NOT EXISTS compounds_weight ON compounds (formula_weight)")
+            conn.execute("CREATE INDEX IF NOT EXISTS compounds_updated ON compounds (updated)")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                         "compid TEXT NOT NULL, "
+                         "pdbid TEXT NOT NULL, "
+                         "PRIMARY KEY (compid, pdbid))")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_pdbid ON entries (pdbid)")
+
+    def _connect(self):
+        # reused by each thread for the lifetime of the store
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=self.timeout)
+        return conn
+
+    # synchronisation
+    def sync(self, client, compids, workers=5, max_age=None):
+        """
+            Mirrors the compounds in 'compids' that are missing or, when
+            'max_age' (seconds) is given, older than that. Returns the
+            number of compounds per outcome ('added', 'updated', 'skipped',
+            'failed').
+        """
+
+        counts = {'added': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+        known = self._known(compids)
+        now = time.time()
+        stale = []
+        for compid in compids:
+            compid = compid.upper()
+            if compid in known and (max_age is None or now - known[compid][0] < max_age):
+                counts['skipped'] += 1
+            else:
+                stale.append(compid)
+
+        def fetch(compid):
+            revision_date = known.get(compid, (None, None))[1]
+            try:
+                return compid, self._fetch(client, compid, revision_date), None
+            except RestError as error:
+                return compid, None, error
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for compid, fetched, error in pool.map(fetch, stale):
+                if error is not None:
+                    logger.info("Could not sync compound '%s': %s" % (compid, error))
+                    counts['failed'] += 1
+                    continue
+                self._store(compid, *fetched)
+                counts['updated' if compid in known else 'added'] += 1
+        return counts
+
+    def refresh(self, client, max_age, workers=5):
+        # re-syncs all the stored compounds older than 'max_age' seconds
+        rows = self._connect().execute("SELECT compid FROM compounds WHERE updated < ?",
+                                       (time.time() - max_age,)).fetchall()
+        return self.sync(client, [row[0] for row in rows], workers=workers, max_age=max_age)
+
+    def _known(self, compids):
+        # {compid: (updated, revision_date)} of the stored ones
+        known = {}
+        conn = self._connect()
+        compids = [compid.upper() for compid in compids]
+        # in chunks, SQLite limits the number of bound parameters
+        for i in range(0, len(compids), 500):
+            chunk = compids[i:i + 500]
+            known.update((row[0], (row[1], row[2])) for row in conn.execute(
+                "SELECT compid, updated, revision_date FROM compounds WHERE compid IN (%s)"
+                % ','.join('?' * len(chunk)), chunk))
+        return known
+
+    @staticmethod
+    def _fetch(client, compid, revision_date):
+        summary = client.call_api_data('COMPOUNDS', 'getSummary', compid=compid)
+        summary = (summary.get(compid) or summary.get(compid.lower()) or [{}])[0]
+        try:
+            in_pdbs = client.call_api_data('COMPOUNDS', 'getInPdbs', compid=compid)
+            in_pdbs = in_pdbs.get(compid) or in_pdbs.get(compid.lower()) or []
+        except RestError as error:
+            # compounds not found in any released entry
+            if error.error_code != 404:
+                raise
+            in_pdbs = []
+        atoms = None
+        if revision_date is None or summary.get('revision_date') != revision_date:
+            atoms = client.call_api_data('COMPOUNDS', 'getAtoms', compid=compid)
+            atoms = atoms.get(compid) or atoms.get(compid.lower()) or []
+        pdbids = [(item.get('pdb_id') if isinstance(item, dict) else item) for item in in_pdbs]
+        return summary, [pdbid.lower() for pdbid in pdbids if pdbid], atoms
+
+    def _store(self, compid, summary, pdbids, atoms):
+        dumps = get_backend().dumps
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO compounds (compid, updated) VALUES (?, 0)",
+                         (compid,))
+            conn.execute("UPDATE compounds SET name = ?, formula = ?, formula_weight = ?, "
+                         "inchikey = ?, revision_date = ?, summary = ?, updated = ? "
+                         "WHERE compid = ?",
+                         (summary.get('name'), summary.get('formula'),
+                          summary.get('formula_weight'),
+                          summary.get('inchi_key') or summary.get('inchikey'),
+                          summary.get('revision_date'), sqlite3.Binary(dumps(summary)),
+                          time.time(), compid))
+            if atoms is not None:
+                conn.execute("UPDATE compounds SET atoms = ? WHERE compid = ?",
+                             (sqlite3.Binary(dumps(atoms)), compid))
+            conn.execute("DELETE FROM entries WHERE compid = ?", (compid,))
+            conn.executemany("INSERT OR IGNORE INTO entries (compid, pdbid) VALUES (?, ?)",
+                             [(compid, pdbid) for pdbid in pdbids])
+
+    # lookups
+    def _blob(self, column, compid):
+        row = self._connect().execute("SELECT %s FROM compounds WHERE compid = ?" % column,
+                                      (compid.upper(),)).fetchone()
+        if row is None:
+            raise KeyError(compid)
+        return get_backend().loads(bytes(row[0])) if row[0] is not None else None
+
+    def summary(self, compid):
+        return self._blob('summary', compid)
+
+    def atoms(self, compid):
+        return self._blob('atoms', compid)
+
+    def entries(self, compid):
+        # PDB entries containing the compound
+        return [row[0] for row in self._connect().execute(
+            "SELECT pdbid FROM entries WHERE compid = ? ORDER BY pdbid", (compid.upper(),))]
+
+    def compounds_in(self, pdbid):
+        # compounds of a PDB entry
+        return [row[0] for row in self._connect().execute(
+            "SELECT compid FROM entries WHERE pdbid = ? ORDER BY compid", (pdbid.lower(),))]
+
+    def by_inchikey(self, inchikey):
+        return [row[0] for row in self._connect().execute(
+            "SELECT compid FROM compounds WHERE inchikey = ? ORDER BY compid", (inchikey,))]
+
+    def by_weight(self, low, high):
+        # [(compid, formula_weight), ...] with low <= weight <= high, lightest first
+        return self._connect().execute(
+            "SELECT compid, formula_weight FROM compounds WHERE formula_weight BETWEEN ? AND ? "
+            "ORDER BY formula_weight, compid", (low, high)).fetchall()
+
+    def compids(self):
+        return [row[0] for row in self._connect().execute(
+            "SELECT compid FROM compounds ORDER BY compid")]
+
+    def __contains__(self, compid):
+        return self._connect().execute("SELECT 1 FROM compounds WHERE compid = ?",
+                                       (compid.upper(),)).fetchone() is not None
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM compounds").fetchone()[0]
@@ -34,7 +34,8 @@ var_types = {
     'pdbid': {
         'type': str,
         'doc': '4-character PDB id code. (e.g. 1cbs).\n'
-               'For POST requests, data should contain one or more comma-separated ids.'
+               'For POST requests, data should contain one or more comma-separated ids.',
+        'case': 'lower',
     },
     'chainid': {
         'type': str,
@@ -43,7 +44,8 @@ var_types = {
     # compounds
     'compid': {
         'type': str,
-        'doc': 'Chemical component identifier, up to 3 characters long. (e.g. ATP)'
+        'doc': 'Chemical component identifier, up to 3 characters long. (e.g. ATP)',
+        'case': 'upper',
     },
     # emdb
     'property': {
@@ -56,7 +58,8 @@ var_types = {
     'emdbid': {
         'type': str,
         'doc': 'EMDB entry identifier, starting with EMD- and followed by 4 digits '
-               '(e.g. EMD-1200)'
+               '(e.g. EMD-1200)',
+        'case': 'upper',
     },
     # sifts
     'accession': {
@@ -71,7 +74,8 @@ var_types = {
     },
     'uniprotid': {
         'type': str,
-        'doc': 'UniProt accession. (e.g. P29373)'
+        'doc': 'UniProt accession. (e.g. P29373)',
+        'case': 'upper',
     },
     # pisa
     'assemblyid': {
@@ -1035,6 +1039,55 @@ api_endpoints = {
     'SEARCH': search_endpoints,
 }
 
+# endpoints fetched together as soon as an entry is first requested
+# (used by pyPDBeREST(prefetch=True), see prefetch.py)
+entry_profile = [
+    ('PDB', 'getSummary'),
+    ('PDB', 'getMolecules'),
+    ('PDB', 'getLigands'),
+    ('SIFTS', 'getPdbUniProt'),
+    ('VALIDATION', 'getGlobalRelativePercentiles'),
+]
+
+prefetch_profiles = {
+    'pdbid': entry_profile,
+}
+
+# EMDB.getInfo property groups included in the 'all' payload, with the keys
+# of the 'all' record they are made of (used to serve them from a cached
+# 'all' response, see emdb.py)
+emdb_all_properties = {
+    'summary': ['summary'],
+    'citations': ['citations'],
+    'publications': ['publications'],
+    'map': ['map'],
+    'supplement': ['supplement'],
+    'sample': ['sample'],
+    'vitrification': ['vitrification'],
+    'imaging': ['imaging'],
+    'fitted': ['fitted'],
+    'image_acquisition': ['image_acquisition'],
+    'processing': ['processing'],
+    'experiment': ['vitrification', 'imaging', 'fitted', 'image_acquisition', 'processing'],
+}
+
+# vars that POST requests take as a comma separated list of ids
+# (see pyPDBeREST.fetch_api_func)
+post_vars = ('pdbid', 'compid')
+
+# (connect, read) timeouts in seconds of the requests; the entry of the
+# endpoint, else of its namespace, else 'default' applies (can be
+# overridden with pyPDBeREST(timeouts={...}))
+request_timeouts = {
+    'default': (10, 60),
+    'SEARCH': (10, 120),
+    'PISA': (10, 120),
+}
+
+# error responses that say something about the request rather than the service,
+# cached for pyPDBeREST(negative_ttl=...) and the gateway (see cache.error_key)
+negative_status_codes = (400, 404)
+
 # http status codes
 http_status_codes = {
     200: ('OK', 'Request was a success. Only process data from the service when you receive this code'),
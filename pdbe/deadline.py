@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    End-to-end deadlines for calls and batches of calls.
+
+        p.PDB.getSummary(pdbid='1cbs', deadline=5)      # seconds from now
+
+        deadline = Deadline(60)                         # one budget for a batch
+        ValidationMetrics.collect(p, pdbids, deadline=deadline)
+
+    A Deadline is a point in time; passing the same object to every call of
+    an operation (retries, fallbacks and hedges included) bounds the whole
+    operation. Waits for the rate limit that would end past the deadline
+    fail at once, and connect/read timeouts are cut to the time left. Once
+    it has passed, calls raise RestTimeout without sending a request.
+    (The read timeout bounds each wait for data, so a response still
+    trickling in can overrun by less than one read timeout.)
+"""
+
+# import system modules
+import time
+
+# import pdberest modules
+from .exceptions import RestTimeout
+
+
+# Point in time an operation has to finish by
+class Deadline(object):
+
+    def __init__(self, seconds):
+        self.expires = time.time() + seconds
+
+    @classmethod
+    def of(cls, value):
+        # a Deadline from seconds, an existing Deadline or None
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    def remaining(self):
+        # seconds left, RestTimeout if there are none
+        left = self.expires - time.time()
+        if left <= 0:
+            raise RestTimeout("Deadline passed %.3f s ago" % -left)
+        return left
+
+    def clamp(self, timeout):
+        # requests 'timeout' (seconds, (connect, read) or None) cut to the time left
+        left = self.remaining()
+        if timeout is None:
+            return left
+        if isinstance(timeout, tuple):
+            return tuple(min(value, left) if value is not None else left for value in timeout)
+        return min(timeout, left)
+
+    def __repr__(self):
+        return 'Deadline(%.3f s left)' % (self.expires - time.time())
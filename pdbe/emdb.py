@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Consolidated fetching of EMDB.getInfo property groups.
+
+    Every property group of an EMDB entry is one request, but most of them
+    are also part of the 'all' payload (config.emdb_all_properties). When
+    enough of the requested groups are covered, one 'all' request is made,
+    cached, and the groups are sliced out of it; later requests for those
+    groups are served from the cached payload, including plain
+    p.EMDB.getInfo(property=..., emdbid=...) calls on a client with a cache.
+
+        properties = EmdbProperties(p)
+        info = properties.get('EMD-1200', ['summary', 'map', 'sample', 'imaging'])
+        info['map']   # same as p.EMDB.getInfo(property='map', emdbid='EMD-1200')
+"""
+
+# import system modules
+import logging
+
+# import pdberest modules
+from .config import emdb_all_properties
+from .cache import ResponseCache, request_key
+from .canonical import canonical_value
+from .deadline import Deadline
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+def property_key(emdbid, prop):
+    return request_key('EMDB', 'getInfo', 'GET', {'property': prop, 'emdbid': emdbid})
+
+
+def slice_all(emdbid, data, prop):
+    """
+        The response of property group 'prop' cut out of an 'all' response,
+        or None when the payload does not hold all of its keys.
+    """
+
+    keys = emdb_all_properties.get(prop)
+    if keys is None or not isinstance(data, dict):
+        return None
+    if emdbid not in data:
+        # e.g. 'emd-1200' asked for, 'EMD-1200' in the payload
+        emdbid = canonical_value('emdbid', emdbid)
+    records = data.get(emdbid)
+    if records is None:
+        return None
+    single = isinstance(records, dict)
+    sliced = []
+    for record in ([records] if single else records):
+        if not isinstance(record, dict) or any(key not in record for key in keys):
+            return None
+        sliced.append(dict((key, record[key]) for key in keys))
+    return {emdbid: sliced[0] if single else sliced}
+
+
+def from_cached_all(cache, emdbid, prop):
+    # property group served from a cached 'all' response, None if not possible
+    if cache is None or prop not in emdb_all_properties:
+        return None
+    try:
+        data = cache.get(property_key(emdbid, 'all'))
+    except KeyError:
+        return None
+    return slice_all(emdbid, data, prop)
+
+
+# Multi-property fetching for EMDB entries
+class EmdbProperties(object):
+    """
+        Fetches several EMDB.getInfo property groups of an entry in as few
+        requests as possible. 'all' is fetched instead of targeted calls
+        when at least 'all_threshold' of the missing groups are covered by
+        it. Responses are kept in the client cache, or in a cache of this
+        object's own when the client has none.
+    """
+
+    def __init__(self, client, all_threshold=2, cache=None):
+        self.client = client
+        self.all_threshold = all_threshold
+        if cache is None:
+            cache = client.cache if client.cache is not None else ResponseCache(max_entries=1000)
+        self.cache = cache
+
+    def _fetch(self, emdbid, prop, deadline=None):
+        key = property_key(emdbid, prop)
+        content = self.client.fetch_api_func('EMDB', 'getInfo', 'GET',
+                                             {'property': prop, 'emdbid': emdbid},
+                                             deadline=deadline)
+        self.cache.set(key, content)
+        return content
+
+    def _cached(self, emdbid, prop):
+        try:
+            return self.cache.get(property_key(emdbid, prop))
+        except KeyError:
+            return from_cached_all(self.cache, emdbid, prop)
+
+    def get(self, emdbid, properties, deadline=None):
+        # {property: response} for each of the property groups; 'deadline'
+        # (seconds or a Deadline) bounds all the requests made for them
+        deadline = Deadline.of(deadline)
+        results, missing = {}, []
+        for prop in properties:
+            content = self._cached(emdbid, prop)
+            if content is None:
+                missing.append(prop)
+            else:
+                results[prop] = content
+
+        covered = [prop for prop in missing if prop in emdb_all_properties]
+        if len(covered) >= self.all_threshold:
+            logger.info("Fetching 'all' for %d properties of '%s'" % (len(covered), emdbid))
+            data = self._fetch(emdbid, 'all', deadline)
+            for prop in covered:
+                content = slice_all(emdbid, data, prop)
+                if content is not None:
+                    results[prop] = content
+
+        for prop in missing:
+            if prop not in results:
+                results[prop] = self._fetch(emdbid, prop, deadline)
+        return results
+
+    def get_one(self, emdbid, prop, deadline=None):
+        return self.get(emdbid, [prop], deadline=deadline)[prop]
@@ -22,6 +22,15 @@
 from .config import http_status_codes
 
 
+def _restore_error(cls, args, state):
+    # rebuilds a pickled error without running __init__ (which would
+    # prefix the message a second time)
+    error = cls.__new__(cls)
+    error.args = args
+    error.__dict__.update(state)
+    return error
+
+
 class RestError(Exception):
     """
         Generic error class, catch-all for most PDBe API issues.
@@ -41,6 +50,10 @@ class RestError(Exception):
     def msg(self):
         return self.args[0]
 
+    # errors are sent back from worker processes, so they must survive pickling
+    def __reduce__(self):
+        return _restore_error, (self.__class__, self.args, self.__dict__)
+
 
 class RestRateLimitError(RestError):
     """
@@ -67,3 +80,13 @@ class RestPostNotSupported(RestError):
         Raised when POST method is not supported.
     """
     pass
+
+
+class RestTimeout(RestServiceUnavailable):
+    """
+        Raised when no answer arrived in time: the request timed out or the
+        deadline of the call passed.
+    """
+
+    def __init__(self, msg, error_code=504, rate_reset=None, rate_limit=None, rate_remaining=None):
+        RestError.__init__(self, msg, error_code=error_code)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import re
+import pickle
+import logging
+import multiprocessing
+from collections import namedtuple
+
+# import pdberest modules
+from .config import api_endpoints
+from .exceptions import RestError
+from .pdberest import pyPDBeREST
+from .ratelimit import SharedRateLimiter
+from .deadline import Deadline
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+# one crawled request: the params it was called with and either
+# the (post-processed) value or the error it raised
+CrawlResult = namedtuple('CrawlResult', ['params', 'value', 'error'])
+
+# client owned by each worker process (set by _init_worker)
+_worker_client = None
+
+
+def _init_worker(rate_limiter, client_args):
+    # every worker gets its own session but they all draw from the same budget
+    global _worker_client
+    client_args = dict(client_args)
+    client_args['pretty_json'] = False
+    client_args['rate_limiter'] = rate_limiter
+    _worker_client = pyPDBeREST(**client_args)
+
+
+def _picklable(error):
+    # the error travels back to the parent, so it has to survive pickling
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RestError("%s: %s" % (type(error).__name__, error))
+    return error
+
+
+def _run_task(task):
+    # fetches and post-processes in the worker, so only the final value
+    # is pickled back to the parent; any failure, including one of
+    # 'postprocess', only fails its own task
+    top_name, fun_name, params, postprocess, deadline = task
+    try:
+        value = _worker_client.call_api_func(top_name, fun_name, deadline=deadline, **params)
+        if postprocess is not None:
+            value = postprocess(value)
+    except Exception as error:
+        return CrawlResult(params, None, _picklable(error))
+    return CrawlResult(params, value, None)
+
+
+def _as_params(top_name, fun_name, item):
+    # single values are given to the only mandatory param of the endpoint
+    if isinstance(item, dict):
+        return dict(item)
+    mandatory_params = re.findall(r'\{\{(?P<m>[a-zA-Z_]+)\}\}',
+                                  api_endpoints[top_name][fun_name]['url'])
+    if len(mandatory_params) != 1:
+        raise ValueError("'%s.%s' takes params %s; pass a dict per request"
+                         % (top_name, fun_name, mandatory_params))
+    return {mandatory_params[0]: item}
+
+
+# Multi-process crawl executor
+class CrawlExecutor(object):
+    """
+        Distributes endpoint calls, plus an optional post-processing function,
+        over a pool of worker processes sharing one request budget.
+
+        'postprocess' runs inside the workers and must be picklable
+        (i.e. a module level function). 'deadline' (seconds or a Deadline)
+        bounds a whole map; requests past it fail with RestTimeout.
+
+        Usage:
+            with CrawlExecutor(processes=8) as crawler:
+                for result in crawler.map('PDB', 'getResidueListing', ids,
+                                          postprocess=flatten):
+                    ...
+    """
+
+    def __init__(self, processes=None, reqs_per_sec=15, chunksize=1, **client_args):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunksize = chunksize
+        self.rate_limiter = SharedRateLimiter(reqs_per_sec)
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                         initargs=(self.rate_limiter, client_args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # stops accepting work and waits for the workers to finish
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    # streams CrawlResults back as soon as they are ready (unordered)
+    def map(self, top_name, fun_name, params, postprocess=None, deadline=None):
+        if top_name not in api_endpoints or fun_name not in api_endpoints[top_name]:
+            raise AttributeError("Unknown endpoint '%s.%s'" % (top_name, fun_name))
+        # a point in time, so the workers all share it
+        deadline = Deadline.of(deadline)
+        tasks = ((top_name, fun_name, _as_params(top_name, fun_name, item), postprocess, deadline)
+                 for item in params)
+        for result in self.pool.imap_unordered(_run_task, tasks, self.chunksize):
+            if result.error is not None:
+                logger.debug("'%s.%s' failed for %s: %s"
+                             % (top_name, fun_name, result.params, result.error))
+            yield result
+
+    # folds the values into 'initial' with 'reducer' in the parent process
+    # and returns the aggregate together with the failed CrawlResults
+    def aggregate(self, top_name, fun_name, params, reducer, initial=None,
+                  postprocess=None, deadline=None):
+        accumulator = initial
+        errors = []
+        for result in self.map(top_name, fun_name, params, postprocess=postprocess,
+                               deadline=deadline):
+            if result.error is not None:
+                errors.append(result)
+            else:
+                accumulator = reducer(accumulator, result.value)
+        return accumulator, errors
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Local caching HTTP gateway to the PDBe REST API ('pdberest serve').
+
+    The gateway answers the same paths as config.default_url, so any
+    number of worker processes on a host can share one cache, one
+    connection pool and one request budget by pointing their clients at it:
+
+        $ pdberest serve --port 8765 --cache-dir mirror/ &
+        p = pyPDBeREST(base_url='http://127.0.0.1:8765/')
+
+    Successful responses are cached by (method, path and query, body), in
+    a ResponseCache or in a PackCache directory shared across restarts.
+    Identical requests arriving while one is in flight wait for it instead
+    of going upstream again. With 'negative_ttl', 400 and 404 answers are
+    remembered for that many seconds and repeated without a request. Every
+    response carries an X-Cache header (HIT, MISS or COALESCED); GET
+    /_gateway/stats returns the counters.
+"""
+
+# import system modules
+import json
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+# import pdberest modules
+from .config import default_url, user_agent, negative_status_codes
+from .cache import ResponseCache, get_error, set_error
+from .ratelimit import RateLimiter
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+stats_path = '/_gateway/stats'
+
+
+# one upstream request and the callers waiting for it
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = (502, 'text/plain', b'Upstream request failed')
+
+
+# Shared upstream session, cache and request budget
+class Gateway(object):
+    """
+        Serves (method, path, body) requests from 'cache' or from 'upstream',
+        at most 'reqs_per_sec' upstream requests per second over a pool of
+        'connections' connections. Cached values are [content_type, body]
+        lists, so any cache with the ResponseCache api (including PackCache)
+        can hold them.
+    """
+
+    def __init__(self, upstream=default_url, cache=None, reqs_per_sec=15, connections=32,
+                 timeout=60, negative_ttl=None):
+        self.upstream = upstream.rstrip('/') + '/'
+        self.negative_ttl = negative_ttl
+        self.cache = cache if cache is not None else ResponseCache(max_entries=100000)
+        self.rate_limiter = RateLimiter(reqs_per_sec)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(user_agent)
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = {'requests': 0, 'hits': 0, 'misses': 0, 'coalesced': 0,
+                      'upstream_errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _upstream(self, method, path, body, content_type):
+        self.rate_limiter.acquire()
+        url = self.upstream + path.lstrip('/')
+        logger.info("Forwarding %s '%s'" % (method, url))
+        try:
+            resp = self.session.request(method, url, data=body or None, timeout=self.timeout,
+                                        headers={'Content-Type': content_type})
+        except requests.RequestException as error:
+            logger.warning("Upstream request for '%s' failed: %s" % (url, error))
+            self._count('upstream_errors')
+            return 502, 'text/plain', b'Upstream request failed'
+        return (resp.status_code, resp.headers.get('Content-Type', 'application/json'),
+                resp.content)
+
+    def fetch(self, method, path, body=b'', content_type='application/json'):
+        """
+            (status, content type, body bytes, 'HIT' | 'MISS' | 'COALESCED')
+            of a request; only 200 responses (and, with 'negative_ttl', the
+            status of 400/404 ones) are cached.
+        """
+
+        self._count('requests')
+        key = (method, path, body.decode('utf-8'))
+        try:
+            cached_type, cached_body = self.cache.get(key)
+        except KeyError:
+            pass
+        else:
+            self._count('hits')
+            return 200, cached_type, cached_body.encode('utf-8'), 'HIT'
+        if self.negative_ttl is not None:
+            status = get_error(self.cache, key, self.negative_ttl)
+            if status is not None:
+                self._count('hits')
+                return status, 'application/json', b'{}', 'HIT'
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            self._count('coalesced')
+            return flight.result + ('COALESCED',)
+
+        self._count('misses')
+        try:
+            flight.result = self._upstream(method, path, body, content_type)
+            status, response_type, response_body = flight.result
+            if status == 200:
+                self.cache.set(key, [response_type, response_body.decode('utf-8')])
+            elif self.negative_ttl is not None and status in negative_status_codes:
+                set_error(self.cache, key, status)
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result + ('MISS',)
+
+
+# Request handler, one thread per connection
+class GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, content_type, body, source=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if source is not None:
+            self.send_header('X-Cache', source)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _forward(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        content_type = self.headers.get('Content-Type', 'application/json')
+        self._reply(*self.server.gateway.fetch(method, self.path, body, content_type))
+
+    def do_GET(self):
+        if self.path == stats_path:
+            with self.server.gateway._lock:
+                stats = dict(self.server.gateway.stats)
+            self._reply(200, 'application/json', json.dumps(stats).encode('utf-8'))
+        else:
+            self._forward('GET')
+
+    def do_POST(self):
+        self._forward('POST')
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+
+class GatewayServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, gateway):
+        HTTPServer.__init__(self, address, GatewayHandler)
+        self.gateway = gateway
+
+
+def make_server(gateway, host='127.0.0.1', port=8765):
+    # bound server; call serve_forever() on it (port 0 picks a free port)
+    return GatewayServer((host, port), gateway)
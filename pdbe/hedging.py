@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Hedged GET requests, against the occasional slow backend replica.
+
+        p = pyPDBeREST(hedge=Hedger(percentile=95, budget=0.05))
+
+    When a GET has not completed within the 'percentile' of the latencies
+    recently observed for its endpoint, a second identical request is
+    sent and the first response to arrive is used. Hedges are limited to
+    'budget' times the number of requests, so the extra load stays within
+    that fraction; no hedging happens before 'min_samples' latencies of an
+    endpoint are known. Hedges draw from the client's request budget like
+    any other request.
+
+    A request cannot be aborted once sent: the losing one is cancelled if
+    it has not started yet, otherwise its response is closed as soon as it
+    arrives.
+"""
+
+# import system modules
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+def _close(future):
+    # releases the connection of a response nobody is going to read
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+# Hedging of slow GET requests
+class Hedger(object):
+    """
+        Runs GET requests in its own thread pool ('max_workers' requests at
+        a time, hedges included). One Hedger can be shared by several clients.
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_samples=20, window=1000,
+                 max_workers=32):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay(self, endpoint):
+        # seconds after which a request to 'endpoint' is hedged, None if unknown yet
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(self.percentile / 100.0 * len(latencies)))]
+
+    def _take_budget(self):
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, endpoint, session, url, kwargs, acquire=None):
+        if acquire is not None:
+            acquire()
+        start = time.time()
+        resp = session.get(url, **kwargs)
+        self.record(endpoint, time.time() - start)
+        return resp
+
+    def get(self, session, endpoint, url, acquire=None, deadline=None, **kwargs):
+        """
+            session.get(url, **kwargs), hedged. 'endpoint' names the latency
+            series ((top_name, fun_name)); 'acquire' is called before a
+            hedge is sent (the rate limit of the client). No hedge is sent
+            past 'deadline', and its timeout is cut to the time left.
+        """
+
+        with self._lock:
+            self.requests += 1
+        delay = self.delay(endpoint)
+        primary = self._pool.submit(self._timed, endpoint, session, url, kwargs)
+        if delay is None:
+            return primary.result()
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        hedge_kwargs = kwargs
+        if deadline is not None:
+            if deadline.expires <= time.time():
+                return primary.result()
+            hedge_kwargs = dict(kwargs, timeout=deadline.clamp(kwargs.get('timeout')))
+        if not self._take_budget():
+            return primary.result()
+
+        logger.info("Hedging '%s' after %.0f ms" % (url, delay * 1000))
+        hedge = self._pool.submit(self._timed, endpoint, session, url, hedge_kwargs, acquire)
+        pending = set([primary, hedge])
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for other in pending:
+                    if not other.cancel():
+                        other.add_done_callback(_close)
+                if future is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return future.result()
+        raise error
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
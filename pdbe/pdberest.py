@@ -24,12 +24,17 @@ import re
 import json
 import time
 import logging
+import threading
 import requests
 
 # import pdberest modules
-from .config import (default_url, api_endpoints, http_status_codes,
-                     user_agent, content_type, api_version)
-from .exceptions import RestError, RestRateLimitError, RestServiceUnavailable
+from .config import (default_url, api_endpoints, http_status_codes, negative_status_codes,
+                     user_agent, content_type, api_version, prefetch_profiles, request_timeouts,
+                     post_vars)
+from .exceptions import RestError, RestRateLimitError, RestServiceUnavailable, RestTimeout
+from .deadline import Deadline
+from .cache import ResponseCache, request_key, get_error, set_error
+from .jsonbackend import get_backend
 
 # Logger instance
 logger = logging.getLogger(__name__)
@@ -48,6 +53,7 @@ class pyPDBeREST(object):
         self.reqs_per_sec = 15
         self.req_count = 0
         self.last_req = 0
+        self._lock = threading.Lock()
         # request response object
         self.response = None
 
@@ -98,46 +104,84 @@ class pyPDBeREST(object):
         # update headers as already exist within client
         self.session.headers.update(self.session_args.pop('headers'))
 
+        # optional request budget shared with other clients (see ratelimit.py)
+        self.rate_limiter = self.session_args.pop('rate_limiter', None)
+
+        # (connect, read) timeouts per 'default', namespace or (namespace, endpoint)
+        self.timeouts = dict(request_timeouts)
+        self.timeouts.update(self.session_args.pop('timeouts', None) or {})
+
+        # optional response cache (see cache.py) and speculative prefetch of
+        # related endpoints into it (prefetch=True uses config.prefetch_profiles)
+        self.cache = self.session_args.pop('cache', None)
+        self.prefetcher = None
+        prefetch = self.session_args.pop('prefetch', None)
+        if prefetch:
+            if self.cache is None:
+                self.cache = ResponseCache()
+            if prefetch is True:
+                prefetch = prefetch_profiles
+            from .prefetch import Prefetcher
+            self.prefetcher = Prefetcher(self, prefetch)
+
+        # optional freshness policies: stale-while-revalidate and
+        # stale-if-error per endpoint (see policy.py)
+        self.cache_policies = None
+        cache_policy = self.session_args.pop('cache_policy', None)
+        if cache_policy is not None:
+            if self.cache is None:
+                self.cache = ResponseCache()
+            from .policy import CachePolicies
+            self.cache_policies = CachePolicies(self, cache_policy)
+
+        # optional hedging of slow GET requests (hedge=True, or a Hedger,
+        # see hedging.py)
+        self.hedger = self.session_args.pop('hedge', None)
+        self._own_hedger = self.hedger is True
+        if self.hedger is True:
+            from .hedging import Hedger
+            self.hedger = Hedger()
+
+        # seconds for which 400/404 answers are remembered in the cache and
+        # raised again without a request (None: not cached)
+        self.negative_ttl = self.session_args.pop('negative_ttl', None)
+        if self.negative_ttl is not None and self.cache is None:
+            self.cache = ResponseCache()
+
+        # json decoder for the responses ('auto', 'orjson', 'ujson', 'simdjson' or 'json')
+        self.json_backend = get_backend(self.session_args.pop('json_backend', None))
+
+        # optional interning of repeated keys and short strings while decoding
+        # (intern_table=True, or an InternTable shared between clients)
+        self.intern_table = self.session_args.pop('intern_table', None)
+        if self.intern_table is True:
+            from .interning import InternTable
+            self.intern_table = InternTable()
+
         # store the name of all available top level endpoints
         self.values = [n for n in api_endpoints.keys()]
 
-        # iterate over api_endpoints keys and add key to class namespace
+        # add one namespace object per top level endpoint; the namespace classes
+        # are built once per process and shared by all the clients
         for top_name in api_endpoints.keys():
-            # generate a new class object for each top level endpoint
-            values = [n for n in api_endpoints[top_name].keys()]
-            subclass = type(top_name, (object,), {'endpoints': _get_endpoints,
-                                                  'values': values})
-            # initiate the new subclass
-            subclass = subclass()
-            # populate it into the baseclass
-            self.__dict__[top_name] = subclass
-            self.__dict__[top_name].__name__ = top_name
-
-            for fun_name in api_endpoints[top_name].keys():
-                # setattr(self, key, self.register_api_func(key))
-                # not as a class attribute, but a class method
-                subclass.__dict__[fun_name] = self.register_api_func(top_name, fun_name)
-
-                # add function name to the class methods
-                subclass.__dict__[fun_name].__name__ = fun_name
-
-                # set __doc__ for generic class method
-                if "doc" in api_endpoints[top_name][fun_name]:
-                    subclass.__dict__[fun_name].__doc__ = api_endpoints[top_name][fun_name]["doc"]
-
-                # add special attributes - access to full func record
-                subclass.__dict__[fun_name].__full__ = api_endpoints[top_name][fun_name]
-
-                if "url" in api_endpoints[top_name][fun_name]:
-                    subclass.__dict__[fun_name].url = api_endpoints[top_name][fun_name]['url']
-                if "method" in api_endpoints[top_name][fun_name]:
-                    subclass.__dict__[fun_name].method = api_endpoints[top_name][fun_name]['method']
-                if "doc" in api_endpoints[top_name][fun_name]:
-                    subclass.__dict__[fun_name].doc = api_endpoints[top_name][fun_name]['doc']
-                if "var" in api_endpoints[top_name][fun_name]:
-                    subclass.__dict__[fun_name].var = api_endpoints[top_name][fun_name]['var']
-                if "content_type" in api_endpoints[top_name][fun_name]:
-                    subclass.__dict__[fun_name].content_type = api_endpoints[top_name][fun_name]['content_type']
+            self.__dict__[top_name] = _namespace_class(top_name)(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # stops the background prefetch, revalidation and hedging threads and
+    # closes the session (a Hedger passed in by the caller is left running)
+    def close(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.cache_policies is not None:
+            self.cache_policies.shutdown()
+        if self.hedger is not None and self._own_hedger:
+            self.hedger.shutdown()
+        self.session.close()
 
     # gets the available endpoints implemented in the PDBe REST API
     def endpoints(self):
@@ -145,25 +189,40 @@ class pyPDBeREST(object):
 
     # dynamic api registration function
     def register_api_func(self, top_name, fun_name):
-        return lambda **kwargs: self.call_api_func(top_name, fun_name, **kwargs)
+        return EndpointFunction(self, top_name, fun_name)
 
     # dynamic api call function
     def call_api_func(self, top_name, fun_name, **kwargs):
+        content = self.call_api_data(top_name, fun_name, **kwargs)
+        if self.session.pretty_json and kwargs.get('returns', 'json') == 'json':
+            content = json.dumps(content, sort_keys=False, indent=4)
+        return content
 
-        # variables
-        data = ''
+    # same as call_api_func but always returns the decoded json
+    # (or typed records with returns='model', see models.py)
+    def call_api_data(self, top_name, fun_name, **kwargs):
 
         # overriding general request method if it is specified in the function call
-        if 'method' in kwargs:
-            self.session.method = (kwargs['method']).upper()
-        else:
-            self.session.method = 'GET'
+        method = kwargs.pop('method', 'GET').upper()
+        self.session.method = method
+
+        # return mode: decoded json or typed models
+        returns = kwargs.pop('returns', 'json')
+
+        # time limit of the whole call (seconds or a Deadline, see deadline.py)
+        deadline = Deadline.of(kwargs.pop('deadline', None))
+        if returns not in ('json', 'model'):
+            raise ValueError("returns must be 'json' or 'model', not '%s'" % returns)
+        if returns == 'model':
+            # checked before any request is made
+            from .models import model_builder
+            builder = model_builder(top_name, fun_name)
 
         # build url from api_endpoint kwargs
         func = api_endpoints[top_name][fun_name]
 
         # verify required variables and raise an Exception if needed
-        mandatory_params = re.findall('\{\{(?P<m>[a-zA-Z_]+)\}\}', func['url'])
+        mandatory_params = re.findall(r'\{\{(?P<m>[a-zA-Z_]+)\}\}', func['url'])
 
         # check up mandatory parameters
         for param in mandatory_params:
@@ -174,103 +233,277 @@ class pyPDBeREST(object):
 
         # also check for unrecognised parameters
         for param in kwargs:
-            # skip the parameter 'method'
-            if param not in mandatory_params and param != 'method':
+            if param not in mandatory_params:
                 logger.debug("'%s' param not recognised. Mandatory params are %s"
                              % (param, mandatory_params))
                 raise Exception("mandatory param '%s' not specified" % param)
 
+        # related endpoints start loading while this one is being served
+        if self.prefetcher is not None:
+            self.prefetcher.trigger(top_name, fun_name, method, kwargs)
+
+        # serve from the cache when possible
+        key = None
+        content = None
+        if self.cache is not None:
+            key = request_key(top_name, fun_name, method, kwargs)
+            if self.prefetcher is not None:
+                self.prefetcher.wait(key)
+            try:
+                content = self.cache.get(key)
+            except KeyError:
+                pass
+            else:
+                logger.info("Cache hit for '%s.%s' %s" % (top_name, fun_name, kwargs))
+                if self.cache_policies is not None:
+                    content = self.cache_policies.check(top_name, fun_name, method, kwargs,
+                                                        key, content)
+            # EMDB property groups can be cut out of a cached 'all' response
+            if content is None and (top_name, fun_name) == ('EMDB', 'getInfo') and method == 'GET':
+                from .emdb import from_cached_all
+                content = from_cached_all(self.cache, kwargs['emdbid'], kwargs['property'])
+            # requests known to fail raise again without touching the network
+            if content is None and self.negative_ttl is not None:
+                status_code = get_error(self.cache, key, self.negative_ttl)
+                if status_code is not None:
+                    logger.info("Cached %d for '%s.%s' %s" % (status_code, top_name, fun_name,
+                                                              kwargs))
+                    raise status_error(status_code)
+
+        if content is None:
+            if self.cache_policies is not None:
+                content = self.cache_policies.fetch(top_name, fun_name, method, kwargs, key,
+                                                    deadline=deadline)
+            else:
+                content = self.fetch_api_func(top_name, fun_name, method, kwargs, key=key,
+                                              deadline=deadline)
+        if returns == 'model':
+            content = builder(content)
+        return content
+
+    # blocks until the next request may be sent, RestTimeout if that is past the deadline
+    def _acquire(self, deadline=None):
+        expires = deadline.expires if deadline is not None else None
+        # evaluating the number of request in a second (according to EnsEMBL rest specification)
+        if self.rate_limiter is not None:
+            if not self.rate_limiter.acquire(expires):
+                raise RestTimeout("Rate limit wait would pass the deadline")
+        else:
+            with self._lock:
+                if self.req_count >= self.reqs_per_sec:
+                    delta = time.time() - self.last_req
+                    if delta < 1:
+                        if expires is not None and time.time() + 1 - delta > expires:
+                            raise RestTimeout("Rate limit wait would pass the deadline")
+                        time.sleep(1 - delta)
+                    self.last_req = time.time()
+                    self.req_count = 0
+                # increment the request counter to rate limit requests
+                self.req_count += 1
+
+    # connect/read timeout of a request, cut to what is left of 'deadline'
+    def _timeout(self, top_name, fun_name, deadline=None):
+        timeout = self.timeouts.get((top_name, fun_name),
+                                    self.timeouts.get(top_name, self.timeouts.get('default')))
+        if deadline is not None:
+            timeout = deadline.clamp(timeout)
+        return timeout
+
+    # does the actual request (bypassing any cache lookup) and returns the decoded json;
+    # the result is stored in the cache under 'key' if one is given
+    def fetch_api_func(self, top_name, fun_name, method, kwargs, key=None, deadline=None):
+
+        # variables
+        data = ''
+        func = api_endpoints[top_name][fun_name]
+        mandatory_params = re.findall(r'\{\{(?P<m>[a-zA-Z_]+)\}\}', func['url'])
+
         # get formatted urls
-        if self.session.method == 'GET':
-            url = re.sub('\{\{(?P<m>[a-zA-Z_]+)\}\}', lambda m: "%s" % kwargs.get(m.group(1)),
+        if method == 'GET':
+            url = re.sub(r'\{\{(?P<m>[a-zA-Z_]+)\}\}', lambda m: "%s" % kwargs.get(m.group(1)),
                          self.session.base_url + func['url'])
-        elif self.session.method == 'POST':
-            url = re.sub('\{\{(?P<m>[a-zA-Z_]+)\}\}', '', self.session.base_url + func['url'])
+        elif method == 'POST':
+            url = re.sub(r'\{\{(?P<m>[a-zA-Z_]+)\}\}', '', self.session.base_url + func['url'])
 
             # hard-coding here that the data for all post requets are given through the
             # pdbid or compid attribute
-            for key in kwargs:
-                if key in ('pdbid', 'compid'):
-                    data = kwargs[key]
+            for name in kwargs:
+                if name in post_vars:
+                    data = kwargs[name]
         else:
             raise NotImplementedError("Method '%s' not yet implemented. Available methods are: '%s'"
-                                      % (self.session.method, "', '".join(func['method'])))
+                                      % (method, "', '".join(func['method'])))
 
         # logging url
         logger.info("Resolved url: '%s'" % url)
 
         # now remove mandatory params from kwargs (because of get requests)
-        # the url is already constructed and we don't need them in **kwargs
-        for param in mandatory_params:
-            del (kwargs[param])
+        # the url is already constructed and we don't need them in params
+        params = dict((k, v) for k, v in kwargs.items() if k not in mandatory_params)
 
-        # evaluating the number of request in a second (according to EnsEMBL rest specification)
-        if self.req_count >= self.reqs_per_sec:
-            delta = time.time() - self.last_req
-            if delta < 1:
-                time.sleep(1 - delta)
-            self.last_req = time.time()
-            self.req_count = 0
+        self._acquire(deadline)
+        timeout = self._timeout(top_name, fun_name, deadline)
 
         # check the request type (GET or POST)
-        if self.session.method in func['method'] and self.session.method == 'GET':
+        if method in func['method'] and method == 'GET':
             logger.info("Submitting a GET request. url = '%s', headers = %s, params = %s" % (
-                url, {"Content-Type": func['content_type']}, kwargs))
+                url, {"Content-Type": func['content_type']}, params))
             # do get request
             try:
-                resp = self.session.get(url, headers={"Content-Type": func['content_type']}, params=kwargs)
+                if self.hedger is not None:
+                    resp = self.hedger.get(self.session, (top_name, fun_name), url,
+                                           acquire=lambda: self._acquire(deadline),
+                                           deadline=deadline, timeout=timeout,
+                                           headers={"Content-Type": func['content_type']},
+                                           params=params)
+                else:
+                    resp = self.session.get(url, headers={"Content-Type": func['content_type']},
+                                            params=params, timeout=timeout)
+            except requests.Timeout:
+                raise RestTimeout("No answer from '%s' within %s s" % (url, timeout))
             except requests.ConnectionError:
                 # making fake 500 status response
                 resp = type('resp', (object,), {'status_code': 500})
                 resp = resp()
 
-        elif self.session.method in func['method'] and self.session.method == 'POST':
+        elif method in func['method'] and method == 'POST':
             logger.info("Submitting a POST request. url = '%s', data = '%s', headers = %s, params = %s" % (
-                url, data, {"Content-Type": func['content_type']}, kwargs))
+                url, data, {"Content-Type": func['content_type']}, params))
             # do post the request
             try:
-                resp = self.session.post(url, headers={"Content-Type": func['content_type']}, data=data)
+                resp = self.session.post(url, headers={"Content-Type": func['content_type']}, data=data,
+                                         timeout=timeout)
+            except requests.Timeout:
+                raise RestTimeout("No answer from '%s' within %s s" % (url, timeout))
             except requests.ConnectionError:
                 # making fake 500 status response
                 resp = type('resp', (object,), {'status_code': 500})
                 resp = resp()
         else:
             raise NotImplementedError("Method '%s' not yet implemented. Available methods are: '%s'"
-                                      % (self.session.method, "', '".join(func['method'])))
+                                      % (method, "', '".join(func['method'])))
 
         # update response attribute
         self.response = resp
 
-        # increment the request counter to rate limit requests
-        self.req_count += 1
-
         # parse status codes
         if resp.status_code > 304:
-            ExceptionType = RestError
-            if resp.status_code == 429:
-                ExceptionType = RestRateLimitError
-            elif resp.status_code > 500:
-                ExceptionType = RestServiceUnavailable
-
-            # if the the error code is not yet documented in http_status_code
-            try:
-                doc = http_status_codes[resp.status_code][1]
-            except KeyError:
-                # gets a status based on the preceding value i.e. 405 codes assume message of 400
-                if resp.status_code < 500:
-                    doc = http_status_codes[400][1]
-                else:
-                    doc = http_status_codes[500][1]
-            raise ExceptionType(doc, error_code=resp.status_code)
+            if key is not None and self.cache is not None and self.negative_ttl is not None \
+                    and resp.status_code in negative_status_codes:
+                set_error(self.cache, key, resp.status_code)
+            raise status_error(resp.status_code)
 
-        if self.session.pretty_json:
-            content = json.dumps(resp.json(), sort_keys=False, indent=4)
+        if self.intern_table is not None:
+            content = self.intern_table.loads(resp.text)
         else:
-            content = resp.json()
+            content = self.json_backend.loads(resp.content)
+        if key is not None and self.cache is not None:
+            self.cache.set(key, content)
         return content
 
 
+def status_error(status_code):
+    # the exception raised for an error status code
+    ExceptionType = RestError
+    if status_code == 429:
+        ExceptionType = RestRateLimitError
+    elif status_code > 500:
+        ExceptionType = RestServiceUnavailable
+
+    # if the the error code is not yet documented in http_status_code
+    try:
+        doc = http_status_codes[status_code][1]
+    except KeyError:
+        # gets a status based on the preceding value i.e. 405 codes assume message of 400
+        if status_code < 500:
+            doc = http_status_codes[400][1]
+        else:
+            doc = http_status_codes[500][1]
+    return ExceptionType(doc, error_code=status_code)
+
+
 def _get_endpoints(base):
     # print out formatted list of available endpoints
     return ('The following endpoints are available:\n    %s'
             % '\n    '.join(base.values))
+
+
+# Generated endpoint function
+class EndpointFunction(object):
+    """
+        Callable bound to a client, e.g. p.PDB.getSummary(pdbid='1cbs').
+        Its __doc__ is the endpoint documentation; the rest of the endpoint
+        metadata (url, method, var, content_type and the full record in
+        __full__) is only looked up in config.api_endpoints when accessed.
+    """
+
+    def __init__(self, client, top_name, fun_name):
+        self.client = client
+        self.top_name = top_name
+        self.fun_name = fun_name
+        # for help() on the endpoint, the class docstring stays in place
+        self.__doc__ = api_endpoints[top_name][fun_name].get('doc')
+
+    def __call__(self, **kwargs):
+        return self.client.call_api_func(self.top_name, self.fun_name, **kwargs)
+
+    def __repr__(self):
+        return '<endpoint %s.%s>' % (self.top_name, self.fun_name)
+
+    @property
+    def __full__(self):
+        return api_endpoints[self.top_name][self.fun_name]
+
+    def _meta(self, name):
+        try:
+            return self.__full__[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    __name__ = property(lambda self: self.fun_name)
+    doc = property(lambda self: self._meta('doc'))
+    url = property(lambda self: self._meta('url'))
+    method = property(lambda self: self._meta('method'))
+    var = property(lambda self: self._meta('var'))
+    content_type = property(lambda self: self._meta('content_type'))
+
+
+# Descriptor creating the endpoint functions of a namespace on first access
+class _EndpointDescriptor(object):
+
+    def __init__(self, fun_name):
+        self.fun_name = fun_name
+
+    def __get__(self, namespace, owner):
+        if namespace is None:
+            return self
+        function = EndpointFunction(namespace._client, owner.__name__, self.fun_name)
+        # cached on the instance, which takes precedence from now on
+        namespace.__dict__[self.fun_name] = function
+        return function
+
+
+# Base class of the top level namespaces (PDB, COMPOUNDS, ...)
+class _Namespace(object):
+
+    endpoints = _get_endpoints
+
+    def __init__(self, client):
+        self._client = client
+
+
+# namespace classes built so far, shared by all the clients of the process
+_namespace_classes = {}
+
+
+def _namespace_class(top_name):
+    try:
+        return _namespace_classes[top_name]
+    except KeyError:
+        pass
+    attributes = {'values': [n for n in api_endpoints[top_name].keys()],
+                  '__name__': top_name}
+    for fun_name in api_endpoints[top_name].keys():
+        attributes[fun_name] = _EndpointDescriptor(fun_name)
+    cls = _namespace_classes[top_name] = type(top_name, (_Namespace,), attributes)
+    return cls
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    Freshness policies for cached responses, for callers that prefer a
+    slightly old answer to a slow or failed one.
+
+        summaries = CachePolicy(max_age=3600, stale_while_revalidate=86400,
+                                stale_if_error=7 * 86400)
+        p = pyPDBeREST(cache=ResponseCache(),
+                       cache_policy={('PDB', 'getSummary'): summaries})
+
+    A cached response younger than 'max_age' is served as is. Up to
+    'stale_while_revalidate' seconds later it is still served at once, and
+    a refresh runs in the background. When fetching fails with a 5xx (or no
+    connection), a cached copy up to 'stale_if_error' seconds past
+    'max_age' is served instead of raising.
+
+    The age of a response is counted from the time it was stored, kept
+    under cache.stored_key(key) (from the time it was first seen for
+    responses cached by other means). The cache itself should not expire
+    entries sooner (no 'ttl' shorter than the longest staleness).
+"""
+
+# import system modules
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# import pdberest modules
+from .cache import stored_key
+from .exceptions import RestError
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+# Freshness of the cached responses of an endpoint
+class CachePolicy(object):
+
+    def __init__(self, max_age, stale_while_revalidate=0, stale_if_error=0):
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+
+    def __repr__(self):
+        return ('CachePolicy(max_age=%r, stale_while_revalidate=%r, stale_if_error=%r)'
+                % (self.max_age, self.stale_while_revalidate, self.stale_if_error))
+
+
+# Applies CachePolicies to the cache of a client
+class CachePolicies(object):
+    """
+        'policies' is a CachePolicy for every endpoint, or a dict of
+        {(top_name, fun_name): CachePolicy}; endpoints without one are
+        cached as usual.
+    """
+
+    def __init__(self, client, policies, workers=2):
+        self.client = client
+        self.policies = policies
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._refreshing = {}
+
+    def policy(self, top_name, fun_name):
+        if isinstance(self.policies, CachePolicy):
+            return self.policies
+        return self.policies.get((top_name, fun_name))
+
+    def _age(self, key):
+        cache = self.client.cache
+        try:
+            stored = cache.get(stored_key(key))
+        except KeyError:
+            # cached by someone else (e.g. a prefetch); its age starts now
+            stored = time.time()
+            cache.set(stored_key(key), stored)
+        return time.time() - stored
+
+    def _store(self, top_name, fun_name, method, params, key, deadline=None):
+        content = self.client.fetch_api_func(top_name, fun_name, method, dict(params), key=key,
+                                             deadline=deadline)
+        self.client.cache.set(stored_key(key), time.time())
+        return content
+
+    def _refresh(self, top_name, fun_name, method, params, key):
+        try:
+            self._store(top_name, fun_name, method, params, key)
+        except RestError as error:
+            logger.warning("Background refresh of '%s.%s' %s failed: %s"
+                           % (top_name, fun_name, params, error))
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def _revalidate(self, top_name, fun_name, method, params, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            self._refreshing[key] = self._pool.submit(self._refresh, top_name, fun_name,
+                                                      method, params, key)
+
+    # the cached 'content' if the policy allows serving it, else None
+    def check(self, top_name, fun_name, method, params, key, content):
+        policy = self.policy(top_name, fun_name)
+        if policy is None:
+            return content
+        age = self._age(key)
+        if age <= policy.max_age:
+            return content
+        if age <= policy.max_age + policy.stale_while_revalidate:
+            logger.info("Serving '%s.%s' %s %.0f s stale, refreshing"
+                        % (top_name, fun_name, params, age - policy.max_age))
+            self._revalidate(top_name, fun_name, method, params, key)
+            return content
+        return None
+
+    # fetches a request, falling back to a stale copy on server errors
+    def fetch(self, top_name, fun_name, method, params, key, deadline=None):
+        policy = self.policy(top_name, fun_name)
+        if policy is None:
+            return self.client.fetch_api_func(top_name, fun_name, method, params, key=key,
+                                              deadline=deadline)
+        try:
+            return self._store(top_name, fun_name, method, params, key, deadline)
+        except RestError as error:
+            if error.error_code is None or error.error_code < 500 or not policy.stale_if_error:
+                raise
+            try:
+                content = self.client.cache.get(key)
+            except KeyError:
+                raise error
+            age = self._age(key)
+            if age > policy.max_age + policy.stale_if_error:
+                raise
+            logger.warning("Serving '%s.%s' %s %.0f s stale after: %s"
+                           % (top_name, fun_name, params, age - policy.max_age, error))
+            return content
+
+    # blocks until the background refreshes have finished
+    def wait(self):
+        with self._lock:
+            futures = list(self._refreshing.values())
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# import pdberest modules
+from .cache import request_key, get_error
+from .canonical import canonical_value
+from .exceptions import RestError
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+# Speculative prefetch of related endpoints
+class Prefetcher(object):
+    """
+        Fetches a profile of related endpoints into the client cache as soon
+        as the first call for an identifier arrives.
+
+        'profiles' maps a var name (e.g. 'pdbid') to a list of
+        (top_name, fun_name) endpoints taking only that var
+        (see config.prefetch_profiles). Identifiers are only prefetched once
+        ('max_seen' most recent ones are remembered).
+    """
+
+    def __init__(self, client, profiles, workers=5, max_seen=10000):
+        self.client = client
+        self.profiles = profiles
+        self.max_seen = max_seen
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._inflight = {}
+        self._closed = False
+
+    # starts prefetching the profile for any profiled var in 'params'
+    def trigger(self, top_name, fun_name, method, params):
+        if method != 'GET':
+            return
+        try:
+            self._trigger(top_name, fun_name, params)
+        except Exception as error:
+            # the call that triggered the prefetch goes ahead regardless
+            logger.warning("Prefetch for '%s.%s' %s not started: %r"
+                           % (top_name, fun_name, params, error))
+
+    def _trigger(self, top_name, fun_name, params):
+        for var, endpoints in self.profiles.items():
+            value = params.get(var)
+            if value is None:
+                continue
+            value = canonical_value(var, value)
+            if not self._first_time(var, value):
+                continue
+            for prefetch_top, prefetch_fun in endpoints:
+                if (prefetch_top, prefetch_fun) == (top_name, fun_name):
+                    continue
+                self._submit(prefetch_top, prefetch_fun, {var: value})
+
+    # blocks until a prefetch of 'key' (if any) has finished; a failed
+    # prefetch never fails the caller, who then fetches it again
+    def wait(self, key):
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                future.result()
+            except Exception as error:
+                logger.debug("Prefetch of %s failed: %r" % (key, error))
+
+    # stops prefetching and waits for the running prefetches to finish
+    def close(self, wait=True):
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=wait)
+
+    def _first_time(self, var, value):
+        with self._lock:
+            if (var, value) in self._seen:
+                return False
+            self._seen[(var, value)] = True
+            if len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+        return True
+
+    def _submit(self, top_name, fun_name, params):
+        key = request_key(top_name, fun_name, 'GET', params)
+        with self._lock:
+            if self._closed or key in self._inflight or key in self.client.cache:
+                return
+            if self.client.negative_ttl is not None and \
+                    get_error(self.client.cache, key, self.client.negative_ttl) is not None:
+                return
+            self._inflight[key] = self._pool.submit(self._fetch, top_name, fun_name, params, key)
+
+    def _fetch(self, top_name, fun_name, params, key):
+        try:
+            self.client.fetch_api_func(top_name, fun_name, 'GET', dict(params), key=key)
+        except RestError as error:
+            # not every endpoint applies to every entry; a real call will raise
+            logger.debug("Prefetch of '%s.%s' %s failed: %s" % (top_name, fun_name, params, error))
+        except Exception as error:
+            logger.warning("Prefetch of '%s.%s' %s failed unexpectedly: %r"
+                           % (top_name, fun_name, params, error))
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import time
+import threading
+import multiprocessing
+
+
+# Request budget shared by all the threads of one process
+class RateLimiter(object):
+    """
+        Spaces out requests so that no more than 'reqs_per_sec' are issued
+        per second, whichever thread is asking.
+    """
+
+    def __init__(self, reqs_per_sec=15):
+        self.reqs_per_sec = reqs_per_sec
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    # reserves the next free slot and returns the time it starts at; a slot
+    # later than 'deadline' is not reserved and None is returned instead
+    def _reserve(self, now, deadline=None):
+        with self._lock:
+            slot = max(now, self._next_slot)
+            if deadline is not None and slot > deadline:
+                return None
+            self._next_slot = slot + 1.0 / self.reqs_per_sec
+        return slot
+
+    # blocks until the caller is allowed to issue a request; returns False
+    # at once if that would be later than 'deadline' (a time.time() value)
+    def acquire(self, deadline=None):
+        now = time.time()
+        slot = self._reserve(now, deadline)
+        if slot is None:
+            return False
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+
+# Request budget shared by several processes (e.g. a multiprocessing.Pool)
+class SharedRateLimiter(RateLimiter):
+    """
+        Same as RateLimiter but the next free slot lives in shared memory,
+        so the budget holds across all the processes the limiter is passed to.
+        It must be handed to child processes at creation time
+        (e.g. through a Pool initializer).
+    """
+
+    def __init__(self, reqs_per_sec=15):
+        self.reqs_per_sec = reqs_per_sec
+        self._lock = multiprocessing.Lock()
+        self._next = multiprocessing.Value('d', 0.0, lock=False)
+
+    def _reserve(self, now, deadline=None):
+        with self._lock:
+            slot = max(now, self._next.value)
+            if deadline is not None and slot > deadline:
+                return None
+            self._next.value = slot + 1.0 / self.reqs_per_sec
+        return slot
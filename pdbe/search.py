@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from urllib import urlencode
+except ImportError:
+    # python 3
+    from urllib.parse import urlencode
+
+# import pdberest modules
+from .deadline import Deadline
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+def build_query(q, start=0, rows=10, fl=None, **solr_params):
+    # Solr query string for SEARCH.getSearch (always asking for json)
+    params = [('q', q), ('wt', 'json'), ('start', start), ('rows', rows)]
+    if fl:
+        if not isinstance(fl, str):
+            fl = ','.join(fl)
+        params.append(('fl', fl))
+    params.extend(sorted(solr_params.items()))
+    return urlencode(params)
+
+
+def _fetch_page(client, q, start, rows, fl, solr_params, deadline=None):
+    query = build_query(q, start=start, rows=rows, fl=fl, **solr_params)
+    return client.call_api_data('SEARCH', 'getSearch', query=query,
+                                deadline=deadline)['response']
+
+
+def count_search(client, q, deadline=None, **solr_params):
+    # number of documents matching 'q'
+    return _fetch_page(client, q, 0, 0, None, solr_params, Deadline.of(deadline))['numFound']
+
+
+def iter_search(client, q, fl=None, rows=500, workers=4, max_docs=None, deadline=None,
+                **solr_params):
+    """
+        Streams the documents matching the Solr query 'q'.
+
+        The first page gives 'numFound'; the remaining pages are then fetched
+        by 'workers' threads, at most 2 * workers pages ahead of the consumer,
+        and yielded in order. 'fl' (a list or comma-separated string) restricts
+        the returned fields to cut the payload size. 'deadline' (seconds
+        or a Deadline, counted from the first document asked for) bounds
+        all the pages; a page past it raises RestTimeout.
+
+        Usage:
+            for doc in iter_search(p, 'molecule_name:lysozyme', fl=['pdb_id', 'entity_id']):
+                ...
+    """
+
+    deadline = Deadline.of(deadline)
+    first = _fetch_page(client, q, 0, rows, fl, solr_params, deadline)
+    total = first['numFound']
+    if max_docs is not None:
+        total = min(total, max_docs)
+    logger.info("Search '%s' matched %d documents" % (q, first['numFound']))
+
+    emitted = 0
+    for doc in first['docs']:
+        if emitted >= total:
+            return
+        yield doc
+        emitted += 1
+
+    starts = iter(range(rows, total, rows))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for start in starts:
+            pending.append(pool.submit(_fetch_page, client, q, start, rows, fl, solr_params,
+                                       deadline))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            page = pending.popleft().result()
+            for start in starts:
+                pending.append(pool.submit(_fetch_page, client, q, start, rows, fl, solr_params,
+                                           deadline))
+                break
+            for doc in page['docs']:
+                if emitted >= total:
+                    return
+                yield doc
+                emitted += 1
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def iter_search_cursor(client, q, sort, fl=None, rows=500, deadline=None, **solr_params):
+    """
+        Streams the documents matching 'q' with Solr cursorMark deep paging.
+        Pages are fetched one after the other, but deep pages stay cheap for
+        the server. 'sort' must include the unique key of the Solr core.
+        'deadline' bounds all the pages, as for iter_search.
+    """
+
+    deadline = Deadline.of(deadline)
+    cursor = '*'
+    while True:
+        query = build_query(q, rows=rows, fl=fl, sort=sort, cursorMark=cursor, **solr_params)
+        page = client.call_api_data('SEARCH', 'getSearch', query=query, deadline=deadline)
+        for doc in page['response']['docs']:
+            yield doc
+        next_cursor = page.get('nextCursorMark')
+        if next_cursor is None or next_cursor == cursor:
+            return
+        cursor = next_cursor
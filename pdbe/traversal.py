@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# import pdberest modules
+from .config import var_types, api_endpoints
+from .exceptions import RestError
+from .deadline import Deadline
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+
+# One call of the assembled tree
+class TraversalNode(object):
+    """
+        Result of one call: its decoded 'value' (or the RestError in 'error')
+        and the 'children' nodes expanded from it.
+    """
+
+    __slots__ = ('top_name', 'fun_name', 'params', 'value', 'error', 'children')
+
+    def __init__(self, top_name, fun_name, params):
+        self.top_name = top_name
+        self.fun_name = fun_name
+        self.params = params
+        self.value = None
+        self.error = None
+        self.children = []
+
+    def __repr__(self):
+        return 'TraversalNode(%s.%s, %s)' % (self.top_name, self.fun_name, self.params)
+
+    # plain nested dicts, e.g. for json serialisation
+    def to_dict(self):
+        return {'call': '%s.%s' % (self.top_name, self.fun_name),
+                'params': self.params,
+                'value': self.value,
+                'error': str(self.error) if self.error is not None else None,
+                'children': [child.to_dict() for child in self.children]}
+
+
+# Declarative description of dependent calls
+class Step(object):
+    """
+        One endpoint of a traversal plan.
+
+        'expand' is called with the parent's decoded response and returns the
+        param dicts of this step's calls (each merged into the parent params);
+        without it the step is called once with the parent params.
+        'children' are the steps depending on each of this step's calls.
+    """
+
+    def __init__(self, top_name, fun_name, expand=None, children=()):
+        self.top_name = top_name
+        self.fun_name = fun_name
+        self.expand = expand
+        self.children = list(children)
+
+    def __repr__(self):
+        return 'Step(%s.%s)' % (self.top_name, self.fun_name)
+
+
+def find_count(value):
+    # first integer found in a (nested) response, e.g. {"3gcb": {"noofinterfaces": 3}}
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            count = find_count(item)
+            if count is not None:
+                return count
+    return None
+
+
+def expand_count(var, start=1, values=None):
+    # expands a count response into {var: start}, ..., {var: start + count - 1},
+    # optionally combined with each of 'values' for a second var, e.g.
+    # expand_count('interface_index', values=('interface_component', ['energetics']))
+    def expand(response):
+        count = find_count(response) or 0
+        for index in range(start, start + count):
+            if values is None:
+                yield {var: index}
+            else:
+                for value in values[1]:
+                    yield {var: index, values[0]: value}
+    return expand
+
+
+# Ready-made plans
+def pisa_interfaces_plan(components=None):
+    # number of interfaces -> details (and components) of every interface
+    if components is None:
+        components = var_types['interface_component']['list']
+    return Step('PISA', 'getNumberInterfaces', children=[
+        Step('PISA', 'getInterfaceDetails', expand=expand_count('interface_index')),
+        Step('PISA', 'getInterfaceComponent',
+             expand=expand_count('interface_index', values=('interface_component', components))),
+    ])
+
+
+def ssm_matches_plan():
+    # number of matches -> details of every match
+    return Step('SSM', 'getNumberMatches', children=[
+        Step('SSM', 'getMatchDetail', expand=expand_count('ssm_index')),
+    ])
+
+
+# Dependent-call query planner
+class Traversal(object):
+    """
+        Expands a Step tree level by level. All the independent calls of a
+        level run in parallel, and every level shares the same pool of
+        'workers' threads, i.e. one concurrency budget for the whole traversal.
+        'deadline' (seconds or a Deadline) bounds the whole traversal; calls
+        past it get a RestTimeout error.
+
+        Usage:
+            tree = Traversal(p).run(pisa_interfaces_plan(), pdbid='3gcb', assemblyid='0')
+    """
+
+    def __init__(self, client, workers=8):
+        self.client = client
+        self.workers = workers
+
+    def run(self, step, deadline=None, **params):
+        deadline = Deadline.of(deadline)
+        root = TraversalNode(step.top_name, step.fun_name, params)
+        level = [(step, root)]
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while level:
+                futures = [(s, node, pool.submit(self._call, node, deadline))
+                           for s, node in level]
+                level = []
+                for s, node, future in futures:
+                    future.result()
+                    if node.error is None:
+                        level.extend(self._expand(s, node))
+        finally:
+            pool.shutdown()
+        return root
+
+    def _call(self, node, deadline=None):
+        try:
+            node.value = self.client.call_api_data(node.top_name, node.fun_name,
+                                                   deadline=deadline, **node.params)
+        except RestError as error:
+            logger.debug("'%s.%s' %s failed: %s" % (node.top_name, node.fun_name,
+                                                    node.params, error))
+            node.error = error
+
+    # creates the child nodes of 'node' and returns them with their steps
+    def _expand(self, step, node):
+        level = []
+        for child_step in step.children:
+            if child_step.expand is None:
+                expanded = [{}]
+            else:
+                expanded = child_step.expand(node.value)
+            # inherited params the child endpoint does not take are dropped
+            url = api_endpoints[child_step.top_name][child_step.fun_name]['url']
+            accepted = re.findall(r'\{\{(?P<m>[a-zA-Z_]+)\}\}', url)
+            for extra in expanded:
+                params = dict((k, v) for k, v in node.params.items() if k in accepted)
+                params.update(extra)
+                child = TraversalNode(child_step.top_name, child_step.fun_name, params)
+                node.children.append(child)
+                level.append((child_step, child))
+        return level
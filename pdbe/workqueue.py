@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pyPDBeREST: A wrapper for the PDBe REST API.
+    Copyright (C) 2015  Fábio Madeira
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# import system modules
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from collections import namedtuple
+
+# import pdberest modules
+from .exceptions import RestError, RestRateLimitError, RestServiceUnavailable
+from .jsonbackend import get_backend
+from .canonical import canonical_endpoint, canonical_params
+
+# Logger instance
+logger = logging.getLogger(__name__)
+
+# a leased unit of work; 'lease' must be handed back on ack/nack
+Task = namedtuple('Task', ['id', 'top_name', 'fun_name', 'params', 'attempts', 'lease'])
+
+
+# Work queue storage interface
+class QueueBackend(object):
+    """
+        Storage for the work queue. Backends must make lease() atomic, so that
+        a task is never held by two workers at once, and must ignore
+        ack/nack calls whose lease has expired or been taken over.
+    """
+
+    # adds (top_name, fun_name, params) tasks, skipping ones already queued
+    def put(self, tasks):
+        raise NotImplementedError()
+
+    # hands out up to 'n' pending (or expired) tasks for 'visibility_timeout' seconds
+    def lease(self, n, visibility_timeout, max_attempts):
+        raise NotImplementedError()
+
+    # marks a leased task as done and stores its result
+    def ack(self, task, result):
+        raise NotImplementedError()
+
+    # returns a leased task to the queue, or dead-letters it if 'dead' is set
+    def nack(self, task, error, dead=False):
+        raise NotImplementedError()
+
+    # iterates over (top_name, fun_name, params, result) of completed tasks
+    def results(self):
+        raise NotImplementedError()
+
+    # iterates over (top_name, fun_name, params, error) of dead-lettered tasks
+    def dead_letters(self):
+        raise NotImplementedError()
+
+    # number of tasks per state
+    def counts(self):
+        raise NotImplementedError()
+
+
+# Default backend on a local SQLite file
+class SQLiteBackend(QueueBackend):
+    """
+        Work queue kept in a SQLite database. Any process that can open the
+        file can act as a worker; leases are taken in an immediate
+        transaction so concurrent workers never get the same task.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS tasks ("
+                         "id INTEGER PRIMARY KEY, "
+                         "top_name TEXT NOT NULL, "
+                         "fun_name TEXT NOT NULL, "
+                         "params TEXT NOT NULL, "
+                         "state TEXT NOT NULL DEFAULT 'pending', "
+                         "attempts INTEGER NOT NULL DEFAULT 0, "
+                         "lease TEXT, "
+                         "lease_expires REAL, "
+                         "result TEXT, "
+                         "error TEXT, "
+                         "UNIQUE (top_name, fun_name, params))")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires)")
+        conn.close()
+
+    def _connect(self):
+        # autocommit mode, transactions are opened explicitly where needed
+        return sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+
+    def put(self, tasks):
+        rows = [(top_name, fun_name, json.dumps(params, sort_keys=True))
+                for top_name, fun_name, params in tasks]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tasks (top_name, fun_name, params) "
+                             "VALUES (?, ?, ?)", rows)
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return added
+
+    def lease(self, n, visibility_timeout, max_attempts):
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # tasks whose worker died too many times go to the dead-letter state
+            conn.execute("UPDATE tasks SET state = 'dead', lease = NULL, "
+                         "error = COALESCE(error, 'lease expired too many times') "
+                         "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                         (now, max_attempts))
+            rows = conn.execute("SELECT id, top_name, fun_name, params, attempts FROM tasks "
+                                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                                "ORDER BY id LIMIT ?", (now, n)).fetchall()
+            conn.executemany("UPDATE tasks SET state = 'leased', attempts = attempts + 1, "
+                             "lease = ?, lease_expires = ? WHERE id = ?",
+                             [(token, now + visibility_timeout, row[0]) for row in rows])
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return [Task(row[0], row[1], row[2], json.loads(row[3]), row[4] + 1, token)
+                for row in rows]
+
+    def _finish(self, task, state, result=None, error=None):
+        conn = self._connect()
+        try:
+            cursor = conn.execute("UPDATE tasks SET state = ?, lease = NULL, lease_expires = NULL, "
+                                  "result = ?, error = ? WHERE id = ? AND lease = ?",
+                                  (state, result, error, task.id, task.lease))
+            done = cursor.rowcount == 1
+        finally:
+            conn.close()
+        if not done:
+            logger.info("Lease on task %d was lost before it finished" % task.id)
+        return done
+
+    def ack(self, task, result):
+        return self._finish(task, 'done', result=sqlite3.Binary(get_backend().dumps(result)))
+
+    def nack(self, task, error, dead=False):
+        return self._finish(task, 'dead' if dead else 'pending', error=error)
+
+    def results(self):
+        conn = self._connect()
+        try:
+            for row in conn.execute("SELECT top_name, fun_name, params, result FROM tasks "
+                                    "WHERE state = 'done' ORDER BY id"):
+                yield row[0], row[1], json.loads(row[2]), get_backend().loads(row[3])
+        finally:
+            conn.close()
+
+    def dead_letters(self):
+        conn = self._connect()
+        try:
+            for row in conn.execute("SELECT top_name, fun_name, params, error FROM tasks "
+                                    "WHERE state = 'dead' ORDER BY id"):
+                yield row[0], row[1], json.loads(row[2]), row[3]
+        finally:
+            conn.close()
+
+    def counts(self):
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state"))
+        finally:
+            conn.close()
+        for state in ('pending', 'leased', 'done', 'dead'):
+            counts.setdefault(state, 0)
+        return counts
+
+
+# Crawl work queue
+class WorkQueue(object):
+    """
+        Lease/ack work queue of (endpoint, params) tasks, so that any number of
+        workers on any host sharing the backend can crawl without duplicate work.
+
+        A leased task is invisible to other workers for 'visibility_timeout'
+        seconds; if the worker does not ack it by then it is handed out again.
+        Tasks failing with a client error (4xx other than 429) are dead-lettered
+        straight away, others after 'max_attempts' tries.
+
+        Usage:
+            queue = WorkQueue(SQLiteBackend('crawl.db'))
+            queue.submit('PDB', 'getSummary', [{'pdbid': '1cbs'}, {'pdbid': '2pah'}])
+            queue.work(pyPDBeREST())
+    """
+
+    def __init__(self, backend, visibility_timeout=300, max_attempts=3):
+        self.backend = backend
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+    # queues one task per params dict and returns how many were new; tasks are
+    # stored in canonical form, so aliases and case variants are only queued once
+    def submit(self, top_name, fun_name, params):
+        top_name, fun_name = canonical_endpoint(top_name, fun_name)
+        return self.backend.put((top_name, fun_name, canonical_params(p)) for p in params)
+
+    def lease(self, n=1):
+        return self.backend.lease(n, self.visibility_timeout, self.max_attempts)
+
+    def ack(self, task, result):
+        return self.backend.ack(task, result)
+
+    def nack(self, task, error, dead=False):
+        if not dead and task.attempts >= self.max_attempts:
+            dead = True
+        return self.backend.nack(task, error, dead=dead)
+
+    # client errors will fail again, whereas rate limits and 5xx are transient
+    @staticmethod
+    def is_permanent(error):
+        if isinstance(error, (RestRateLimitError, RestServiceUnavailable)):
+            return False
+        return error.error_code is not None and 400 <= error.error_code < 500
+
+    # runs one task with 'client' and acks or nacks it
+    def process(self, client, task):
+        try:
+            result = client.call_api_data(task.top_name, task.fun_name, **task.params)
+        except RestError as error:
+            logger.debug("Task %d (%s.%s %s) failed: %s"
+                         % (task.id, task.top_name, task.fun_name, task.params, error))
+            self.nack(task, str(error), dead=self.is_permanent(error))
+            return False
+        except Exception as error:
+            # e.g. connection or decoding errors: retried like a 5xx
+            logger.warning("Task %d (%s.%s %s) failed unexpectedly: %r"
+                           % (task.id, task.top_name, task.fun_name, task.params, error))
+            self.nack(task, '%s: %s' % (type(error).__name__, error))
+            return False
+        return self.ack(task, result)
+
+    # pulls and processes tasks until the queue is drained
+    # (or 'max_tasks' were processed) and returns the number processed
+    def work(self, client, batch=10, max_tasks=None, idle_wait=1.0):
+        processed = 0
+        while max_tasks is None or processed < max_tasks:
+            tasks = self.lease(batch if max_tasks is None else min(batch, max_tasks - processed))
+            if not tasks:
+                counts = self.backend.counts()
+                if not counts['leased']:
+                    break
+                # others still hold leases that may expire and come back
+                time.sleep(idle_wait)
+                continue
+            for i, task in enumerate(tasks):
+                try:
+                    self.process(client, task)
+                except BaseException:
+                    # hands back the rest of the batch instead of leaving it
+                    # leased until the visibility timeout (e.g. on Ctrl-C)
+                    for unfinished in tasks[i:]:
+                        self.backend.nack(unfinished, 'Worker stopped')
+                    raise
+                processed += 1
+        return processed
+
+    def results(self):
+        return self.backend.results()
+
+    def dead_letters(self):
+        return self.backend.dead_letters()
+
+    def counts(self):
+        return self.backend.counts()
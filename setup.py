@@ -37,7 +37,19 @@ setup(
     include_package_data=True,
 
     # Package dependencies.
-    install_requires=['requests>=2.7.0', 'responses'],
+    install_requires=['requests>=2.7.0', 'responses', 'futures; python_version < "3"'],
+
+    # Optional dependencies.
+    extras_require={
+        'zstd': ['zstandard'],
+        'orjson': ['orjson'],
+        'numpy': ['numpy'],
+    },
+
+    # Command line tools.
+    entry_points={
+        'console_scripts': ['pdberest = pdbe.cli:main'],
+    },
 
     # tests
     test_suite="tests.test_pdberest",
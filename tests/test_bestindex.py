@@ -0,0 +1,107 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the offline UniProt -> best structure index.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.bestindex import BestStructureIndex
+
+
+def structure(pdb_id, unp_start, unp_end, start=1):
+    return {'pdb_id': pdb_id, 'chain_id': 'A', 'start': start,
+            'end': start + unp_end - unp_start, 'unp_start': unp_start, 'unp_end': unp_end,
+            'coverage': 0.5, 'resolution': 1.8, 'experimental_method': 'X-ray diffraction',
+            'tax_id': 9606}
+
+# in rank order: 1abc covers 50-100, 2abc 1-80, 3abc 90-150
+best_structures = {'P29373': [structure('1abc', 50, 100), structure('2abc', 1, 80, start=5),
+                              structure('3abc', 90, 150)]}
+
+
+class TestBestStructureIndex(unittest.TestCase):
+    """Test ranked coverage lookups."""
+
+    def setUp(self):
+        self.index = BestStructureIndex()
+        self.index.add(best_structures)
+
+    def test_best(self):
+        """
+        Testing that the best ranked structure covering a position is found.
+        """
+
+        def best(position):
+            found = self.index.best('P29373', position)
+            return found and (found[0].pdb_id, found[1])
+
+        self.assertEqual(best(1), ('2abc', 5))
+        self.assertEqual(best(49), ('2abc', 53))
+        self.assertEqual(best(50), ('1abc', 1))
+        self.assertEqual(best(100), ('1abc', 51))
+        self.assertEqual(best(101), ('3abc', 12))
+        self.assertEqual(best(150), ('3abc', 61))
+        self.assertIsNone(best(151))
+        self.assertRaises(KeyError, self.index.best, 'Q00001', 1)
+        self.assertEqual([s.pdb_id for s, _ in self.index.ranked('P29373', 95)],
+                         ['1abc', '3abc'])
+
+    def test_save_load(self):
+        """
+        Testing that a saved index answers the same lookups once loaded.
+        """
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'best.json')
+            self.index.save(path)
+            loaded = BestStructureIndex.load(path)
+            self.assertEqual(loaded.structures('P29373'), self.index.structures('P29373'))
+            self.assertEqual(loaded.best('P29373', 120)[0].pdb_id, '3abc')
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @responses.activate
+    def test_build(self):
+        """
+        Testing the bulk builder, with an accession without structures.
+        """
+
+        url = pdbe.config.default_url + 'api/mappings/best_structures/'
+        responses.add(responses.GET, url + 'P29373', json=best_structures)
+        responses.add(responses.GET, url + 'Q00001', json={}, status=404)
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        index = BestStructureIndex.build(p, ['P29373', 'Q00001'], workers=2)
+        self.assertEqual(len(index), 2)
+        self.assertIn('Q00001', index)
+        self.assertIsNone(index.best('Q00001', 10))
+        self.assertEqual(index.best('P29373', 10)[0].pdb_id, '2abc')
+
+    @responses.activate
+    def test_build_with_default_client(self):
+        """
+        Testing that the builder does not depend on the client's pretty_json.
+        """
+
+        url = pdbe.config.default_url + 'api/mappings/best_structures/'
+        responses.add(responses.GET, url + 'P29373', json=best_structures)
+        index = BestStructureIndex.build(pdbe.pyPDBeREST(), ['P29373'])
+        self.assertEqual(index.best('P29373', 10)[0].pdb_id, '2abc')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the response cache.
+
+"""
+
+import os
+import sys
+import time
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.cache import ResponseCache, request_key
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the in-memory response cache."""
+
+    def test_request_key(self):
+        """
+        Testing that keys do not depend on the order of the params.
+        """
+
+        self.assertEqual(request_key('PDB', 'getSummary', 'GET', {'a': 1, 'b': 2}),
+                         request_key('PDB', 'getSummary', 'GET', {'b': 2, 'a': 1}))
+        self.assertNotEqual(request_key('PDB', 'getSummary', 'GET', {'a': 1}),
+                            request_key('PDB', 'getSummary', 'POST', {'a': 1}))
+
+    def test_lru_and_ttl(self):
+        """
+        Testing eviction of the least recently used and expired entries.
+        """
+
+        cache = ResponseCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+        cache = ResponseCache(ttl=0.05)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.1)
+        with self.assertRaises(KeyError):
+            cache.get('a')
+
+    @responses.activate
+    def test_client_cache(self):
+        """
+        Testing that the client only hits the network once per request.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': [{}]})
+        p = pdbe.pyPDBeREST(cache=ResponseCache())
+        first = p.PDB.getSummary(pdbid='1cbs')
+        self.assertEqual(p.PDB.getSummary(pdbid='1cbs'), first)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_negative_cache(self):
+        """
+        Testing that 404s are raised again from the cache until they expire.
+        """
+
+        responses.add(responses.GET, summary_url + '9zzz', status=404)
+        responses.add(responses.GET, summary_url + '1cbs', status=503)
+        cache = ResponseCache()
+        p = pdbe.pyPDBeREST(cache=cache, negative_ttl=0.2)
+        for _ in range(2):
+            with self.assertRaises(pdbe.RestError) as context:
+                p.PDB.getSummary(pdbid='9zzz')
+            self.assertEqual(context.exception.error_code, 404)
+        self.assertEqual(len(responses.calls), 1)
+        # the error does not hide behind the key of the response
+        self.assertNotIn(request_key('PDB', 'getSummary', 'GET', {'pdbid': '9zzz'}), cache)
+
+        # service errors are not cached
+        for _ in range(2):
+            with self.assertRaises(pdbe.RestServiceUnavailable):
+                p.PDB.getSummary(pdbid='1cbs')
+        self.assertEqual(len(responses.calls), 3)
+
+        time.sleep(0.3)
+        with self.assertRaises(pdbe.RestError):
+            p.PDB.getSummary(pdbid='9zzz')
+        self.assertEqual(len(responses.calls), 4)
+
+        # without negative_ttl every call goes out
+        p = pdbe.pyPDBeREST(cache=ResponseCache())
+        for _ in range(2):
+            with self.assertRaises(pdbe.RestError):
+                p.PDB.getSummary(pdbid='9zzz')
+        self.assertEqual(len(responses.calls), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
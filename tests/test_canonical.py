@@ -0,0 +1,77 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the canonical request keys.
+
+"""
+
+import os
+import sys
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.cache import ResponseCache, request_key
+from pdbe.canonical import canonical_endpoint, canonical_value
+
+
+class TestCanonical(unittest.TestCase):
+    """Test normalising identifiers and endpoint aliases."""
+
+    def test_values(self):
+        """
+        Testing the normalisation per var type.
+        """
+
+        self.assertEqual(canonical_value('pdbid', ' 1CBS'), '1cbs')
+        self.assertEqual(canonical_value('pdbid', '2PAH,1cbs,1CBS'), '1cbs,2pah')
+        self.assertEqual(canonical_value('compid', 'atp'), 'ATP')
+        self.assertEqual(canonical_value('uniprotid', 'p29373'), 'P29373')
+        self.assertEqual(canonical_value('emdbid', 'emd-1200'), 'EMD-1200')
+        self.assertEqual(canonical_value('emdbid', '1200'), 'EMD-1200')
+        self.assertEqual(canonical_value('accession', '1CBS'), '1cbs')
+        self.assertEqual(canonical_value('accession', 'pf00001'), 'PF00001')
+        self.assertEqual(canonical_value('interface_index', '2'), 2)
+        # chain ids are case sensitive
+        self.assertEqual(canonical_value('chainid', 'a'), 'a')
+        # Solr queries are not id lists
+        query = 'q=molecule_name:lysozyme&fl=pdb_id,entity_id&wt=json'
+        self.assertEqual(canonical_value('query', query), query)
+        self.assertNotEqual(request_key('SEARCH', 'getSearch', 'GET', {'query': 'q=x&fl=b,a'}),
+                            request_key('SEARCH', 'getSearch', 'GET', {'query': 'a,q=x&fl=b'}))
+
+    def test_keys(self):
+        """
+        Testing that aliases and case variants share one key.
+        """
+
+        self.assertEqual(canonical_endpoint('PDB', 'getMolecules'),
+                         canonical_endpoint('PDB', 'getEntities'))
+        self.assertEqual(canonical_endpoint('PDB', 'getSummary'), ('PDB', 'getSummary'))
+        self.assertEqual(request_key('PDB', 'getMolecules', 'GET', {'pdbid': '1CBS'}),
+                         request_key('PDB', 'getEntities', 'GET', {'pdbid': '1cbs'}))
+        self.assertNotEqual(request_key('PDB', 'getMolecules', 'GET', {'pdbid': '1cbs'}),
+                            request_key('PDB', 'getMolecules', 'POST', {'pdbid': '1cbs'}))
+
+    @responses.activate
+    def test_cache_hits_are_shared(self):
+        """
+        Testing that the client cache serves aliases and case variants.
+        """
+
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pdb/entry/molecules/1CBS',
+                      json={'1cbs': [{'entity_id': 1}]})
+        p = pdbe.pyPDBeREST(pretty_json=False, cache=ResponseCache())
+        first = p.PDB.getMolecules(pdbid='1CBS')
+        self.assertEqual(p.PDB.getEntities(pdbid='1cbs'), first)
+        self.assertEqual(len(responses.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
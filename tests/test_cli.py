@@ -0,0 +1,140 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the 'pdberest' command line tools.
+
+"""
+
+import os
+import sys
+import gzip
+import json
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.cli import main
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+
+
+class TestFetch(unittest.TestCase):
+    """Test 'pdberest fetch'."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.ids = os.path.join(self.tmpdir, 'ids.txt')
+        with open(self.ids, 'w') as handle:
+            handle.write('# entries\n1cbs\n2pah\n\n9zzz\n')
+        self.out = os.path.join(self.tmpdir, 'results')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def fetch(self, *args):
+        return main(['fetch', 'PDB.getSummary', '--ids', self.ids, '--out', self.out,
+                     '--reqs-per-sec', '1000', '--quiet'] + list(args))
+
+    def records(self, name='PDB.getSummary.jsonl', opener=open):
+        with opener(os.path.join(self.out, name), 'rt') as handle:
+            records = [json.loads(line) for line in handle]
+        return dict((record['params']['pdbid'], record) for record in records)
+
+    @responses.activate
+    def test_single_requests(self):
+        """
+        Testing one GET per id, with a 404 counted as missing.
+        """
+
+        for pdbid in ('1cbs', '2pah'):
+            responses.add(responses.GET, summary_url + pdbid, json={pdbid: [{'title': pdbid}]})
+        responses.add(responses.GET, summary_url + '9zzz', status=404)
+
+        self.assertEqual(self.fetch('--batch-size', '1', '--workers', '2'), 0)
+        records = self.records()
+        self.assertEqual(sorted(records), ['1cbs', '2pah', '9zzz'])
+        self.assertEqual(records['2pah']['data'], {'2pah': [{'title': '2pah'}]})
+        self.assertEqual(records['9zzz']['error'], 404)
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_batched_post(self):
+        """
+        Testing that POST batches are split back per id.
+        """
+
+        responses.add(responses.POST, summary_url,
+                      json={'1cbs': [{'title': 'a'}], '2pah': [{'title': 'b'}]})
+
+        self.assertEqual(self.fetch('--compress', 'gzip'), 0)
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(responses.calls[0].request.body, '1cbs,2pah,9zzz')
+        records = self.records('PDB.getSummary.jsonl.gz', gzip.open)
+        self.assertEqual(records['1cbs']['data'], {'1cbs': [{'title': 'a'}]})
+        self.assertEqual(records['9zzz']['error'], 404)
+
+    @responses.activate
+    def test_errors_set_the_exit_status(self):
+        """
+        Testing that a failed batch is retried per id and errors are reported.
+        """
+
+        responses.add(responses.POST, summary_url, status=500)
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': []})
+        responses.add(responses.GET, summary_url + '2pah', json={'2pah': []})
+        responses.add(responses.GET, summary_url + '9zzz', status=500)
+
+        self.assertEqual(self.fetch(), 1)
+        records = self.records()
+        self.assertEqual(records['1cbs']['data'], {'1cbs': []})
+        self.assertEqual(records['9zzz']['error'], 500)
+        self.assertEqual(len(responses.calls), 4)
+
+    @responses.activate
+    def test_unexpected_errors_are_records(self):
+        """
+        Testing that any failure of an id is written as an error and counted.
+        """
+
+        with open(self.ids, 'w') as handle:
+            handle.write('2pah\n{"entry": "1cbs"}\n1cbs\n')
+        responses.add(responses.GET, summary_url + '2pah', body='<html>', status=200)
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': []})
+
+        self.assertEqual(self.fetch('--batch-size', '1'), 1)
+        with open(os.path.join(self.out, 'PDB.getSummary.jsonl')) as handle:
+            records = [json.loads(line) for line in handle]
+        self.assertEqual(len(records), 3)
+        errors = dict((record['params'].get('pdbid', 'bad params'), record['error'])
+                      for record in records if 'error' in record)
+        # the exception name depends on the json backend
+        self.assertIn(errors['2pah'], ('JSONDecodeError', 'ValueError'))
+        self.assertEqual(errors['bad params'], 'Exception')
+        self.assertEqual([record['data'] for record in records if 'data' in record],
+                         [{'1cbs': []}])
+
+    @responses.activate
+    def test_timeout_applies_to_every_endpoint(self):
+        """
+        Testing that --timeout also replaces the longer built-in PISA timeout.
+        """
+
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pisa/asislist/1cbs',
+                      json={'1cbs': []})
+        with open(self.ids, 'w') as handle:
+            handle.write('1cbs\n')
+        self.assertEqual(main(['fetch', 'PISA.getAsisList', '--ids', self.ids, '--out', self.out,
+                               '--reqs-per-sec', '1000', '--quiet', '--timeout', '5']), 0)
+        self.assertEqual(responses.calls[0].request.req_kwargs['timeout'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
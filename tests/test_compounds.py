@@ -0,0 +1,101 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the local chemical component store.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.compounds import CompoundStore
+
+url = pdbe.config.default_url + 'api/pdb/compound/'
+
+
+def add_compound(compid, weight, inchikey, pdbids, revision_date='2011-06-04'):
+    responses.add(responses.GET, url + 'summary/' + compid,
+                  json={compid: [{'name': compid.lower(), 'formula': 'C10 H16 N5 O13 P3',
+                                  'formula_weight': weight, 'inchi_key': inchikey,
+                                  'revision_date': revision_date}]})
+    responses.add(responses.GET, url + 'in_pdb/' + compid,
+                  json={compid: [{'pdb_id': pdbid} for pdbid in pdbids]})
+    responses.add(responses.GET, url + 'atoms/' + compid,
+                  json={compid: [{'atom_name': 'PG', 'element': 'P'}]})
+
+
+class TestCompoundStore(unittest.TestCase):
+    """Test syncing and querying compounds."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = CompoundStore(os.path.join(self.tmpdir, 'compounds.db'))
+        self.p = pdbe.pyPDBeREST(pretty_json=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @responses.activate
+    def test_sync_and_lookups(self):
+        """
+        Testing the indexed lookups after a sync.
+        """
+
+        add_compound('ATP', 507.181, 'ZKHQWZAMYRWXGA-KQYNXXCUSA-N', ['1ATP', '2abc'])
+        add_compound('NAG', 221.208, 'OVRNDRQMDRJTHS-FMDGEEDCSA-N', ['2abc'])
+        responses.add(responses.GET, url + 'summary/XXX', json={}, status=404)
+        counts = self.store.sync(self.p, ['atp', 'NAG', 'XXX'])
+        self.assertEqual(counts, {'added': 2, 'updated': 0, 'skipped': 0, 'failed': 1})
+
+        self.assertEqual(len(self.store), 2)
+        self.assertIn('atp', self.store)
+        self.assertEqual(self.store.summary('ATP')['formula_weight'], 507.181)
+        self.assertEqual(self.store.atoms('ATP'), [{'atom_name': 'PG', 'element': 'P'}])
+        self.assertEqual(self.store.by_inchikey('ZKHQWZAMYRWXGA-KQYNXXCUSA-N'), ['ATP'])
+        self.assertEqual(self.store.by_weight(200, 510), [('NAG', 221.208), ('ATP', 507.181)])
+        self.assertEqual(self.store.by_weight(300, 400), [])
+        self.assertEqual(self.store.entries('ATP'), ['1atp', '2abc'])
+        self.assertEqual(self.store.compounds_in('2ABC'), ['ATP', 'NAG'])
+        self.assertRaises(KeyError, self.store.summary, 'XXX')
+
+        # already stored compounds are not fetched again
+        calls = len(responses.calls)
+        self.assertEqual(self.store.sync(self.p, ['ATP'])['skipped'], 1)
+        self.assertEqual(len(responses.calls), calls)
+
+    @responses.activate
+    def test_incremental_refresh(self):
+        """
+        Testing that a refresh only fetches the atoms of revised compounds.
+        """
+
+        add_compound('ATP', 507.181, 'ZKHQWZAMYRWXGA-KQYNXXCUSA-N', ['1atp'])
+        self.store.sync(self.p, ['ATP'])
+        self.assertEqual(len(responses.calls), 3)
+
+        counts = self.store.refresh(self.p, max_age=0)
+        self.assertEqual(counts['updated'], 1)
+        self.assertEqual([call.request.url.split('/')[-2] for call in responses.calls[3:]],
+                         ['summary', 'in_pdb'])
+
+        responses.reset()
+        add_compound('ATP', 507.181, 'ZKHQWZAMYRWXGA-KQYNXXCUSA-N', ['1atp', '3atp'],
+                     revision_date='2020-01-01')
+        self.store.refresh(self.p, max_age=0)
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(self.store.entries('ATP'), ['1atp', '3atp'])
+
+
+if __name__ == '__main__':
+    unittest.main()
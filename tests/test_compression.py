@@ -0,0 +1,104 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the dictionary-trained zstd response store.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+from pdbe import compression
+from pdbe.cache import ResponseCache, request_key
+from pdbe.packcache import PackCache
+
+
+def percentiles(i):
+    return {'%04d' % i: {'clashscore': {'absolute': i % 100, 'relative': (i * 7) % 100},
+                         'percent-rama-outliers': {'absolute': (i * 3) % 100,
+                                                   'relative': (i * 11) % 100}}}
+
+
+@unittest.skipIf(compression.zstandard is None, 'zstandard is not installed')
+class TestCompressedCache(unittest.TestCase):
+    """Test compression with per-namespace dictionaries."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_training_and_versions(self):
+        """
+        Testing that records written before and after training both decode.
+        """
+
+        cache = compression.CompressedCache(PackCache(os.path.join(self.tmpdir, 'packs')),
+                                            os.path.join(self.tmpdir, 'dicts'),
+                                            train_samples=100)
+        keys = [request_key('VALIDATION', 'getGlobalRelativePercentiles', 'GET',
+                            {'pdbid': '%04d' % i}) for i in range(150)]
+        for i, key in enumerate(keys):
+            cache.set(key, percentiles(i))
+        self.assertEqual(cache.dictionaries.latest('VALIDATION'), 1)
+        self.assertEqual(cache.dictionaries.latest('SIFTS'), 0)
+
+        for i, key in enumerate(keys):
+            self.assertEqual(cache.get(key), percentiles(i))
+        self.assertIn(keys[0], cache)
+        self.assertEqual(len(cache), 150)
+
+        # records carry their dictionary version
+        kind, version = compression._record.unpack_from(cache.backend.get_raw(keys[-1]), 0)
+        self.assertEqual((kind, version), (compression._zstd_dict, 1))
+        kind, version = compression._record.unpack_from(cache.backend.get_raw(keys[0]), 0)
+        self.assertEqual(version, 0)
+
+        # a new instance picks up the trained dictionary
+        reopened = compression.CompressedCache(cache.backend, os.path.join(self.tmpdir, 'dicts'))
+        self.assertEqual(reopened.get(keys[120]), percentiles(120))
+
+    def test_versions_are_never_overwritten(self):
+        """
+        Testing that a version claimed by another process is skipped.
+        """
+
+        path = os.path.join(self.tmpdir, 'dicts')
+        dictionaries = compression.ZstdDictionaries(path, dict_size=4096)
+        other = compression.ZstdDictionaries(path, dict_size=4096)
+        samples = [str(percentiles(i)).encode() for i in range(200)]
+        self.assertEqual(other.train('VALIDATION', samples), 1)
+        with open(os.path.join(path, 'VALIDATION-v1.dict'), 'rb') as handle:
+            claimed = handle.read()
+
+        # both saw no dictionary yet, as when two processes train at once
+        dictionaries.latest = lambda group: 0
+        self.assertEqual(dictionaries.train('VALIDATION', samples[::-1]), 2)
+        with open(os.path.join(path, 'VALIDATION-v1.dict'), 'rb') as handle:
+            self.assertEqual(handle.read(), claimed)
+        self.assertEqual(sorted(os.listdir(path)), ['VALIDATION-v1.dict', 'VALIDATION-v2.dict'])
+
+    def test_in_memory_backend(self):
+        """
+        Testing compression in front of a ResponseCache.
+        """
+
+        cache = compression.CompressedCache(ResponseCache(), os.path.join(self.tmpdir, 'dicts'))
+        key = request_key('SIFTS', 'getMappings', 'GET', {'accession': 'P29373'})
+        cache.set(key, {'P29373': {'PDB': {}}})
+        self.assertIsInstance(cache.backend.get(key), bytes)
+        self.assertEqual(cache.get(key), {'P29373': {'PDB': {}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
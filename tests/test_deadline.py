@@ -0,0 +1,232 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for request timeouts and end-to-end deadlines.
+
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import inspect
+import unittest
+import requests
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe import validation, executor
+from pdbe.emdb import EmdbProperties
+from pdbe.search import iter_search, iter_search_cursor
+from pdbe.traversal import Traversal, ssm_matches_plan
+from pdbe.deadline import Deadline
+from pdbe.ratelimit import RateLimiter, SharedRateLimiter
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+molecules_url = pdbe.config.default_url + 'api/pdb/entry/molecules/'
+percentiles_url = pdbe.config.default_url + 'api/validation/global-percentiles/entry/'
+search_url = re.compile(re.escape(pdbe.config.default_url + 'search/pdb/select?') + '.*')
+
+
+class RecordingClient(pdbe.pyPDBeREST):
+    # client keeping the deadline given to each request it sends
+
+    def __init__(self, **kwargs):
+        super(RecordingClient, self).__init__(pretty_json=False, **kwargs)
+        self.deadlines = []
+
+    def fetch_api_func(self, top_name, fun_name, method, kwargs, key=None, deadline=None):
+        self.deadlines.append(deadline)
+        return super(RecordingClient, self).fetch_api_func(top_name, fun_name, method, kwargs,
+                                                           key=key, deadline=deadline)
+
+
+class TestTimeouts(unittest.TestCase):
+    """Test the timeouts given to the requests."""
+
+    @responses.activate
+    def test_most_specific_timeout_applies(self):
+        """
+        Testing default, namespace and endpoint timeouts.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={})
+        responses.add(responses.GET, molecules_url + '1cbs', json={})
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pdb/compound/summary/ATP',
+                      json={})
+        p = pdbe.pyPDBeREST(pretty_json=False,
+                            timeouts={'PDB': (1, 2), ('PDB', 'getSummary'): 5})
+        p.PDB.getSummary(pdbid='1cbs')
+        p.PDB.getMolecules(pdbid='1cbs')
+        p.COMPOUNDS.getSummary(compid='ATP')
+        timeouts = [call.request.req_kwargs['timeout'] for call in responses.calls]
+        self.assertEqual(timeouts, [5, (1, 2), pdbe.config.request_timeouts['default']])
+
+    @responses.activate
+    def test_timeout_raises(self):
+        """
+        Testing that a timed out request raises RestTimeout.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', body=requests.exceptions.ReadTimeout())
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        with self.assertRaises(pdbe.RestTimeout) as context:
+            p.PDB.getSummary(pdbid='1cbs')
+        # a server side failure for the callers that tell errors apart
+        self.assertIsInstance(context.exception, pdbe.RestServiceUnavailable)
+
+
+class TestDeadline(unittest.TestCase):
+    """Test deadlines of calls and batches."""
+
+    @responses.activate
+    def test_deadline_of_a_call(self):
+        """
+        Testing that timeouts are cut to the deadline and a passed one fails early.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={})
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        p.PDB.getSummary(pdbid='1cbs', deadline=0.5)
+        connect, read = responses.calls[0].request.req_kwargs['timeout']
+        self.assertTrue(0 < read <= 0.5 and 0 < connect <= 0.5)
+
+        with self.assertRaises(pdbe.RestTimeout):
+            p.PDB.getSummary(pdbid='1cbs', deadline=Deadline(-1))
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_rate_limit_wait(self):
+        """
+        Testing that no rate limit wait runs past the deadline.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={})
+        p = pdbe.pyPDBeREST(pretty_json=False, rate_limiter=RateLimiter(1))
+        p.PDB.getSummary(pdbid='1cbs')
+        start = time.time()
+        with self.assertRaises(pdbe.RestTimeout):
+            p.PDB.getSummary(pdbid='1cbs', deadline=0.2)
+        self.assertLess(time.time() - start, 0.2)
+        self.assertEqual(len(responses.calls), 1)
+
+    def test_refused_acquire_keeps_the_slot(self):
+        """
+        Testing that an acquire refused by its deadline reserves nothing.
+        """
+
+        limiter = RateLimiter(1)
+        self.assertTrue(limiter.acquire())
+        next_slot = limiter._next_slot
+        self.assertFalse(limiter.acquire(deadline=time.time() + 0.2))
+        self.assertEqual(limiter._next_slot, next_slot)
+
+        shared = SharedRateLimiter(1)
+        self.assertTrue(shared.acquire())
+        next_slot = shared._next.value
+        self.assertFalse(shared.acquire(deadline=time.time() + 0.2))
+        self.assertEqual(shared._next.value, next_slot)
+
+    @unittest.skipIf(validation.numpy is None, 'numpy is not installed')
+    @responses.activate
+    def test_deadline_spans_retries(self):
+        """
+        Testing that a batch and its per-id retries share one deadline.
+        """
+
+        def slow(status):
+            def callback(request):
+                time.sleep(0.3)
+                return status, {}, '{}'
+            return callback
+
+        responses.add_callback(responses.POST, percentiles_url, callback=slow(500))
+        for pdbid in ('1cbs', '2pah'):
+            responses.add_callback(responses.GET, percentiles_url + pdbid, callback=slow(404))
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        start = time.time()
+        with self.assertRaises(pdbe.RestTimeout):
+            validation.ValidationMetrics.collect(
+                p, ['1cbs', '2pah'], endpoints=[('VALIDATION', 'getGlobalRelativePercentiles')],
+                workers=1, deadline=0.5)
+        # the batch and one retry went out, the second retry was never sent
+        self.assertEqual(len(responses.calls), 2)
+        self.assertLess(time.time() - start, 0.9)
+
+
+class TestSharedDeadline(unittest.TestCase):
+    """Test that one deadline bounds every request of a multi-call operation."""
+
+    def assertShared(self, client, calls):
+        self.assertEqual(len(client.deadlines), calls)
+        self.assertIsInstance(client.deadlines[0], Deadline)
+        self.assertTrue(all(d is client.deadlines[0] for d in client.deadlines))
+
+    @responses.activate
+    def test_traversal(self):
+        """
+        Testing that the root and expanded calls share the deadline.
+        """
+
+        ssm_url = pdbe.config.default_url + 'api/ssm/'
+        responses.add(responses.GET, ssm_url + 'noofmatches/3gcb', json={'3gcb': 2})
+        for index in (1, 2):
+            responses.add(responses.GET, ssm_url + 'matchdetail/3gcb/%d' % index, json={})
+        p = RecordingClient()
+        tree = Traversal(p).run(ssm_matches_plan(), deadline=10, pdbid='3gcb')
+        self.assertEqual(tree.params, {'pdbid': '3gcb'})
+        self.assertEqual(len(tree.children), 2)
+        self.assertShared(p, 3)
+
+    @responses.activate
+    def test_search_pages(self):
+        """
+        Testing that all the pages of a search share the deadline.
+        """
+
+        def solr(request):
+            body = {'response': {'numFound': 12, 'docs': [{}] * 5}, 'nextCursorMark': None}
+            return 200, {}, json.dumps(body)
+
+        responses.add_callback(responses.GET, search_url, callback=solr)
+        p = RecordingClient()
+        list(iter_search(p, '*:*', rows=5, workers=2, deadline=10))
+        self.assertShared(p, 3)
+        p = RecordingClient()
+        list(iter_search_cursor(p, '*:*', 'id asc', deadline=10))
+        self.assertShared(p, 1)
+
+    @responses.activate
+    def test_emdb_properties(self):
+        """
+        Testing that the requests for several EMDB property groups share the deadline.
+        """
+
+        emdb_url = pdbe.config.default_url + 'api/emdb/entry/'
+        responses.add(responses.GET, emdb_url + 'analysis/EMD-1200', json={})
+        responses.add(responses.GET, emdb_url + 'citations/EMD-1200', json={})
+        p = RecordingClient()
+        EmdbProperties(p).get('EMD-1200', ['analysis', 'citations'], deadline=10)
+        self.assertShared(p, 2)
+
+    @responses.activate
+    def test_crawl_task(self):
+        """
+        Testing that a crawl task past the map deadline fails without a request.
+        """
+
+        executor._init_worker(RateLimiter(100), {})
+        result = executor._run_task(('PDB', 'getSummary', {'pdbid': '1cbs'}, None,
+                                     Deadline(-1)))
+        self.assertIsInstance(result.error, pdbe.RestTimeout)
+        self.assertEqual(len(responses.calls), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
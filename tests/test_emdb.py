@@ -0,0 +1,99 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the consolidated EMDB property fetching.
+
+"""
+
+import os
+import sys
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.cache import ResponseCache
+from pdbe.emdb import EmdbProperties, slice_all
+
+url = pdbe.config.default_url + 'api/emdb/entry/'
+record = {'summary': {'title': 'GroEL'}, 'map': {'contour_level': 1.5},
+          'sample': {'name': 'GroEL'}, 'imaging': {'microscope': 'FEI'},
+          'vitrification': {}, 'fitted': [], 'image_acquisition': {}, 'processing': {}}
+everything = {'EMD-1200': [record]}
+
+
+def add_property(prop, data):
+    responses.add(responses.GET, url + prop + '/EMD-1200', json=data)
+
+
+class TestEmdbProperties(unittest.TestCase):
+    """Test choosing between 'all' and targeted property calls."""
+
+    def test_slice_all(self):
+        """
+        Testing cutting property groups out of an 'all' response.
+        """
+
+        self.assertEqual(slice_all('EMD-1200', everything, 'map'),
+                         {'EMD-1200': [{'map': {'contour_level': 1.5}}]})
+        experiment = slice_all('EMD-1200', everything, 'experiment')['EMD-1200'][0]
+        self.assertEqual(sorted(experiment), ['fitted', 'image_acquisition', 'imaging',
+                                              'processing', 'vitrification'])
+        # not part of 'all', or missing from the payload
+        self.assertIsNone(slice_all('EMD-1200', everything, 'analysis'))
+        self.assertIsNone(slice_all('EMD-1200', everything, 'citations'))
+
+    @responses.activate
+    def test_all_is_fetched_once(self):
+        """
+        Testing that several covered properties cost one 'all' request.
+        """
+
+        add_property('all', everything)
+        add_property('analysis', {'EMD-1200': [{'fsc': 3.4}]})
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        properties = EmdbProperties(p)
+        info = properties.get('EMD-1200', ['summary', 'map', 'sample', 'analysis'])
+        self.assertEqual(info['map'], {'EMD-1200': [{'map': {'contour_level': 1.5}}]})
+        self.assertEqual(info['analysis'], {'EMD-1200': [{'fsc': 3.4}]})
+        self.assertEqual([call.request.url.split('/')[-2] for call in responses.calls],
+                         ['all', 'analysis'])
+
+        # later requests are served from the cached 'all' payload
+        self.assertEqual(properties.get_one('EMD-1200', 'imaging'),
+                         {'EMD-1200': [{'imaging': {'microscope': 'FEI'}}]})
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_targeted_calls(self):
+        """
+        Testing that a single property is fetched on its own.
+        """
+
+        add_property('map', {'EMD-1200': [{'map': {'contour_level': 1.5}}]})
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        info = EmdbProperties(p).get('EMD-1200', ['map'])
+        self.assertEqual(info['map'], {'EMD-1200': [{'map': {'contour_level': 1.5}}]})
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_client_calls_use_cached_all(self):
+        """
+        Testing that generated endpoint calls are cut out of a cached 'all'.
+        """
+
+        add_property('all', everything)
+        p = pdbe.pyPDBeREST(pretty_json=False, cache=ResponseCache())
+        p.EMDB.getInfo(property='all', emdbid='EMD-1200')
+        self.assertEqual(p.EMDB.getInfo(property='sample', emdbid='EMD-1200'),
+                         {'EMD-1200': [{'sample': {'name': 'GroEL'}}]})
+        self.assertEqual(len(responses.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the multi-process crawl executor and the rate limiters.
+
+"""
+
+import os
+import sys
+import time
+import pickle
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe import executor
+from pdbe.ratelimit import RateLimiter, SharedRateLimiter
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+
+
+def count_entries(data):
+    # module level so that it can be pickled to the workers
+    return len(data)
+
+
+def broken(data):
+    raise KeyError('title')
+
+
+class UnpicklableError(Exception):
+
+    def __init__(self, reason, detail):
+        super(UnpicklableError, self).__init__(reason)
+
+
+class TestCrawlExecutor(unittest.TestCase):
+    """Test the process pool crawler."""
+
+    def test_rate_limiter_spacing(self):
+        """
+        Testing that consecutive requests are spread over the budget.
+        """
+
+        for limiter in (RateLimiter(50), SharedRateLimiter(50)):
+            start = time.time()
+            for _ in range(6):
+                limiter.acquire()
+            self.assertGreaterEqual(time.time() - start, 5 / 50.0 - 0.01)
+
+    def test_errors_survive_pickling(self):
+        """
+        Testing that errors raised in the workers can be sent back.
+        """
+
+        error = pdbe.RestRateLimitError('slow down', 429)
+        restored = pickle.loads(pickle.dumps(error))
+        self.assertIsInstance(restored, pdbe.RestRateLimitError)
+        self.assertEqual(restored.error_code, 429)
+        self.assertEqual(str(restored), str(error))
+
+    def test_params_from_single_values(self):
+        """
+        Testing that bare ids are given to the only mandatory param.
+        """
+
+        self.assertEqual(executor._as_params('PDB', 'getSummary', '1cbs'), {'pdbid': '1cbs'})
+        self.assertEqual(executor._as_params('PDB', 'getSummary', {'pdbid': '1cbs'}),
+                         {'pdbid': '1cbs'})
+        with self.assertRaises(ValueError):
+            executor._as_params('PDB', 'getResidueListingChain', '1cbs')
+
+    @responses.activate
+    def test_worker_task(self):
+        """
+        Testing that the worker fetches, post-processes and reports errors.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': [{}]})
+        responses.add(responses.GET, summary_url + 'xxxx', json={}, status=404)
+        executor._init_worker(RateLimiter(100), {})
+
+        result = executor._run_task(('PDB', 'getSummary', {'pdbid': '1cbs'}, count_entries, None))
+        self.assertEqual(result, executor.CrawlResult({'pdbid': '1cbs'}, 1, None))
+
+        result = executor._run_task(('PDB', 'getSummary', {'pdbid': 'xxxx'}, count_entries, None))
+        self.assertIsNone(result.value)
+        self.assertIsInstance(result.error, pdbe.RestError)
+
+    @responses.activate
+    def test_worker_task_unexpected_errors(self):
+        """
+        Testing that any failure only fails its own task and can be sent back.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': [{}]})
+        executor._init_worker(RateLimiter(100), {})
+
+        result = executor._run_task(('PDB', 'getSummary', {'pdbid': '1cbs'}, broken, None))
+        self.assertEqual(result.params, {'pdbid': '1cbs'})
+        self.assertIsNone(result.value)
+        self.assertIsInstance(result.error, KeyError)
+
+        def unpicklable(data):
+            raise UnpicklableError('bad data', data)
+
+        result = executor._run_task(('PDB', 'getSummary', {'pdbid': '1cbs'}, unpicklable, None))
+        self.assertIsInstance(result.error, pdbe.RestError)
+        self.assertIn('UnpicklableError', str(result.error))
+        pickle.loads(pickle.dumps(result))
+
+    @unittest.skipIf(sys.platform != 'linux', 'mocked responses need fork start method')
+    @responses.activate
+    def test_crawl_aggregate(self):
+        """
+        Testing a crawl over a small pool (workers inherit the mocked session).
+        """
+
+        for pdbid in ('1cbs', '2pah', '3gcb'):
+            responses.add(responses.GET, summary_url + pdbid, json={pdbid: [{}]})
+
+        with executor.CrawlExecutor(processes=2, reqs_per_sec=100) as crawler:
+            total, errors = crawler.aggregate('PDB', 'getSummary', ['1cbs', '2pah', '3gcb'],
+                                              lambda acc, value: acc + value, initial=0,
+                                              postprocess=count_entries)
+        self.assertEqual(total, 3)
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the local caching gateway.
+
+"""
+
+import os
+import sys
+import time
+import inspect
+import unittest
+import threading
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.gateway import Gateway, make_server
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+
+
+class TestGateway(unittest.TestCase):
+    """Test caching and coalescing behind the gateway."""
+
+    def setUp(self):
+        self.gateway = Gateway(reqs_per_sec=1000)
+        self.server = make_server(self.gateway, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self):
+        return pdbe.pyPDBeREST(base_url=self.base_url, pretty_json=False)
+
+    def upstream_calls(self):
+        return [call for call in responses.calls
+                if call.request.url.startswith(pdbe.config.default_url)]
+
+    @responses.activate
+    def test_responses_are_cached(self):
+        """
+        Testing that clients share one cached upstream response.
+        """
+
+        responses.add_passthru(self.base_url)
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': [{'title': 'x'}]})
+
+        self.assertEqual(self.client().PDB.getSummary(pdbid='1cbs'), {'1cbs': [{'title': 'x'}]})
+        p = self.client()
+        self.assertEqual(p.PDB.getSummary(pdbid='1cbs'), {'1cbs': [{'title': 'x'}]})
+        self.assertEqual(p.response.headers['X-Cache'], 'HIT')
+        self.assertEqual(len(self.upstream_calls()), 1)
+
+    @responses.activate
+    def test_errors_pass_through(self):
+        """
+        Testing that upstream errors reach the client and are not cached.
+        """
+
+        responses.add_passthru(self.base_url)
+        responses.add(responses.GET, summary_url + '9zzz', status=404)
+
+        for _ in range(2):
+            with self.assertRaises(pdbe.RestError) as context:
+                self.client().PDB.getSummary(pdbid='9zzz')
+            self.assertEqual(context.exception.error_code, 404)
+        self.assertEqual(len(self.upstream_calls()), 2)
+
+        # unless negative caching is on
+        self.gateway.negative_ttl = 60
+        for _ in range(3):
+            with self.assertRaises(pdbe.RestError) as context:
+                self.client().PDB.getSummary(pdbid='9zzz')
+            self.assertEqual(context.exception.error_code, 404)
+        self.assertEqual(len(self.upstream_calls()), 3)
+
+    @responses.activate
+    def test_post_bodies_are_part_of_the_key(self):
+        """
+        Testing that POST requests are forwarded with their body.
+        """
+
+        responses.add_passthru(self.base_url)
+        responses.add(responses.POST, summary_url, json={'1cbs': [], '2pah': []})
+
+        p = self.client()
+        p.PDB.getSummary(pdbid='1cbs,2pah', method='POST')
+        p.PDB.getSummary(pdbid='1cbs,2pah', method='POST')
+        upstream = self.upstream_calls()
+        self.assertEqual(len(upstream), 1)
+        self.assertEqual(upstream[0].request.body, b'1cbs,2pah')
+        self.assertEqual(self.gateway.stats['hits'], 1)
+
+    @responses.activate
+    def test_in_flight_requests_are_coalesced(self):
+        """
+        Testing that concurrent identical requests make one upstream request.
+        """
+
+        def slow(request):
+            time.sleep(0.3)
+            return 200, {}, '{"1cbs": []}'
+
+        responses.add_passthru(self.base_url)
+        responses.add_callback(responses.GET, summary_url + '1cbs', callback=slow,
+                               content_type='application/json')
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.client().PDB.getSummary(pdbid='1cbs'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [{'1cbs': []}] * 5)
+        self.assertEqual(len(self.upstream_calls()), 1)
+        self.assertEqual(self.gateway.stats['coalesced'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
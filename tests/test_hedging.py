@@ -0,0 +1,94 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for hedged requests.
+
+"""
+
+import os
+import sys
+import time
+import inspect
+import unittest
+import itertools
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.hedging import Hedger
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+endpoint = ('PDB', 'getSummary')
+
+
+class TestHedger(unittest.TestCase):
+    """Test when requests are hedged and which response wins."""
+
+    def setUp(self):
+        # the first request is stuck on a slow replica, the others are fast
+        calls = itertools.count()
+
+        def replica(request):
+            if next(calls) == 0:
+                time.sleep(0.5)
+                return 200, {}, '{"1cbs": ["slow"]}'
+            return 200, {}, '{"1cbs": ["fast"]}'
+
+        responses.start()
+        responses.add_callback(responses.GET, summary_url + '1cbs', callback=replica,
+                               content_type='application/json')
+
+    def tearDown(self):
+        responses.stop()
+        responses.reset()
+
+    def client(self, hedger):
+        for _ in range(hedger.min_samples):
+            hedger.record(endpoint, 0.01)
+        return pdbe.pyPDBeREST(pretty_json=False, hedge=hedger)
+
+    def test_delay(self):
+        """
+        Testing the hedging delay from the observed latencies.
+        """
+
+        hedger = Hedger(percentile=90, min_samples=10)
+        for i in range(9):
+            hedger.record(endpoint, i)
+        self.assertIsNone(hedger.delay(endpoint))
+        hedger.record(endpoint, 9)
+        self.assertEqual(hedger.delay(endpoint), 9)
+        self.assertIsNone(hedger.delay(('PDB', 'getMolecules')))
+
+    def test_hedge_wins(self):
+        """
+        Testing that the fast duplicate answers for the slow request.
+        """
+
+        hedger = Hedger(budget=1.0)
+        p = self.client(hedger)
+        start = time.time()
+        self.assertEqual(p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['fast']})
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual((hedger.requests, hedger.hedges, hedger.hedge_wins), (1, 1, 1))
+        hedger.shutdown()
+
+    def test_budget(self):
+        """
+        Testing that no hedge is sent beyond the budget.
+        """
+
+        hedger = Hedger(budget=0.05)
+        p = self.client(hedger)
+        self.assertEqual(p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['slow']})
+        self.assertEqual(hedger.hedges, 0)
+        self.assertEqual(len(responses.calls), 1)
+        hedger.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
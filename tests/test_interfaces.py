@@ -0,0 +1,110 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the PISA interface graphs.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe import interfaces
+from pdbe.interfaces import InterfaceGraph
+
+
+def interface(interface_id, first, second, area, energy):
+    return {'interface_id': interface_id, 'int_area': area, 'int_solv_en': energy,
+            'molecules': [{'chain_id': first}, {'chain_id': second}]}
+
+# 1abc: A-B, B-C and a crystal contact of A with a symmetry mate of A
+lists = {'1abc': {'1abc': {'interfaces': {'interface_array': [
+             interface(1, 'A', 'B', 900.0, -10.0), interface(2, 'B', 'C', 300.0, -2.0),
+             interface(3, 'A', 'A', 150.0, 1.0)]}}},
+         '2abc': {'2abc': {'interfaces': {'interface_array': [
+             interface(1, 'H', 'L', 1200.0, -15.0)]}}}}
+
+
+@unittest.skipIf(interfaces.numpy is None, 'numpy is not installed')
+class TestInterfaceGraph(unittest.TestCase):
+    """Test the CSR interface networks."""
+
+    def setUp(self):
+        self.graph = InterfaceGraph.from_responses(lists)
+
+    def test_csr(self):
+        """
+        Testing nodes, CSR adjacency and per node aggregates.
+        """
+
+        g = self.graph
+        self.assertEqual(g.nodes, [('1abc', 'A'), ('1abc', 'B'), ('1abc', 'C'),
+                                   ('2abc', 'H'), ('2abc', 'L')])
+        self.assertEqual(g.node_offsets.tolist(), [0, 3, 5])
+        self.assertEqual(g.edge_offsets.tolist(), [0, 3, 4])
+        self.assertEqual(g.degree().tolist(), [2, 2, 1, 1, 1])
+        self.assertEqual(g.buried_area().tolist(), [1050.0, 1200.0, 300.0, 1200.0, 1200.0])
+        self.assertEqual(sorted(g.neighbours('1ABC', 'B')),
+                         [('A', 1, 900.0, -10.0), ('C', 2, 300.0, -2.0)])
+        self.assertEqual(sorted(g.neighbours('1abc', 'A')),
+                         [('A', 3, 150.0, 1.0), ('B', 1, 900.0, -10.0)])
+
+    def test_entry_and_subgraph(self):
+        """
+        Testing single entry graphs and edge filtering.
+        """
+
+        entry = self.graph.entry('2abc')
+        self.assertEqual(entry.nodes, [('2abc', 'H'), ('2abc', 'L')])
+        self.assertEqual(entry.neighbours('2abc', 'L'), [('H', 1, 1200.0, -15.0)])
+
+        strong = self.graph.subgraph(self.graph.area >= 800)
+        self.assertEqual(strong.edge_offsets.tolist(), [0, 1, 2])
+        self.assertEqual(strong.neighbours('1abc', 'B'), [('A', 1, 900.0, -10.0)])
+        self.assertEqual(strong.neighbours('1abc', 'C'), [])
+
+    def test_save_load(self):
+        """
+        Testing the npz round trip.
+        """
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'interfaces.npz')
+            self.graph.save(path)
+            loaded = InterfaceGraph.load(path)
+            self.assertEqual(loaded.nodes, self.graph.nodes)
+            self.assertEqual(loaded.indptr.tolist(), self.graph.indptr.tolist())
+            self.assertEqual(loaded.neighbours('2abc', 'H'), [('L', 1, 1200.0, -15.0)])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @responses.activate
+    def test_collect(self):
+        """
+        Testing fetching the interface lists, with an entry unknown to PISA.
+        """
+
+        url = pdbe.config.default_url + 'api/pisa/interfacelist/'
+        responses.add(responses.GET, url + '1abc/0', json=lists['1abc'])
+        responses.add(responses.GET, url + '2abc/0', json=lists['2abc'])
+        responses.add(responses.GET, url + '3abc/0', json={}, status=404)
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        graph = InterfaceGraph.collect(p, ['1abc', '2abc', '3abc'], workers=2)
+        self.assertEqual(graph.pdbids, ['1abc', '2abc', '3abc'])
+        self.assertEqual(graph.node_offsets.tolist(), [0, 3, 5, 5])
+        self.assertEqual(len(graph.entry('3abc')), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
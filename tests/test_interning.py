@@ -0,0 +1,77 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the interning decoder.
+
+"""
+
+import os
+import sys
+import json
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.interning import InternTable
+
+listing_url = pdbe.config.default_url + 'api/pdb/entry/residue_listing/'
+
+
+def residues(pdbid):
+    return {pdbid: [{'chain_id': 'A', 'residue_name': 'ALA', 'in_chains': ['A', 'B'],
+                     'title': 'a long title that is not interned'}]}
+
+
+class TestInterning(unittest.TestCase):
+    """Test sharing of repeated keys and values across responses."""
+
+    def test_shared_strings(self):
+        """
+        Testing that keys and short values are shared between documents.
+        """
+
+        table = InternTable(max_length=4)
+        first = table.loads(json.dumps(residues('1cbs')))['1cbs'][0]
+        second = table.loads(json.dumps(residues('2pah')))['2pah'][0]
+        self.assertEqual(first, residues('1cbs')['1cbs'][0])
+
+        first_keys = dict((k, k) for k in first)
+        for key in second:
+            self.assertIs(first_keys[key], key)
+        self.assertIs(first['residue_name'], second['residue_name'])
+        self.assertIs(first['in_chains'][1], second['in_chains'][1])
+        self.assertIsNot(first['title'], second['title'])
+
+    def test_max_size(self):
+        """
+        Testing that the table stops growing at max_size.
+        """
+
+        table = InternTable(max_size=2)
+        table.loads('{"a": "x", "b": "y"}')
+        self.assertEqual(len(table), 2)
+
+    @responses.activate
+    def test_client_intern_table(self):
+        """
+        Testing the client decoding mode with a table shared by two clients.
+        """
+
+        for pdbid in ('1cbs', '2pah'):
+            responses.add(responses.GET, listing_url + pdbid, json=residues(pdbid))
+        table = InternTable()
+        first = pdbe.pyPDBeREST(intern_table=table).PDB.getResidueListing(pdbid='1cbs')
+        second = pdbe.pyPDBeREST(intern_table=table, pretty_json=False).call_api_data(
+            'PDB', 'getResidueListing', pdbid='2pah')
+        self.assertIsInstance(first, str)
+        self.assertIs(table.intern('ALA'), second['2pah'][0]['residue_name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the pluggable JSON backends.
+
+"""
+
+import os
+import sys
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe import jsonbackend
+
+document = {'1cbs': [{'title': u'RETINOIC ACID Å', 'number_of_entities': {'water': 1},
+                      'assemblies': [{'preferred': True, 'name': None}]}]}
+
+
+def installed_backends():
+    for name in jsonbackend.backend_names:
+        try:
+            yield jsonbackend.get_backend(name)
+        except ImportError:
+            continue
+
+
+class TestJsonBackend(unittest.TestCase):
+    """Test the JSON decoder/encoder selection."""
+
+    def test_roundtrip(self):
+        """
+        Testing that every installed backend round-trips str, bytes and memoryviews.
+        """
+
+        for backend in installed_backends():
+            encoded = backend.dumps(document)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(backend.loads(encoded), document)
+            self.assertEqual(backend.loads(memoryview(encoded)), document)
+            self.assertEqual(backend.loads(encoded.decode('utf-8')), document)
+
+    def test_selection(self):
+        """
+        Testing 'auto', explicit names and unknown backends.
+        """
+
+        auto = jsonbackend.get_backend('auto')
+        first = next(installed_backends())
+        self.assertEqual(auto.name, first.name)
+        self.assertEqual(jsonbackend.get_backend('json').name, 'json')
+        self.assertIs(jsonbackend.get_backend(auto), auto)
+        with self.assertRaises(ValueError):
+            jsonbackend.get_backend('yaml')
+
+        previous = jsonbackend.get_backend()
+        try:
+            self.assertEqual(jsonbackend.set_default_backend('json').name, 'json')
+            self.assertEqual(jsonbackend.get_backend().name, 'json')
+        finally:
+            jsonbackend.set_default_backend(previous)
+
+    @responses.activate
+    def test_client_backend(self):
+        """
+        Testing that responses are decoded with the client backend.
+        """
+
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pdb/entry/summary/1cbs',
+                      json=document)
+        for backend in installed_backends():
+            p = pdbe.pyPDBeREST(json_backend=backend.name, pretty_json=False)
+            self.assertEqual(p.json_backend.name, backend.name)
+            self.assertEqual(p.PDB.getSummary(pdbid='1cbs'), document)
+
+
+if __name__ == '__main__':
+    unittest.main()
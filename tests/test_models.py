@@ -0,0 +1,90 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the typed response models.
+
+"""
+
+import os
+import sys
+import pickle
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.models import EntrySummary, Molecule, SiftsSegment, build_models
+
+summary = {'title': 'CELLULAR RETINOIC-ACID-BINDING PROTEIN', 'release_date': '19950126',
+           'entry_authors': ['Kleywegt, G.J.', 'Jones, T.A.'], 'unknown_key': 1}
+uniprot = {'1cbs': {'UniProt': {'P29373': {
+    'identifier': 'RABP2_HUMAN', 'name': 'RABP2_HUMAN',
+    'mappings': [{'entity_id': 1, 'chain_id': 'A', 'struct_asym_id': 'A',
+                  'start': {'author_residue_number': 1, 'author_insertion_code': '',
+                            'residue_number': 1},
+                  'end': {'author_residue_number': 137, 'author_insertion_code': '',
+                          'residue_number': 137},
+                  'unp_start': 2, 'unp_end': 138}]}}}}
+
+
+class TestModels(unittest.TestCase):
+    """Test building compact records from decoded json."""
+
+    def test_records(self):
+        """
+        Testing slots, dropped keys, tuples and pickling.
+        """
+
+        record = EntrySummary.from_json(summary)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(record.title, summary['title'])
+        self.assertEqual(record.entry_authors, ('Kleywegt, G.J.', 'Jones, T.A.'))
+        self.assertIsNone(record.deposition_site)
+        self.assertNotIn('unknown_key', record.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_sifts_segments(self):
+        """
+        Testing the flattening of SIFTS UniProt mappings.
+        """
+
+        segment, = build_models('SIFTS', 'getPdbUniProt', uniprot)['1cbs']
+        self.assertIsInstance(segment, SiftsSegment)
+        self.assertEqual((segment.accession, segment.chain_id), ('P29373', 'A'))
+        self.assertEqual((segment.start_residue_number, segment.end_residue_number), (1, 137))
+        self.assertEqual((segment.unp_start, segment.unp_end), (2, 138))
+
+        with self.assertRaises(ValueError):
+            build_models('PDB', 'getLigands', {})
+
+    @responses.activate
+    def test_model_return_mode(self):
+        """
+        Testing returns='model' on the generated endpoint functions.
+        """
+
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pdb/entry/molecules/1cbs',
+                      json={'1cbs': [{'entity_id': 1, 'molecule_type': 'polypeptide(L)'}]})
+        p = pdbe.pyPDBeREST()
+        molecule, = p.PDB.getMolecules(pdbid='1cbs', returns='model')['1cbs']
+        self.assertIsInstance(molecule, Molecule)
+        self.assertEqual(molecule.entity_id, 1)
+        self.assertIsInstance(p.PDB.getMolecules(pdbid='1cbs'), str)
+
+        with self.assertRaises(ValueError):
+            p.PDB.getMolecules(pdbid='1cbs', returns='xml')
+
+        # endpoints without typed records fail before any request is sent
+        calls = len(responses.calls)
+        with self.assertRaises(ValueError):
+            p.PDB.getLigands(pdbid='1cbs', returns='model')
+        self.assertEqual(len(responses.calls), calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
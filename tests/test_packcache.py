@@ -0,0 +1,91 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the append-only pack file cache.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.cache import request_key
+from pdbe.packcache import PackCache
+
+
+class TestPackCache(unittest.TestCase):
+    """Test storage and lookups in pack files."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_raw_roundtrip(self):
+        """
+        Testing that payloads come back as memoryviews of the pack file.
+        """
+
+        cache = PackCache(self.tmpdir)
+        key = request_key('PDB', 'getSummary', 'GET', {'pdbid': '1cbs'})
+        cache.set_raw(key, b'{"1cbs": []}')
+        view = cache.get_raw(key)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view.tobytes(), b'{"1cbs": []}')
+        self.assertEqual(cache.get(key), {'1cbs': []})
+        self.assertNotIn(request_key('PDB', 'getSummary', 'GET', {'pdbid': '2pah'}), cache)
+        with self.assertRaises(KeyError):
+            cache.get_raw('missing')
+
+        # overwriting points the key at the newest record
+        cache.set(key, {'1cbs': [1]})
+        self.assertEqual(cache.get(key), {'1cbs': [1]})
+        self.assertEqual(len(cache), 1)
+
+    def test_growth_and_rotation(self):
+        """
+        Testing index growth and pack rotation seen by a second reader.
+        """
+
+        writer = PackCache(self.tmpdir, max_pack_size=200, initial_capacity=4)
+        reader = PackCache(self.tmpdir)
+        for i in range(50):
+            writer.set(('key', i), {'value': i})
+        self.assertEqual(len(reader), 50)
+        for i in range(50):
+            self.assertEqual(reader.get(('key', i)), {'value': i})
+        packs = [name for name in os.listdir(self.tmpdir) if name.startswith('pack-')]
+        self.assertGreater(len(packs), 1)
+
+        writer.clear()
+        self.assertEqual(len(reader), 0)
+        self.assertNotIn(('key', 1), reader)
+
+    @responses.activate
+    def test_client_cache(self):
+        """
+        Testing the pack cache as the client cache.
+        """
+
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pdb/compound/summary/ATP',
+                      json={'ATP': [{'name': "ADENOSINE-5'-TRIPHOSPHATE"}]})
+        p = pdbe.pyPDBeREST(cache=PackCache(self.tmpdir), pretty_json=False)
+        first = p.COMPOUNDS.getSummary(compid='ATP')
+        again = pdbe.pyPDBeREST(cache=PackCache(self.tmpdir), pretty_json=False)
+        self.assertEqual(again.COMPOUNDS.getSummary(compid='ATP'), first)
+        self.assertEqual(len(responses.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
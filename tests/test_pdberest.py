@@ -197,6 +197,25 @@ class TestPDBeREST(unittest.TestCase):
         self.assertIsInstance(self.p.PDB.getSummary.content_type, str)
         self.assertEqual(self.p.PDB.getSummary.content_type, 'application/json')
 
+    def test_namespaces_shared_between_clients_pyPDBeREST(self):
+        """
+        Testing that namespace classes are built once and bound per client.
+        """
+
+        other = pdbe.pyPDBeREST()
+        self.assertIs(type(self.p.PDB), type(other.PDB))
+        self.assertIsNot(self.p.PDB, other.PDB)
+        self.assertIs(self.p.PDB.getSummary.client, self.p)
+        self.assertIs(other.PDB.getSummary.client, other)
+        self.assertIs(self.p.PDB.getSummary, self.p.PDB.getSummary)
+        self.assertEqual(self.p.PDB.getSummary.__name__, 'getSummary')
+        self.assertIn('This call provides a summary', self.p.PDB.getSummary.__doc__)
+        self.assertIn('Callable bound to a client', pdbe.pdberest.EndpointFunction.__doc__)
+        self.assertEqual(self.p.PDB.getSummary.__full__['url'], 'api/pdb/entry/summary/{{pdbid}}')
+        # mocking an endpoint does not leak into other clients
+        self.p.PDB.getSummary = Mock(return_value={})
+        self.assertIsInstance(other.PDB.getSummary, pdbe.pdberest.EndpointFunction)
+
     def test_wrong_method_endpoint_pyPDBeREST(self):
         """
         Testing the behaviour of calling an unavailable method.
@@ -0,0 +1,108 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the cache freshness policies.
+
+"""
+
+import os
+import sys
+import time
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.cache import ResponseCache, request_key, stored_key
+from pdbe.policy import CachePolicy
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+
+
+class TestCachePolicies(unittest.TestCase):
+    """Test stale-while-revalidate and stale-if-error."""
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        policy = CachePolicy(max_age=60, stale_while_revalidate=600, stale_if_error=3600)
+        self.p = pdbe.pyPDBeREST(cache=self.cache, pretty_json=False,
+                                 cache_policy={('PDB', 'getSummary'): policy})
+        self.key = request_key('PDB', 'getSummary', 'GET', {'pdbid': '1cbs'})
+
+    def tearDown(self):
+        self.p.cache_policies.shutdown()
+
+    def age(self, seconds):
+        # pretends the cached response was stored 'seconds' ago
+        self.cache.set(stored_key(self.key), time.time() - seconds)
+
+    @responses.activate
+    def test_stale_while_revalidate(self):
+        """
+        Testing that a stale response is served at once and refreshed behind.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': ['old']})
+        self.assertEqual(self.p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['old']})
+        self.assertEqual(self.p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['old']})
+        self.assertEqual(len(responses.calls), 1)
+
+        responses.replace(responses.GET, summary_url + '1cbs', json={'1cbs': ['new']})
+        self.age(120)
+        self.assertEqual(self.p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['old']})
+        self.p.cache_policies.wait()
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(self.p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['new']})
+        self.assertEqual(len(responses.calls), 2)
+
+        # too old to be served while revalidating
+        self.age(1000)
+        responses.replace(responses.GET, summary_url + '1cbs', json={'1cbs': ['newer']})
+        self.assertEqual(self.p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['newer']})
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_stale_if_error(self):
+        """
+        Testing that server errors fall back to a stale copy within bounds.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': ['old']})
+        self.p.PDB.getSummary(pdbid='1cbs')
+
+        responses.replace(responses.GET, summary_url + '1cbs', status=503)
+        self.age(1000)
+        self.assertEqual(self.p.PDB.getSummary(pdbid='1cbs'), {'1cbs': ['old']})
+
+        self.age(5000)
+        with self.assertRaises(pdbe.RestServiceUnavailable):
+            self.p.PDB.getSummary(pdbid='1cbs')
+
+        # client errors are never hidden
+        responses.replace(responses.GET, summary_url + '1cbs', status=404)
+        self.age(1000)
+        with self.assertRaises(pdbe.RestError):
+            self.p.PDB.getSummary(pdbid='1cbs')
+
+    @responses.activate
+    def test_endpoints_without_policy(self):
+        """
+        Testing that other endpoints are cached as usual.
+        """
+
+        responses.add(responses.GET, pdbe.config.default_url + 'api/pdb/entry/molecules/1cbs',
+                      json={'1cbs': []})
+        self.p.PDB.getMolecules(pdbid='1cbs')
+        self.p.PDB.getMolecules(pdbid='1cbs')
+        self.assertEqual(len(responses.calls), 1)
+        key = request_key('PDB', 'getMolecules', 'GET', {'pdbid': '1cbs'})
+        self.assertNotIn(stored_key(key), self.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
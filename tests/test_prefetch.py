@@ -0,0 +1,104 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the speculative prefetch of related endpoints.
+
+"""
+
+import os
+import re
+import sys
+import time
+import inspect
+import itertools
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+
+
+def add_entry_profile(pdbid):
+    # mocks every endpoint of the default entry profile
+    for top_name, fun_name in pdbe.config.entry_profile:
+        url = pdbe.config.api_endpoints[top_name][fun_name]['url'].replace('{{pdbid}}', pdbid)
+        responses.add(responses.GET, pdbe.config.default_url + url, json={pdbid: fun_name})
+
+
+class TestPrefetch(unittest.TestCase):
+    """Test the entry profile prefetch."""
+
+    @responses.activate
+    def test_profile_is_prefetched(self):
+        """
+        Testing that the first call for an entry loads the whole profile.
+        """
+
+        add_entry_profile('1cbs')
+        p = pdbe.pyPDBeREST(prefetch=True, pretty_json=False)
+        self.assertEqual(p.PDB.getSummary(pdbid='1cbs'), {'1cbs': 'getSummary'})
+        p.prefetcher.close()
+        self.assertEqual(len(responses.calls), len(pdbe.config.entry_profile))
+
+        # later calls are served from the cache
+        self.assertEqual(p.PDB.getLigands(pdbid='1cbs'), {'1cbs': 'getLigands'})
+        self.assertEqual(p.SIFTS.getPdbUniProt(pdbid='1cbs'), {'1cbs': 'getPdbUniProt'})
+        self.assertEqual(len(responses.calls), len(pdbe.config.entry_profile))
+
+    @responses.activate
+    def test_failed_prefetch_raises_on_call(self):
+        """
+        Testing that prefetch failures are left to the real call to report.
+        """
+
+        responses.add(responses.GET, re.compile('.*'), json={}, status=404)
+        p = pdbe.pyPDBeREST(prefetch={'pdbid': [('PDB', 'getSummary'), ('PDB', 'getNmrResources')]})
+        with self.assertRaises(pdbe.RestError):
+            p.PDB.getSummary(pdbid='1cbs')
+        with self.assertRaises(pdbe.RestError):
+            p.PDB.getNmrResources(pdbid='1cbs')
+
+    @responses.activate
+    def test_prefetch_errors_never_fail_the_call(self):
+        """
+        Testing that an unexpected prefetch failure is fetched again by the call.
+        """
+
+        calls = itertools.count()
+
+        def flaky(request):
+            if next(calls) == 0:
+                time.sleep(0.1)
+                raise ValueError('broken response')
+            return 200, {}, '{"1cbs": "getMolecules"}'
+
+        summary = pdbe.config.default_url + 'api/pdb/entry/summary/1cbs'
+        molecules = pdbe.config.default_url + 'api/pdb/entry/molecules/1cbs'
+        responses.add(responses.GET, summary, json={'1cbs': 'getSummary'})
+        responses.add_callback(responses.GET, molecules, callback=flaky,
+                               content_type='application/json')
+        with pdbe.pyPDBeREST(prefetch={'pdbid': [('PDB', 'getMolecules')]},
+                             pretty_json=False) as p:
+            p.PDB.getSummary(pdbid='1cbs')
+            self.assertEqual(p.PDB.getMolecules(pdbid='1cbs'), {'1cbs': 'getMolecules'})
+        self.assertEqual(next(calls), 2)
+
+    @responses.activate
+    def test_close(self):
+        """
+        Testing that a closed client stops prefetching but still serves calls.
+        """
+
+        add_entry_profile('2pah')
+        p = pdbe.pyPDBeREST(prefetch=True, pretty_json=False)
+        p.close()
+        self.assertEqual(p.PDB.getSummary(pdbid='2pah'), {'2pah': 'getSummary'})
+        self.assertEqual(len(responses.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the paginated Solr search iterators.
+
+"""
+
+import os
+import re
+import sys
+import json
+import inspect
+import unittest
+import responses
+try:
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    # python 3
+    from urllib.parse import urlparse, parse_qs
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.search import build_query, count_search, iter_search, iter_search_cursor
+
+search_url = re.compile(re.escape(pdbe.config.default_url + 'search/pdb/select?') + '.*')
+
+
+def solr(total):
+    # fake Solr core with 'total' documents, honouring start/rows/fl/cursorMark
+    def callback(request):
+        params = parse_qs(urlparse(request.url).query)
+        rows = int(params['rows'][0])
+        if 'cursorMark' in params:
+            cursor = params['cursorMark'][0]
+            start = 0 if cursor == '*' else int(cursor)
+        else:
+            start = int(params['start'][0])
+        fields = params['fl'][0].split(',') if 'fl' in params else ['id', 'title']
+        docs = [dict((f, '%s%d' % (f, i)) for f in fields)
+                for i in range(start, min(start + rows, total))]
+        body = {'response': {'numFound': total, 'start': start, 'docs': docs}}
+        if 'cursorMark' in params:
+            body['nextCursorMark'] = str(min(start + rows, total))
+        return 200, {}, json.dumps(body)
+    return callback
+
+
+class TestSearch(unittest.TestCase):
+    """Test auto-pagination of SEARCH.getSearch."""
+
+    def test_build_query(self):
+        """
+        Testing the Solr query string.
+        """
+
+        self.assertEqual(build_query('pdb_id:1cbs', rows=5, fl=['pdb_id', 'title']),
+                         'q=pdb_id%3A1cbs&wt=json&start=0&rows=5&fl=pdb_id%2Ctitle')
+
+    @responses.activate
+    def test_parallel_pages(self):
+        """
+        Testing that all pages are fetched and yielded in order.
+        """
+
+        responses.add_callback(responses.GET, search_url, callback=solr(23))
+        p = pdbe.pyPDBeREST()
+        docs = list(iter_search(p, '*:*', fl=['id'], rows=5, workers=2))
+        self.assertEqual([d['id'] for d in docs], ['id%d' % i for i in range(23)])
+        self.assertEqual(len(responses.calls), 5)
+        self.assertEqual(count_search(p, '*:*'), 23)
+
+        # only as many pages as needed for max_docs
+        docs = list(iter_search(p, '*:*', rows=5, max_docs=7))
+        self.assertEqual(len(docs), 7)
+        self.assertEqual(docs[0], {'id': 'id0', 'title': 'title0'})
+
+    @responses.activate
+    def test_cursor_pages(self):
+        """
+        Testing deep paging with cursorMark.
+        """
+
+        responses.add_callback(responses.GET, search_url, callback=solr(12))
+        docs = list(iter_search_cursor(pdbe.pyPDBeREST(), '*:*', 'id asc', fl='id', rows=5))
+        self.assertEqual([d['id'] for d in docs], ['id%d' % i for i in range(12)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the residue level SIFTS mapping index.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+from pdbe import siftsindex
+from pdbe.siftsindex import SiftsIndex
+
+
+def mapping(chain_id, start, end, unp_start, unp_end):
+    return {'entity_id': 1, 'chain_id': chain_id, 'struct_asym_id': chain_id,
+            'start': {'residue_number': start, 'author_residue_number': start,
+                      'author_insertion_code': ''},
+            'end': {'residue_number': end, 'author_residue_number': end,
+                    'author_insertion_code': ''},
+            'unp_start': unp_start, 'unp_end': unp_end}
+
+# chain A has a gap: residues 1-50 -> 2-51 and 61-137 -> 62-138
+by_pdbid = {'1cbs': {'UniProt': {'P29373': {
+    'identifier': 'RABP2_HUMAN',
+    'mappings': [mapping('A', 1, 50, 2, 51), mapping('A', 61, 137, 62, 138)]}}}}
+by_accession = {'P29373': {'PDB': {'2cbs': [mapping('A', 1, 137, 2, 138)],
+                                   '3cbs': [mapping('B', 10, 20, 100, 110)]}}}
+
+
+class TestSiftsIndex(unittest.TestCase):
+    """Test translating positions between PDB chains and UniProt."""
+
+    def setUp(self):
+        self.index = SiftsIndex()
+        self.assertEqual(self.index.add(by_pdbid), 2)
+        self.assertEqual(self.index.add(by_accession), 2)
+
+    def test_to_uniprot(self):
+        """
+        Testing bulk PDB -> UniProt lookups, including unmapped residues.
+        """
+
+        positions = self.index.to_uniprot('1CBS', 'A', [1, 50, 55, 61, 137, 200, 0])
+        self.assertEqual(list(positions), [2, 51, -1, 62, 138, -1, -1])
+        self.assertEqual(self.index.accessions('1cbs', 'A'), ['P29373'])
+        self.assertRaises(KeyError, self.index.to_uniprot, '1cbs', 'Z', [1])
+
+    def test_to_pdb(self):
+        """
+        Testing bulk UniProt -> PDB lookups and the structures covering a position.
+        """
+
+        positions = self.index.to_pdb('P29373', [2, 51, 55, 138], '1cbs', 'A')
+        self.assertEqual(list(positions), [1, 50, -1, 137])
+        self.assertEqual(self.index.chains('P29373'),
+                         [('1cbs', 'A'), ('2cbs', 'A'), ('3cbs', 'B')])
+        self.assertEqual(self.index.structures('P29373', 105),
+                         [(('1cbs', 'A'), 104), (('2cbs', 'A'), 104), (('3cbs', 'B'), 15)])
+        self.assertEqual(self.index.structures('P29373', 55), [(('2cbs', 'A'), 54)])
+
+    def test_structures_match_a_scan(self):
+        """
+        Testing the covering lookup against a scan of nested and disjoint segments.
+        """
+
+        rows = [(1, 1000, 0, 'long')] + [(i * 10, i * 10 + 4, 5, 'short%d' % i)
+                                        for i in range(1, 90)] + [(300, 420, 1, 'mid')]
+        segments = siftsindex._Segments(rows)
+        for position in (0, 1, 12, 15, 305, 420, 421, 999, 1000, 1001):
+            expected = sorted((label, position + offset) for start, end, offset, label in rows
+                              if start <= position <= end)
+            self.assertEqual(sorted(segments.covering(position)), expected)
+
+    def test_add_rebuilds(self):
+        """
+        Testing that lookups see segments added after a first lookup.
+        """
+
+        self.assertEqual(self.index.chains('Q00001'), [])
+        self.index.add({'Q00001': {'PDB': {'4abc': [mapping('C', 1, 10, 1, 10)]}}})
+        self.assertEqual(self.index.chains('Q00001'), [('4abc', 'C')])
+        self.assertEqual(self.index.add(by_pdbid), 0)
+
+    def test_save_load(self):
+        """
+        Testing that a saved index answers the same lookups once loaded.
+        """
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'sifts.json')
+            self.index.save(path)
+            loaded = SiftsIndex.load(path)
+            self.assertEqual(len(loaded), len(self.index))
+            self.assertEqual(list(loaded.to_uniprot('1cbs', 'A', [1, 55, 61])), [2, -1, 62])
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the topology layout arrays.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe import topology
+from pdbe.topology import TopologyArrays
+
+
+def points(*xy):
+    return [{'x': x, 'y': y} for x, y in xy]
+
+# two chains of one entity, chain B without any element
+entry = {'1cbs': {'1': {
+    'A': {'helices': [{'start': 15, 'stop': 23, '2dcoordinates': points((0, 0), (0, 10))}],
+          'strands': [{'start': 40, 'stop': 48, '2dcoordinates': points((5, 10), (5, 0), (6, 0))}],
+          'coils': [],
+          'terms': [{'resnum': 1, 'type': 'N', '2dcoordinates': points((-1, -1))}]},
+    'B': {'helices': [], 'strands': [], 'coils': [], 'terms': []}}}}
+per_chain = {'2abc': {'2': {'C': {'coils': [{'start': 1, 'stop': 5,
+                                             '2dcoordinates': points((1, 2), (3, 4))}]}}}}
+
+
+@unittest.skipIf(topology.numpy is None, 'numpy is not installed')
+class TestTopologyArrays(unittest.TestCase):
+    """Test flattening topology layouts."""
+
+    def setUp(self):
+        self.topology = TopologyArrays.from_responses([entry, per_chain])
+
+    def test_layout(self):
+        """
+        Testing the flat element and point arrays.
+        """
+
+        t = self.topology
+        self.assertEqual(t.chains, [('1cbs', '1', 'A'), ('1cbs', '1', 'B'), ('2abc', '2', 'C')])
+        self.assertEqual(t.chain_offsets.tolist(), [0, 3, 3, 4])
+        self.assertEqual([topology.element_types[code] for code in t.element_type],
+                         ['helices', 'strands', 'terms', 'coils'])
+        self.assertEqual(t.start.tolist(), [15, 40, 1, 1])
+        self.assertEqual(t.stop.tolist(), [23, 48, 1, 5])
+        self.assertEqual(t.element_chain.tolist(), [0, 0, 0, 2])
+        self.assertEqual(t.point_offsets.tolist(), [0, 2, 5, 6, 8])
+        self.assertEqual(t.points.shape, (8, 2))
+        self.assertEqual(t.element_points(1).tolist(), [[5, 10], [5, 0], [6, 0]])
+
+    def test_chain_and_bounds(self):
+        """
+        Testing per chain views and the vectorized bounding boxes.
+        """
+
+        chain = self.topology.chain('2ABC', 'C')
+        self.assertEqual(chain['start'].tolist(), [1])
+        self.assertEqual(chain['point_offsets'].tolist(), [0, 2])
+        self.assertEqual(chain['points'].tolist(), [[1, 2], [3, 4]])
+        bounds = self.topology.bounds()
+        self.assertEqual(bounds[0].tolist(), [-1, -1, 6, 10])
+        self.assertTrue(all(value != value for value in bounds[1]))
+        self.assertEqual(bounds[2].tolist(), [1, 2, 3, 4])
+
+    def test_save_load(self):
+        """
+        Testing the npz round trip.
+        """
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'topology.npz')
+            self.topology.save(path)
+            loaded = TopologyArrays.load(path)
+            self.assertEqual(loaded.chains, self.topology.chains)
+            self.assertEqual(loaded.points.tolist(), self.topology.points.tolist())
+            self.assertEqual(loaded.chain('1cbs', 'A')['stop'].tolist(), [23, 48, 1])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @responses.activate
+    def test_collect(self):
+        """
+        Testing fetching the topology of several entries.
+        """
+
+        url = pdbe.config.default_url + 'api/topology/entry/'
+        responses.add(responses.GET, url + '1cbs', json=entry)
+        responses.add(responses.GET, url + '2abc', json=per_chain)
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        collected = TopologyArrays.collect(p, ['1cbs', '2abc'], workers=2)
+        self.assertEqual(len(collected), 3)
+        self.assertEqual(collected.points.tolist(), self.topology.points.tolist())
+
+    @responses.activate
+    def test_collect_skips_missing_topologies(self):
+        """
+        Testing that entries without a topology (404) get no chains.
+        """
+
+        url = pdbe.config.default_url + 'api/topology/entry/'
+        responses.add(responses.GET, url + '1cbs', json=entry)
+        responses.add(responses.GET, url + '1d66', json={}, status=404)
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        collected = TopologyArrays.collect(p, ['1d66', '1cbs'], workers=2)
+        self.assertEqual([pdbid for pdbid, _, _ in collected.chains], ['1cbs', '1cbs'])
+
+        responses.replace(responses.GET, url + '1d66', json={}, status=500)
+        with self.assertRaises(pdbe.RestError):
+            TopologyArrays.collect(p, ['1d66', '1cbs'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the dependent-call traversal planner.
+
+"""
+
+import os
+import sys
+import inspect
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.traversal import (Traversal, Step, find_count, expand_count,
+                            pisa_interfaces_plan, ssm_matches_plan)
+
+pisa_url = pdbe.config.default_url + 'api/pisa/'
+ssm_url = pdbe.config.default_url + 'api/ssm/'
+
+
+class TestTraversal(unittest.TestCase):
+    """Test the expansion of PISA/SSM dependency trees."""
+
+    def test_find_count(self):
+        """
+        Testing the extraction of counts from nested responses.
+        """
+
+        self.assertEqual(find_count({'3gcb': {'noofinterfaces': 3}}), 3)
+        self.assertEqual(find_count({'3gcb': [{'ok': True, 'n': 2}]}), 2)
+        self.assertIsNone(find_count({'3gcb': 'none'}))
+        self.assertEqual(list(expand_count('i', values=('c', ['a', 'b']))({'x': 2})),
+                         [{'i': 1, 'c': 'a'}, {'i': 1, 'c': 'b'},
+                          {'i': 2, 'c': 'a'}, {'i': 2, 'c': 'b'}])
+
+    @responses.activate
+    def test_pisa_interfaces(self):
+        """
+        Testing that every interface and component is fetched and assembled.
+        """
+
+        responses.add(responses.GET, pisa_url + 'noofinterfaces/3gcb/0',
+                      json={'3gcb': {'noofinterfaces': 2}})
+        for index in (1, 2):
+            responses.add(responses.GET, pisa_url + 'interfacedetail/3gcb/0/%d' % index,
+                          json={'interface': index})
+            responses.add(responses.GET, pisa_url + 'interfacecomponent/3gcb/0/%d/energetics' % index,
+                          json={'energetics': index})
+        responses.add(responses.GET, pisa_url + 'interfacecomponent/3gcb/0/2/hbounds',
+                      json={}, status=404)
+        responses.add(responses.GET, pisa_url + 'interfacecomponent/3gcb/0/1/hbounds',
+                      json={'hbounds': 1})
+
+        p = pdbe.pyPDBeREST()
+        tree = Traversal(p, workers=4).run(pisa_interfaces_plan(['energetics', 'hbounds']),
+                                           pdbid='3gcb', assemblyid='0')
+        self.assertEqual(tree.value, {'3gcb': {'noofinterfaces': 2}})
+        self.assertEqual(len(tree.children), 6)
+        details = [c for c in tree.children if c.fun_name == 'getInterfaceDetails']
+        self.assertEqual([c.value for c in details], [{'interface': 1}, {'interface': 2}])
+        failed = [c for c in tree.children if c.error is not None]
+        self.assertEqual([c.params for c in failed],
+                         [{'pdbid': '3gcb', 'assemblyid': '0',
+                           'interface_index': 2, 'interface_component': 'hbounds'}])
+        self.assertEqual(tree.to_dict()['children'][0]['call'], 'PISA.getInterfaceDetails')
+
+    @responses.activate
+    def test_ssm_matches_drop_unused_params(self):
+        """
+        Testing a two level plan with inherited params the child does not take.
+        """
+
+        responses.add(responses.GET, ssm_url + 'noofmatches/3gcb', json={'3gcb': 1})
+        responses.add(responses.GET, ssm_url + 'matchdetail/3gcb/1', json={'match': 1})
+        plan = Step('PISA', 'getNumberInterfaces', children=[ssm_matches_plan()])
+        responses.add(responses.GET, pisa_url + 'noofinterfaces/3gcb/0', json={'3gcb': 0})
+
+        tree = Traversal(pdbe.pyPDBeREST()).run(plan, pdbid='3gcb', assemblyid='0')
+        ssm = tree.children[0]
+        self.assertEqual(ssm.params, {'pdbid': '3gcb'})
+        self.assertEqual(ssm.children[0].value, {'match': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the archive-wide validation metric arrays.
+
+"""
+
+import os
+import sys
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe import validation
+from pdbe.validation import ValidationMetrics
+
+relative = {'1abc': {'clashscore': {'relative': 10.0, 'rawvalue': 20.0},
+                     'percent-rota-outliers': {'relative': 50.0, 'rawvalue': 3.0}},
+            '2abc': {'clashscore': {'relative': 80.0, 'rawvalue': 2.0}},
+            '3abc': {'clashscore': {'relative': 60.0, 'rawvalue': 4.0},
+                     'percent-rota-outliers': {'relative': 70.0, 'rawvalue': 1.0}}}
+summary = {'1abc': {'overall_quality': 40.0, 'experiment_data_available': 'Y'},
+           '2abc': {'overall_quality': 90.0},
+           '3abc': {'overall_quality': 70.0}}
+
+
+@unittest.skipIf(validation.numpy is None, 'numpy is not installed')
+class TestValidationMetrics(unittest.TestCase):
+    """Test packing and querying validation metrics."""
+
+    def setUp(self):
+        self.metrics = ValidationMetrics.from_responses([relative, summary])
+
+    def test_packing(self):
+        """
+        Testing the matrix layout, with NaN for missing values.
+        """
+
+        self.assertEqual(self.metrics.pdbids.tolist(), ['1abc', '2abc', '3abc'])
+        self.assertEqual(self.metrics.columns,
+                         ['clashscore.rawvalue', 'clashscore.relative', 'overall_quality',
+                          'percent-rota-outliers.rawvalue', 'percent-rota-outliers.relative'])
+        self.assertEqual(self.metrics.values.shape, (3, 5))
+        self.assertEqual(self.metrics.row('2ABC'), {'clashscore.rawvalue': 2.0,
+                                                    'clashscore.relative': 80.0,
+                                                    'overall_quality': 90.0})
+
+    def test_statistics(self):
+        """
+        Testing summary statistics, percentiles and percentile ranks.
+        """
+
+        stats = self.metrics.summary()
+        self.assertEqual(stats['clashscore.relative']['count'], 3)
+        self.assertEqual(stats['clashscore.relative']['median'], 60.0)
+        self.assertEqual(stats['percent-rota-outliers.rawvalue']['count'], 2)
+        self.assertEqual(stats['percent-rota-outliers.rawvalue']['mean'], 2.0)
+        self.assertEqual(self.metrics.percentiles('overall_quality', 50), 70.0)
+        self.assertEqual(self.metrics.percentile_rank('overall_quality', [30, 70, 100]).tolist(),
+                         [0.0, 200.0 / 3, 100.0])
+
+    def test_filtering(self):
+        """
+        Testing masks and subsets, entries without a value never matching.
+        """
+
+        mask = self.metrics.mask('percent-rota-outliers.rawvalue', high=2)
+        self.assertEqual(mask.tolist(), [False, False, True])
+        both = mask | self.metrics.mask('overall_quality', low=80)
+        subset = self.metrics.subset(both)
+        self.assertEqual(subset.pdbids.tolist(), ['2abc', '3abc'])
+        self.assertEqual(subset.row('3abc')['overall_quality'], 70.0)
+        self.assertEqual(self.metrics.subset(['3abc']).values.shape, (1, 5))
+
+    def test_save_load(self):
+        """
+        Testing the npz round trip.
+        """
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'metrics.npz')
+            self.metrics.save(path)
+            loaded = ValidationMetrics.load(path)
+            self.assertEqual(loaded.columns, self.metrics.columns)
+            self.assertEqual(loaded.row('1abc'), self.metrics.row('1abc'))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @responses.activate
+    def test_collect(self):
+        """
+        Testing batched POST collection, falling back to single ids.
+        """
+
+        base = pdbe.config.default_url + 'api/validation/'
+        responses.add(responses.POST, base + 'global-percentiles/entry/', json=relative)
+        # the summary batch fails, then is fetched id by id (one entry has no data)
+        responses.add(responses.POST, base + 'summary_quality_scores/entry/', json={}, status=500)
+        for pdbid in ('1abc', '2abc'):
+            responses.add(responses.GET, base + 'summary_quality_scores/entry/' + pdbid,
+                          json={pdbid: summary[pdbid]})
+        responses.add(responses.GET, base + 'summary_quality_scores/entry/3abc', json={},
+                      status=404)
+        p = pdbe.pyPDBeREST(pretty_json=False)
+        metrics = ValidationMetrics.collect(p, ['1ABC', '2abc', '3abc'], workers=2)
+        self.assertEqual(len(metrics), 3)
+        posted = [call.request.body for call in responses.calls
+                  if call.request.url.endswith('global-percentiles/entry/')]
+        self.assertEqual(posted, ['1abc,2abc,3abc'])
+        self.assertEqual(metrics.summary(['overall_quality'])['overall_quality']['count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
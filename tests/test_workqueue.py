@@ -0,0 +1,134 @@
+#!/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the crawl work queue and its SQLite backend.
+
+"""
+
+import os
+import sys
+import time
+import shutil
+import inspect
+import tempfile
+import unittest
+import responses
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(1, parentdir)
+
+import pdbe
+from pdbe.workqueue import WorkQueue, SQLiteBackend
+
+summary_url = pdbe.config.default_url + 'api/pdb/entry/summary/'
+
+
+class TestWorkQueue(unittest.TestCase):
+    """Test lease/ack semantics of the work queue."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.backend = SQLiteBackend(os.path.join(self.tmpdir, 'queue.db'))
+        self.queue = WorkQueue(self.backend, visibility_timeout=60, max_attempts=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_submit_is_idempotent(self):
+        """
+        Testing that the same task is only queued once.
+        """
+
+        params = [{'pdbid': '1cbs'}, {'pdbid': '2pah'}]
+        self.assertEqual(self.queue.submit('PDB', 'getSummary', params), 2)
+        self.assertEqual(self.queue.submit('PDB', 'getSummary', params), 0)
+        self.assertEqual(self.queue.counts()['pending'], 2)
+
+        # identifier case and endpoint aliases do not make new tasks
+        self.assertEqual(self.queue.submit('PDB', 'getSummary', [{'pdbid': '1CBS'}]), 0)
+        self.assertEqual(self.queue.submit('PDB', 'getMolecules', [{'pdbid': '1cbs'}]), 1)
+        self.assertEqual(self.queue.submit('PDB', 'getEntities', [{'pdbid': '1CBS'}]), 0)
+
+    def test_queries_are_stored_verbatim(self):
+        """
+        Testing that Solr queries with commas are not treated as id lists.
+        """
+
+        query = 'q=molecule_name:lysozyme&fl=pdb_id,entity_id&wt=json'
+        self.queue.submit('SEARCH', 'getSearch', [{'query': query}])
+        task, = self.queue.lease(1)
+        self.assertEqual(task.params, {'query': query})
+
+    def test_leases_are_exclusive(self):
+        """
+        Testing that a leased task is invisible until its lease expires.
+        """
+
+        self.queue.submit('PDB', 'getSummary', [{'pdbid': '1cbs'}])
+        self.queue.visibility_timeout = 0.05
+        task, = self.queue.lease(5)
+        self.assertEqual(task.params, {'pdbid': '1cbs'})
+        self.assertEqual(self.queue.lease(5), [])
+
+        # let the lease expire so that another worker takes it over
+        time.sleep(0.1)
+        other = WorkQueue(self.backend, visibility_timeout=60, max_attempts=2)
+        retaken, = other.lease(1)
+        self.assertEqual(retaken.attempts, 2)
+        self.assertEqual(retaken.id, task.id)
+
+        # the original worker lost its lease and cannot ack any more
+        self.assertFalse(self.queue.ack(task, {'stale': True}))
+        self.assertTrue(other.ack(retaken, {'1cbs': []}))
+        self.assertEqual(list(self.queue.results()),
+                         [('PDB', 'getSummary', {'pdbid': '1cbs'}, {'1cbs': []})])
+
+    @responses.activate
+    def test_work_and_dead_letters(self):
+        """
+        Testing a worker run with permanent and transient failures.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', json={'1cbs': [{}]})
+        responses.add(responses.GET, summary_url + 'xxxx', json={}, status=404)
+        responses.add(responses.GET, summary_url + '2pah', json={}, status=503)
+        self.queue.submit('PDB', 'getSummary',
+                          [{'pdbid': '1cbs'}, {'pdbid': 'xxxx'}, {'pdbid': '2pah'}])
+
+        self.queue.work(pdbe.pyPDBeREST(pretty_json=False))
+
+        self.assertEqual(self.queue.counts(), {'pending': 0, 'leased': 0, 'done': 1, 'dead': 2})
+        dead = dict((params['pdbid'], error) for _, _, params, error in self.queue.dead_letters())
+        self.assertIn('404', dead['xxxx'])
+        self.assertIn('503', dead['2pah'])
+        # the 404 is not retried, the 503 is retried up to max_attempts
+        self.assertEqual(len([c for c in responses.calls if c.request.url.endswith('xxxx')]), 1)
+        self.assertEqual(len([c for c in responses.calls if c.request.url.endswith('2pah')]), 2)
+
+    @responses.activate
+    def test_unexpected_errors_release_tasks(self):
+        """
+        Testing that other failures are retried and an interrupt hands tasks back.
+        """
+
+        responses.add(responses.GET, summary_url + '1cbs', body=ValueError('broken'))
+        self.queue.submit('PDB', 'getSummary', [{'pdbid': '1cbs'}])
+        self.queue.work(pdbe.pyPDBeREST(pretty_json=False))
+        (_, _, _, error), = self.queue.dead_letters()
+        self.assertIn('ValueError', error)
+        self.assertEqual(len(responses.calls), 2)
+
+        class Interrupted(object):
+            def call_api_data(self, top_name, fun_name, **params):
+                raise KeyboardInterrupt()
+
+        self.queue.submit('PDB', 'getSummary', [{'pdbid': '2pah'}, {'pdbid': '3gcb'}])
+        with self.assertRaises(KeyboardInterrupt):
+            self.queue.work(Interrupted())
+        self.assertEqual(self.queue.counts()['pending'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()